@@ -2,16 +2,67 @@
 import numpy as np
 cimport numpy as np
 import cv2
-from libc.math cimport sin, cos, tan, M_PI, sqrt, fabs, floor
+cimport cython
+from cython.parallel cimport prange
+from cpython.mem cimport PyMem_Realloc, PyMem_Free
+from libc.string cimport memmove
+from libc.math cimport sin, cos, tan, M_PI, sqrt, fabs, floor, isfinite, NAN
 from typing import Dict, Tuple, Optional as Opt
-# NEW IMPORTS FOR FONT HANDLING
-from PIL import ImageFont, ImageDraw, Image
+from time import perf_counter_ns
 
 # --- Type Definitions for Cython ---
 ctypedef double float64_t
 ctypedef np.float64_t DTYPE_FLOAT
 ctypedef np.uint8_t DTYPE_UINT8
 
+# PROFILING: Per-primitive counters, only updated while PROFILER is enabled (see Profiler)
+PROF_PRIMS = ('line', 'rect', 'poly', 'circle', 'ellipse', 'arc', 'graph', 'blit', 'text', 'mesh')
+cdef enum:
+    P_LINE, P_RECT, P_POLY, P_CIRCLE, P_ELLIPSE, P_ARC, P_GRAPH, P_BLIT, P_TEXT, P_MESH, P_COUNT
+cdef bint _PROF = False
+cdef long long _PROF_CALLS[P_COUNT]
+cdef long long _PROF_VERTS[P_COUNT]
+cdef long long _PROF_NS[P_COUNT]
+
+cdef inline long long _prof_t0():
+    return perf_counter_ns() if _PROF else 0
+
+cdef inline void _prof_add(int p, Py_ssize_t verts, long long t0):
+    # Inclusive times: a primitive that draws through another (text -> blit) counts in both
+    if t0:
+        _PROF_CALLS[p] += 1; _PROF_VERTS[p] += verts; _PROF_NS[p] += perf_counter_ns() - t0
+
+# PARALLEL: Full-canvas kernels run over row tiles with OpenMP (prange) when the work is large enough.
+# One thread (set_num_threads(1), small jobs, or a build without OpenMP) runs the same row kernel serially,
+# so the output is bit-identical either way.
+cdef int _NUM_THREADS = 0                  # 0 until the first parallel kernel (or get_num_threads) picks the default
+cdef Py_ssize_t _TILE_ROWS = 16            # Rows per tile handed to a thread
+cdef Py_ssize_t _PAR_MIN_PIXELS = 1 << 16  # Below this, threading costs more than it saves
+
+def set_num_threads(int n):
+    """
+    Threads used by the tiled kernels (clear, gradient, alpha compositing, merge_layer); <= 1 disables threading.
+    Defaults to OMP_NUM_THREADS when it is set, else every core.
+    """
+    global _NUM_THREADS
+    _NUM_THREADS = max(1, n)
+def get_num_threads() -> int:
+    _resolve_num_threads()
+    return _NUM_THREADS
+
+cdef void _resolve_num_threads() noexcept with gil:
+    # Read on first use rather than at import, so OMP_NUM_THREADS set after importing still applies
+    global _NUM_THREADS
+    if _NUM_THREADS:return
+    try:n = int(os.environ.get('OMP_NUM_THREADS', '').split(',')[0])  # The outermost level, as OpenMP reads it
+    except ValueError:n = os.cpu_count() or 1
+    _NUM_THREADS = max(1, n)
+
+cdef inline int _threads_for(Py_ssize_t pixels) noexcept nogil:
+    if pixels < _PAR_MIN_PIXELS:return 1
+    if not _NUM_THREADS:_resolve_num_threads()
+    return _NUM_THREADS
+
 # Define C function for radians conversion (PI/180)
 cdef inline double c_radians(double angle_deg) noexcept:
     return angle_deg * M_PI / 180.0
@@ -78,73 +129,327 @@ cpdef (double, double) apply_homography(H, pt):
     # Check for homography division by zero/near-zero
     return (res[0] / w, res[1] / w) if fabs(w) > 1e-6 else pt
 
-# TRANSFORM: 3D
-cpdef (double, double, double) transform_3d(tuple p, dict ts):
-    cdef double px, py, pz, cx, cy, cz, x_cam, y_cam, z_cam
-    cdef double rot_angle, scale
-    cdef double x_rot, y_rot, z_rot, x_proj, y_proj, depth
-
-    rot_angle = <double>ts['rot']
-    scale = <double>ts['size']
-    
-    px = <double>p[0]; py = <double>p[1]
-    pz = <double>p[2] if len(p) == 3 else 0.0
-
-    # World space rotation and scaling
-    px, py = rotate_point_deg(px, py, rot_angle)
-    px *= scale; py *= scale; pz *= scale
-    
-    # Camera position and translation
-    cx = <double>ts['cam_pos_3d'][0]
-    cy = <double>ts['cam_pos_3d'][1]
-    cz = <double>ts['cam_pos_3d'][2]
-    x_cam, y_cam, z_cam = px - cx, py - cy, pz - cz
-    
-    # Camera rotation
-    x_rot, y_rot, z_rot = rotate_point_3d(
-        x_cam, y_cam, z_cam, 
-        <double>ts['cam_rot_3d'][0], <double>ts['cam_rot_3d'][1], <double>ts['cam_rot_3d'][2]
-    )
-    
-    # Perspective projection and Screen shift
-    x_proj, y_proj, depth = perspective_projection(x_rot, y_rot, z_rot, 90.0) 
-    
-    return x_proj + <double>ts['shift'][0], y_proj + <double>ts['shift'][1], depth
-
-# TRANSFORM: 2D/3D Unified (Optimized: Explicit type casts)
-cpdef (double, double) transform(tuple p, dict ts):
-    cdef double px, py 
-    cdef double x_scr, y_scr, depth 
-    cdef bint is_3d = <bint>ts['is_3d']
+# TRANSFORM STATE: Typed replacement for the old 'ts' dict
+STATE_KEYS = ['shift', 'rot', 'size', 'cursor_pos', 'full_transform', 'full_transform_inv', 'cam_pos_3d', 'cam_rot_3d', 'is_3d']
 
-    if is_3d:
-        x_scr, y_scr, depth = transform_3d(p if len(p) == 3 else (p[0], p[1], 0.0), ts)
-        return (x_scr, y_scr) if depth >= 1e-6 else (np.inf, np.inf)
+cdef struct _State:
+    double rot, size
+    double shift[2]
+    double cursor[3]
+    int cursor_dim
+    double cam_pos[3]
+    double cam_rot[3]
+    bint is_3d
+    bint has_h
+    double h[9]
+    double h_inv[9]
+
+cdef tuple _dtuple(const double* v, int n):
+    return tuple([v[i] for i in range(n)])
+
+cdef void _load_h(double* dst, object H) except *:
+    cdef np.ndarray flat = np.asarray(H, dtype=np.float64).reshape(9)
+    cdef int i
+    for i in range(9):
+        dst[i] = <double>flat[i]
 
-    # 2D path
-    px = <double>p[0]; py = <double>p[1]
-    px, py = rotate_point_deg(px, py, <double>ts['rot'])
-    
-    px = px * <double>ts['size'] + <double>ts['shift'][0]
-    py = py * <double>ts['size'] + <double>ts['shift'][1]
+cdef class TransformState:
+    """
+    Typed transform state (replaces the old 'ts' dict; dict-style access is kept for compatibility).
+    World rotation, scale, shift and homography (or the 3D camera plus perspective) are composed
+    lazily into one cached 3x4 projection matrix, rebuilt only after a setter changes one of them.
+    push/pop use a per-instance stack of plain C structs.
+    """
+    cdef _State st
+    cdef double _m[12]      # Rows: x * w, y * w, w (columns: x, y, z, 1)
+    cdef bint _dirty
+    cdef _State* _stack
+    cdef Py_ssize_t _depth, _cap
+    cdef dict _extra        # Any non-standard keys users store on the state
+
+    def __cinit__(self):
+        self._stack = NULL; self._depth = 0; self._cap = 0
+        self._dirty = True; self._extra = {}
+
+    def __init__(self, shift=(0.0, 0.0), double rot=0.0, double size=1.0, cursor_pos=(0.0, 0.0),
+                 cam_pos_3d=(0.0, 0.0, -10.0), cam_rot_3d=(0.0, 0.0, 0.0), bint is_3d=False):
+        self.st.rot = rot; self.st.size = size; self.st.is_3d = is_3d; self.st.has_h = False
+        self.set_shift(shift); self.set_pos_raw(cursor_pos)
+        self.set_cam_pos(cam_pos_3d); self.set_cam_rot(cam_rot_3d)
+
+    def __dealloc__(self):
+        if self._stack != NULL:
+            PyMem_Free(self._stack)
+
+    @staticmethod
+    def from_dict(dict d):
+        """Builds a TransformState from an old-style ts dict."""
+        cdef TransformState ts = TransformState()
+        ts.update(d)
+        return ts
+
+    # --- Cached composed matrix ---
+    cdef void _compose(self) noexcept:
+        cdef double a = c_radians(self.st.rot)
+        cdef double c = cos(a) * self.st.size, s = sin(a) * self.st.size
+        cdef double A[9]
+        cdef double B[9]
+        cdef double b[3]
+        cdef double f, rx, ry, rz
+        cdef int i, j
+        cdef double* m = self._m
+        if self.st.is_3d:
+            # Camera rotation applied to the scaled/rotated world basis vectors and to the camera offset
+            A[0] = c; A[1] = -s; A[2] = 0.0; A[3] = s; A[4] = c; A[5] = 0.0; A[6] = 0.0; A[7] = 0.0; A[8] = self.st.size
+            for j in range(3):
+                rx, ry, rz = rotate_point_3d(A[j], A[3 + j], A[6 + j], self.st.cam_rot[0], self.st.cam_rot[1], self.st.cam_rot[2])
+                B[j] = rx; B[3 + j] = ry; B[6 + j] = rz
+            rx, ry, rz = rotate_point_3d(-self.st.cam_pos[0], -self.st.cam_pos[1], -self.st.cam_pos[2],
+                                         self.st.cam_rot[0], self.st.cam_rot[1], self.st.cam_rot[2])
+            b[0] = rx; b[1] = ry; b[2] = rz
+            # Perspective (fov 90) and screen shift folded into the rows: x' = f * x + shift_x * z
+            f = 1.0 / tan(c_radians(90.0) / 2.0)
+            for i in range(2):
+                for j in range(3):
+                    m[i * 4 + j] = f * B[i * 3 + j] + self.st.shift[i] * B[6 + j]
+                m[i * 4 + 3] = f * b[i] + self.st.shift[i] * b[2]
+            for j in range(3):
+                m[8 + j] = B[6 + j]
+            m[11] = b[2]
+        else:
+            A[0] = c; A[1] = -s; A[2] = self.st.shift[0]
+            A[3] = s; A[4] = c; A[5] = self.st.shift[1]
+            A[6] = 0.0; A[7] = 0.0; A[8] = 1.0
+            if self.st.has_h:
+                for i in range(3):
+                    for j in range(3):
+                        B[i * 3 + j] = self.st.h[i * 3] * A[j] + self.st.h[i * 3 + 1] * A[3 + j] + self.st.h[i * 3 + 2] * A[6 + j]
+            else:
+                for i in range(9):
+                    B[i] = A[i]
+            for i in range(3):
+                m[i * 4] = B[i * 3]; m[i * 4 + 1] = B[i * 3 + 1]; m[i * 4 + 2] = 0.0; m[i * 4 + 3] = B[i * 3 + 2]
+        self._dirty = False
+
+    cdef inline const double* mat(self) noexcept:
+        if self._dirty:
+            self._compose()
+        return self._m
+
+    @property
+    def matrix(self):
+        """The cached composed projection: 3x3 in 2D, 3x4 (rows x*w, y*w, w) in 3D."""
+        cdef const double* m = self.mat()
+        M = np.array([m[i] for i in range(12)], dtype=np.float64).reshape((3, 4))
+        return M if self.st.is_3d else M[:, [0, 1, 3]]
+
+    # --- Typed fields ---
+    @property
+    def rot(self): return self.st.rot
+    @rot.setter
+    def rot(self, double v): self.st.rot = v; self._dirty = True
+    @property
+    def size(self): return self.st.size
+    @size.setter
+    def size(self, double v): self.st.size = v; self._dirty = True
+    @property
+    def is_3d(self): return self.st.is_3d
+    @property
+    def shift(self): return _dtuple(self.st.shift, 2)
+    @property
+    def cursor_pos(self): return _dtuple(self.st.cursor, self.st.cursor_dim)
+    @property
+    def cam_pos_3d(self): return _dtuple(self.st.cam_pos, 3)
+    @property
+    def cam_rot_3d(self): return _dtuple(self.st.cam_rot, 3)
+    @property
+    def full_transform(self):
+        return np.array([self.st.h[i] for i in range(9)]).reshape((3, 3)) if self.st.has_h else None
+    @property
+    def full_transform_inv(self):
+        return np.array([self.st.h_inv[i] for i in range(9)]).reshape((3, 3)) if self.st.has_h else None
+
+    # --- Setters (only the ones that touch the composed matrix invalidate it) ---
+    cpdef void move(self, tuple xy):
+        cdef int i
+        for i in range(min(self.st.cursor_dim, len(xy))):
+            self.st.cursor[i] += <double>xy[i]
+    cpdef void set_pos_raw(self, tuple xy):
+        cdef int i
+        self.st.cursor_dim = 3 if len(xy) >= 3 else 2
+        self.st.cursor[2] = 0.0
+        for i in range(self.st.cursor_dim):
+            self.st.cursor[i] = <double>xy[i]
+    cpdef void set_pos(self, tuple xy):
+        if self.st.is_3d:
+            self.set_pos_raw((xy[0], xy[1], xy[2]) if len(xy) == 3 else (xy[0], xy[1], 0.0))
+        else:
+            self.set_pos_raw((xy[0], xy[1]))
+    cpdef void shift_by(self, tuple xy):
+        cdef int i
+        for i in range(min(2, len(xy))):
+            self.st.shift[i] += <double>xy[i]
+        self._dirty = True
+    cpdef void set_shift(self, tuple xy):
+        self.st.shift[0] = <double>xy[0]; self.st.shift[1] = <double>xy[1] if len(xy) > 1 else 0.0
+        self._dirty = True
+    cpdef void rotate(self, double dr):
+        self.st.rot += dr; self._dirty = True
+    cpdef void set_rotate(self, double r):
+        self.st.rot = r; self._dirty = True
+    cpdef void scale(self, double ds):
+        self.st.size += ds; self._dirty = True
+    cpdef void set_size(self, double s):
+        self.st.size = s; self._dirty = True
+    cpdef void set_cam_pos(self, tuple p):
+        cdef int i
+        for i in range(3):
+            self.st.cam_pos[i] = <double>p[i]
+        self._dirty = True
+    cpdef void set_cam_rot(self, tuple r):
+        cdef int i
+        for i in range(3):
+            self.st.cam_rot[i] = <double>r[i]
+        self._dirty = True
+    cpdef void set_3d_mode(self, bint is_3d):
+        self.st.is_3d = is_3d
+        if is_3d and self.st.cursor_dim == 2:
+            self.st.cursor[2] = 0.0; self.st.cursor_dim = 3
+        elif not is_3d and self.st.cursor_dim == 3:
+            self.st.cursor_dim = 2
+        self._dirty = True
+    cpdef void set_full_transform(self, object H, object H_inv=None):
+        """Sets (or clears, with None) the 2D homography applied after rotation, scale and shift."""
+        if H is None:
+            self.st.has_h = False
+        else:
+            _load_h(self.st.h, H)
+            _load_h(self.st.h_inv, H_inv if H_inv is not None else np.linalg.inv(np.asarray(H, dtype=np.float64)))
+            self.st.has_h = True
+        self._dirty = True
+    def set_homography(self, list src_pts, list dst_pts):
+        self.set_full_transform(*set_homography_core(src_pts, dst_pts))
+
+    # --- Per-instance state stack (C array, grown geometrically, no per-push allocation) ---
+    cpdef void push(self) except *:
+        cdef _State* grown
+        if self._depth == self._cap:
+            grown = <_State*>PyMem_Realloc(self._stack, (self._cap * 2 + 8) * sizeof(_State))
+            if grown == NULL:
+                raise MemoryError()
+            self._stack = grown; self._cap = self._cap * 2 + 8
+        self._stack[self._depth] = self.st
+        self._depth += 1
+    cpdef void pop(self):
+        if self._depth > 0:
+            self._depth -= 1
+            self.st = self._stack[self._depth]
+            self._dirty = True
+    cpdef void peek(self):
+        if self._depth > 0:
+            self.st = self._stack[self._depth - 1]
+            self._dirty = True
+    cpdef void cycle(self):
+        """Moves the top of the stack to the bottom."""
+        cdef _State top
+        if self._depth > 1:
+            top = self._stack[self._depth - 1]
+            memmove(&self._stack[1], &self._stack[0], (self._depth - 1) * sizeof(_State))
+            self._stack[0] = top
+    @property
+    def stack_depth(self): return self._depth
+
+    cpdef TransformState copy(self):
+        """Copies the current state (not the stack)."""
+        cdef TransformState ts = TransformState.__new__(TransformState)
+        ts.st = self.st
+        ts._extra = dict(self._extra)
+        return ts
+
+    # --- Dict-style access (backward compatibility) ---
+    def __getitem__(self, str key):
+        if key == 'cursor_pos': return self.cursor_pos
+        if key == 'size': return self.st.size
+        if key == 'rot': return self.st.rot
+        if key == 'shift': return self.shift
+        if key == 'is_3d': return self.st.is_3d
+        if key == 'cam_pos_3d': return self.cam_pos_3d
+        if key == 'cam_rot_3d': return self.cam_rot_3d
+        if key == 'full_transform': return self.full_transform
+        if key == 'full_transform_inv': return self.full_transform_inv
+        return self._extra[key]
+    def __setitem__(self, str key, value):
+        if key == 'cursor_pos': self.set_pos_raw(tuple(value))
+        elif key == 'size': self.set_size(value)
+        elif key == 'rot': self.set_rotate(value)
+        elif key == 'shift': self.set_shift(tuple(value))
+        elif key == 'is_3d': self.st.is_3d = value; self._dirty = True
+        elif key == 'cam_pos_3d': self.set_cam_pos(tuple(value))
+        elif key == 'cam_rot_3d': self.set_cam_rot(tuple(value))
+        elif key == 'full_transform': self.set_full_transform(value)
+        elif key == 'full_transform_inv':
+            if value is not None and self.st.has_h: _load_h(self.st.h_inv, value)
+        else: self._extra[key] = value
+    def __contains__(self, key): return key in STATE_KEYS or key in self._extra
+    def __iter__(self): return iter(self.keys())
+    def __len__(self): return len(STATE_KEYS) + len(self._extra)
+    def keys(self): return STATE_KEYS + list(self._extra)
+    def items(self): return [(k, self[k]) for k in self.keys()]
+    def get(self, key, default=None): return self[key] if key in self else default
+    def update(self, other=(), **kw):
+        cdef dict d = dict(other, **kw)
+        # Apply the homography pair together so the inverse is not recomputed
+        if 'full_transform' in d:
+            self.set_full_transform(d.pop('full_transform'), d.pop('full_transform_inv', None))
+        if 'is_3d' in d:
+            self['is_3d'] = d.pop('is_3d')
+        for k, v in d.items():
+            self[k] = v
+    def __repr__(self):
+        return f"TransformState({', '.join(f'{k}={self[k]!r}' for k in STATE_KEYS if not k.startswith('full'))})"
+
+# PROJECTION: One world point through a cached 3x4 matrix. False if behind the camera / at infinity.
+cdef inline bint _project(const double* m, bint is_3d, double x, double y, double z, double* sx, double* sy) noexcept nogil:
+    cdef double w = m[8] * x + m[9] * y + m[10] * z + m[11]
+    if (w <= 1e-6) if is_3d else (fabs(w) <= 1e-6):
+        return False
+    sx[0] = (m[0] * x + m[1] * y + m[2] * z + m[3]) / w
+    sy[0] = (m[4] * x + m[5] * y + m[6] * z + m[7]) / w
+    return True
+
+# TRANSFORM: 3D (returns depth, negative when behind the camera)
+cpdef (double, double, double) transform_3d(tuple p, TransformState ts):
+    cdef const double* m = ts.mat()
+    cdef double x = <double>p[0], y = <double>p[1]
+    cdef double z = <double>p[2] if len(p) == 3 else 0.0
+    cdef double w = m[8] * x + m[9] * y + m[10] * z + m[11]
+    if fabs(w) > 1e-6:
+        return (m[0] * x + m[1] * y + m[2] * z + m[3]) / w, (m[4] * x + m[5] * y + m[6] * z + m[7]) / w, w
+    # Return a negative depth to indicate 'behind camera'
+    return ts.st.shift[0], ts.st.shift[1], -1.0
 
-    if ts.get('full_transform') is not None:
-        return apply_homography(ts['full_transform'], (px, py))
-        
-    return px, py
+# TRANSFORM: 2D/3D Unified (inf when the point cannot be projected)
+cpdef (double, double) transform(tuple p, TransformState ts):
+    cdef double x_scr, y_scr
+    if _project(ts.mat(), ts.st.is_3d, <double>p[0], <double>p[1], <double>p[2] if len(p) == 3 else 0.0, &x_scr, &y_scr):
+        return x_scr, y_scr
+    return np.inf, np.inf
 
 # TRANSFORM: Inverse (World from Screen) (Optimized: Explicit type casts)
-cpdef (double, double, double) inverse_transform(tuple s, dict ts): 
-    cdef double sx, sy, px, py, wx, wy, rot_angle, scale
+cpdef (double, double, double) inverse_transform(tuple s, TransformState ts): 
+    cdef double sx, sy, px, py, wx, wy, rot_angle, scale, w
+    cdef const double* hi = ts.st.h_inv
     
     sx = <double>s[0]; sy = <double>s[1]
-    rot_angle = -<double>ts['rot']; scale = <double>ts['size']
+    rot_angle = -ts.st.rot; scale = ts.st.size
 
-    if ts.get('full_transform_inv') is not None:
-        sx, sy = apply_homography(ts['full_transform_inv'], (sx, sy))
+    if ts.st.has_h:
+        w = hi[6] * sx + hi[7] * sy + hi[8]
+        if fabs(w) > 1e-6:
+            sx, sy = (hi[0] * sx + hi[1] * sy + hi[2]) / w, (hi[3] * sx + hi[4] * sy + hi[5]) / w
         
-    px = sx - <double>ts['shift'][0]
-    py = sy - <double>ts['shift'][1]
+    px = sx - ts.st.shift[0]
+    py = sy - ts.st.shift[1]
 
     if fabs(scale) < 1e-6:
         return (0.0, 0.0, 0.0) 
@@ -164,174 +469,506 @@ cpdef tuple _color_bgr(tuple color):
     # Converts an RGB color tuple (R, G, B) to BGR (B, G, R) for cv2 compatibility.
     return (color[2], color[1], color[0])
 
-# DRAWING HELPERS: Transform Points (Optimization uses Cdef transform functions)
-cdef list _trans_pts(list pts, dict ts):
-    """Transforms a list of world points to screen points."""
-    cdef list spts = []
-    cdef bint is_3d = <bint>ts['is_3d']
-    cdef tuple p
-    cdef double x_scr, y_scr, depth
-    
-    for p in pts:
-        if is_3d:
-            x_scr, y_scr, depth = transform_3d(p, ts)
-            spts.append((x_scr, y_scr) if depth >= 1e-6 else None)
-        else:
-            x_scr, y_scr = transform(p, ts)
-            if not np.isinf(x_scr):
-                spts.append((x_scr, y_scr))
+# DRAWING HELPERS: Batch Transform (cached state matrix, typed nogil loop over all points)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef tuple transform_points(object pts, TransformState ts):
+    """
+    Transforms an (N, 2) or (N, 3) array of world points to screen space in one pass.
+    Returns (screen, valid): screen is an (N, 2) float64 array and valid an (N,) bool mask.
+    Points that cannot be projected (behind the camera in 3D, or non-finite) are NaN in screen.
+    """
+    cdef np.ndarray src = np.ascontiguousarray(pts, dtype=np.float64)
+    if src.ndim == 1:
+        src = src.reshape((1, -1))
+    if src.ndim != 2 or src.shape[1] not in (2, 3):
+        raise ValueError(f"transform_points expects an (N, 2) or (N, 3) array, got shape {np.shape(pts)}")
+
+    cdef Py_ssize_t n = src.shape[0], i
+    cdef bint has_z = src.shape[1] == 3
+    cdef np.ndarray screen = np.empty((n, 2), dtype=np.float64)
+    cdef np.ndarray valid = np.empty(n, dtype=np.uint8)
+    cdef double[:, ::1] s_v = src
+    cdef double[:, ::1] o_v = screen
+    cdef np.uint8_t[::1] m_v = valid
+    cdef const double* m = ts.mat()
+    cdef bint is_3d = ts.st.is_3d
+    cdef double x, y
+
+    with nogil:
+        for i in range(n):
+            if _project(m, is_3d, s_v[i, 0], s_v[i, 1], s_v[i, 2] if has_z else 0.0, &x, &y) and isfinite(x) and isfinite(y):
+                o_v[i, 0] = x; o_v[i, 1] = y; m_v[i] = 1
             else:
-                spts.append(None)
-    return spts
+                o_v[i, 0] = NAN; o_v[i, 1] = NAN; m_v[i] = 0
+    return screen, valid.view(np.bool_)
+
+# DRAWING HELPERS: Per-call (n, 2) float64 scratch that a primitive projects straight into.
+# It is not shared between calls: cv2 draws with the GIL released, so threads drawing at once need their own points.
+cdef inline np.ndarray _scratch(Py_ssize_t n):
+    return np.empty((n, 2), dtype=np.float64)
+
+# DRAWING HELPERS: Project one world point into scratch row i. False if it cannot be projected.
+cdef inline bint _put(double[:, ::1] sf, const double* m, bint is_3d, Py_ssize_t i, double x, double y, double z) noexcept:
+    cdef double sx, sy
+    if _project(m, is_3d, x, y, z, &sx, &sy) and isfinite(sx) and isfinite(sy):
+        sf[i, 0] = sx; sf[i, 1] = sy
+        return True
+    return False
+
+# DRAWING HELPERS: Project the path cursor_pos, cursor_pos + d1, ... (relative deltas) into scratch.
+# Returns the number of points, or -1 if any of them cannot be projected.
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t _path_to_scratch(TransformState ts, double[:, ::1] sf, tuple ds) except -2:
+    cdef Py_ssize_t n = len(ds), i, dim = ts.st.cursor_dim
+    cdef const double* m = ts.mat()
+    cdef double x = ts.st.cursor[0], y = ts.st.cursor[1], z = ts.st.cursor[2] if dim == 3 else 0.0
+    cdef tuple d
+    if not _put(sf, m, ts.st.is_3d, 0, x, y, z):
+        return -1
+    for i in range(n):
+        d = ds[i]
+        x += <double>d[0]; y += <double>d[1]
+        if dim == 3 and len(d) >= 3:
+            z += <double>d[2]
+        if not _put(sf, m, ts.st.is_3d, i + 1, x, y, z):
+            return -1
+    return n + 1
+
+# DRAWING HELPERS: Project n points of an (rx, ry) ellipse around cursor_pos, starting at start_rad, into scratch.
+# Unprojectable points are dropped; returns the number of points kept.
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t _ring_to_scratch(TransformState ts, double[:, ::1] sf, double rx, double ry, double start_rad, double step, Py_ssize_t n):
+    cdef const double* m = ts.mat()
+    cdef double cx = ts.st.cursor[0], cy = ts.st.cursor[1], cz = ts.st.cursor[2] if ts.st.cursor_dim == 3 else 0.0
+    cdef double a
+    cdef Py_ssize_t i, kept = 0
+    for i in range(n):
+        a = start_rad + i * step
+        if _put(sf, m, ts.st.is_3d, kept, cx + rx * cos(a), cy + ry * sin(a), cz):
+            kept += 1
+    return kept
+
+# DRAWING HELPERS: Split screen points into int32 contours of consecutive rows where mask is set
+cdef list _split_runs(np.ndarray screen, np.ndarray mask, int min_len=2):
+    cdef np.ndarray idx = np.flatnonzero(mask)
+    if idx.shape[0] < min_len:
+        return []
+    cdef np.ndarray pts = screen[idx].astype(np.int32)
+    cdef list parts = np.split(pts, np.flatnonzero(np.diff(idx) != 1) + 1)
+    return [p.reshape((-1, 1, 2)) for p in parts if p.shape[0] >= min_len]
+
+# DRAW LIST: Deferred primitives, coalesced into one OpenCV call per (color, thickness, fill, line type) group
+cdef int _FILL_CELL = 16  # Occupancy cell size (px) used to keep filled contours in one call from overlapping
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef np.ndarray _fill_layers(int[:, ::1] verts, long long[::1] starts, long long[::1] idx, int W, int H):
+    """
+    Assigns each filled contour to the first layer where its (cell-rounded) bounding box is free.
+    fillPoly uses an even-odd rule across all contours of a call, so overlapping contours must not share one.
+    Each cell holds a bit mask of the layers that use it, 64 layers per grid, so finding the layer is one pass over the box.
+    """
+    cdef Py_ssize_t n = idx.shape[0], k, v, ci
+    cdef int gw = max(1, (W + _FILL_CELL - 1) // _FILL_CELL), gh = max(1, (H + _FILL_CELL - 1) // _FILL_CELL)
+    cdef int x0, y0, x1, y1, gx, gy, bank, bit
+    cdef np.uint64_t taken, full = ~(<np.uint64_t>0)
+    cdef np.ndarray layers = np.empty(n, dtype=np.int32)
+    cdef int[::1] l_v = layers
+    cdef list banks = []
+    cdef np.uint64_t[:, ::1] g
+
+    for k in range(n):
+        ci = idx[k]
+        x0 = x1 = verts[starts[ci], 0]; y0 = y1 = verts[starts[ci], 1]
+        for v in range(starts[ci] + 1, starts[ci + 1]):
+            x0 = min(x0, verts[v, 0]); x1 = max(x1, verts[v, 0])
+            y0 = min(y0, verts[v, 1]); y1 = max(y1, verts[v, 1])
+        # Clamp (not clip) to the grid so contours that overlap off-canvas still collide on the border cells
+        x0 = min(max(x0 // _FILL_CELL, 0), gw - 1); x1 = min(max(x1 // _FILL_CELL, 0), gw - 1)
+        y0 = min(max(y0 // _FILL_CELL, 0), gh - 1); y1 = min(max(y1 // _FILL_CELL, 0), gh - 1)
+        bank = 0
+        while True:
+            if bank == len(banks):
+                banks.append(np.zeros((gh, gw), dtype=np.uint64))
+            g = banks[bank]
+            taken = 0
+            for gy in range(y0, y1 + 1):
+                for gx in range(x0, x1 + 1):
+                    taken |= g[gy, gx]
+            if taken != full: break
+            bank += 1
+        bit = 0
+        while (taken >> bit) & 1:
+            bit += 1
+        for gy in range(y0, y1 + 1):
+            for gx in range(x0, x1 + 1):
+                g[gy, gx] |= (<np.uint64_t>1) << bit
+        l_v[k] = bank * 64 + bit
+    return layers
+
+cdef class DrawList:
+    """
+    Records screen-space contours into growable int32 vertex/offset arrays and draws them on flush()
+    with one cv2.polylines / cv2.fillPoly call per (color, thickness, fill, closed, line type) group.
+    Groups are drawn in order of first use, so overdraw between different groups can change;
+    strict_order=True keeps recording order and only merges consecutive contours of the same group.
+    Use as a context manager (or begin_batch/flush) to route line/rect/poly/circle/ellipse/arc into it.
+    """
+    cdef public np.ndarray arr
+    cdef public bint strict_order
+    cdef np.ndarray _verts      # (capacity, 2) int32
+    cdef np.ndarray _starts     # (contour capacity + 1,) int64 offsets into _verts
+    cdef np.ndarray _gids       # (contour capacity,) int32 group id per contour
+    cdef int[:, ::1] _v_view
+    cdef long long[::1] _s_view
+    cdef int[::1] _g_view
+    cdef Py_ssize_t _nv, _nc
+    cdef dict _group_ids
+    cdef list _groups
+    cdef object _last_color     # Last group looked up, so runs of same-styled shapes skip the key dict
+    cdef int _last_t, _last_gid
+    cdef bint _last_fill, _last_closed, _last_aa
+    cdef DrawList _prev
+
+    def __init__(self, np.ndarray arr, bint strict_order=False, Py_ssize_t capacity=4096):
+        self.arr = arr; self.strict_order = strict_order
+        self._verts = np.empty((max(16, capacity), 2), dtype=np.int32)
+        self._starts = np.zeros(max(16, capacity // 4) + 1, dtype=np.int64)
+        self._gids = np.empty(max(16, capacity // 4), dtype=np.int32)
+        self._v_view = self._verts; self._s_view = self._starts; self._g_view = self._gids
+        self._nv = 0; self._nc = 0
+        self._group_ids = {}; self._groups = []
+        self._last_color = None
+
+    def __len__(self): return self._nc
+    @property
+    def vertex_count(self): return self._nv
+
+    cdef int _group(self, tuple color, int thickness, bint fill, bint closed, bint aa) except -1:
+        if (color is self._last_color and thickness == self._last_t and fill == self._last_fill
+                and closed == self._last_closed and aa == self._last_aa):
+            return self._last_gid
+        cdef tuple key = (_color_bgr(color), 0, True, True, _lt(aa)) if fill else (_color_bgr(color), thickness, False, closed, _lt(aa))
+        gid = self._group_ids.get(key)
+        if gid is None:
+            gid = len(self._groups); self._group_ids[key] = gid; self._groups.append(key)
+        self._last_color = color; self._last_t = thickness; self._last_fill = fill
+        self._last_closed = closed; self._last_aa = aa; self._last_gid = gid
+        return gid
+
+    cdef void _reserve(self, Py_ssize_t k):
+        cdef Py_ssize_t cap
+        if self._nv + k > self._verts.shape[0]:
+            cap = max(self._verts.shape[0] * 2, self._nv + k)
+            grown = np.empty((cap, 2), dtype=np.int32); grown[:self._nv] = self._verts[:self._nv]
+            self._verts = grown; self._v_view = grown
+        if self._nc + 1 >= self._gids.shape[0]:
+            cap = self._gids.shape[0] * 2
+            self._starts = np.concatenate((self._starts, np.zeros(cap - self._gids.shape[0], dtype=np.int64)))
+            self._gids = np.concatenate((self._gids, np.empty(cap - self._gids.shape[0], dtype=np.int32)))
+            self._s_view = self._starts; self._g_view = self._gids
+
+    @cython.boundscheck(False)
+    @cython.wraparound(False)
+    cpdef void add(self, double[:, ::1] screen, tuple color, int thickness, bint fill, bint closed, bint aa) except *:
+        """Records one screen-space (N, 2) float64 contour; color is RGB. Filled aa contours are drawn like cv2.rectangle's aa fill."""
+        cdef Py_ssize_t k = screen.shape[0], i
+        cdef int gid = self._group(color, thickness, fill, closed, aa)
+        self._reserve(k)
+        for i in range(k):
+            # float -> int truncation, same as astype(np.int32)
+            self._v_view[self._nv + i, 0] = <int>screen[i, 0]
+            self._v_view[self._nv + i, 1] = <int>screen[i, 1]
+        self._g_view[self._nc] = gid
+        self._nv += k; self._nc += 1
+        self._s_view[self._nc] = self._nv
+
+    cdef int _emit(self, list contours, np.ndarray idx, tuple key):
+        cdef int calls = 0
+        cdef np.ndarray layers
+        bgr, t, fill, closed, lt = key
+        if not fill:
+            cv2.polylines(self.arr, [contours[i] for i in idx], closed, bgr, t, lineType=lt)
+            return 1
+        if lt == cv2.LINE_AA:
+            # fillPoly antialiases edges differently from cv2.rectangle, so aa fills go one convex contour at a time
+            for i in idx:
+                if cv2.isContourConvex(contours[i]) or cv2.contourArea(contours[i]) == 0:
+                    cv2.fillConvexPoly(self.arr, contours[i], bgr, lineType=lt)
+                else:
+                    cv2.fillPoly(self.arr, [contours[i]], bgr, lineType=lt)
+            return idx.shape[0]
+        layers = _fill_layers(self._verts, self._starts, idx, self.arr.shape[1], self.arr.shape[0])
+        for layer in range(layers.max() + 1):
+            cv2.fillPoly(self.arr, [contours[i] for i in idx[layers == layer]], bgr)
+            calls += 1
+        return calls
+
+    cpdef int flush(self):
+        """Draws every recorded contour, resets the list (keeping its buffers) and returns the number of OpenCV calls."""
+        cdef int calls = 0
+        cdef Py_ssize_t nc = self._nc
+        cdef np.ndarray gids, order, bounds
+        if nc == 0:
+            return 0
+        contours = np.split(self._verts[:self._nv], self._starts[1:nc])
+        gids = self._gids[:nc]
+        if self.strict_order:
+            # Runs of consecutive contours sharing a group
+            bounds = np.concatenate(([0], np.flatnonzero(np.diff(gids)) + 1, [nc]))
+        else:
+            order = np.argsort(gids, kind='stable'); gids = gids[order]
+            bounds = np.concatenate(([0], np.flatnonzero(np.diff(gids)) + 1, [nc]))
+        for b in range(bounds.shape[0] - 1):
+            idx = np.arange(bounds[b], bounds[b + 1]) if self.strict_order else order[bounds[b]:bounds[b + 1]]
+            calls += self._emit(contours, idx, self._groups[gids[bounds[b]]])
+        self.clear()
+        return calls
+
+    cpdef void clear(self):
+        self._nv = 0; self._nc = 0
+        self._group_ids.clear(); self._groups.clear(); self._last_color = None
+
+    def __enter__(self):
+        global _BATCH
+        self._prev = _BATCH; _BATCH = self
+        return self
+    def __exit__(self, *exc):
+        global _BATCH
+        _BATCH = self._prev; self._prev = None
+        self.flush()
+        return False
+
+cdef DrawList _BATCH = None
+cdef dict _BATCH_POOL = {}
+
+def begin_batch(np.ndarray arr, bint strict_order=False):
+    """
+    Starts deferred drawing into arr: line/rect/poly/circle/ellipse/arc calls on arr are recorded
+    until flush(). The DrawList (and its buffers) is reused across frames for the same canvas shape and nesting depth.
+    """
+    global _BATCH
+    cdef int depth = 0
+    cdef DrawList dl = _BATCH
+    while dl is not None:
+        depth += 1; dl = dl._prev
+    # Keyed by depth too, so a nested batch never gets (and clears) a list that is still active
+    cdef tuple key = (arr.shape[0], arr.shape[1], strict_order, depth)
+    dl = _BATCH_POOL.get(key)
+    if dl is None:
+        dl = DrawList(arr, strict_order); _BATCH_POOL[key] = dl
+    dl.arr = arr; dl.clear()
+    dl._prev = _BATCH; _BATCH = dl
+    return dl
+
+def flush():
+    """Draws and ends the active batch started by begin_batch. Returns the number of OpenCV calls."""
+    global _BATCH
+    cdef DrawList dl = _BATCH
+    if dl is None:
+        return 0
+    _BATCH = dl._prev; dl._prev = None
+    return dl.flush()
+
+cdef inline DrawList _batch_for(np.ndarray arr):
+    return _BATCH if _BATCH is not None and _BATCH.arr is arr else None
+
+# DRAWING HELPERS: Stroke or fill the first n scratch points as one contour (or record them into the active batch)
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _emit(np.ndarray arr, double[:, ::1] sf, Py_ssize_t n, bint closed, bint fill, tuple color, int t, bint aa) except *:
+    cdef DrawList dl = _batch_for(arr)
+    cdef Py_ssize_t i
+    if dl is not None:
+        dl.add(sf[:n], color, t, fill, closed, aa and not fill); return  # Immediate fills below ignore aa
+    cdef np.ndarray pts = np.empty((n, 2), dtype=np.int32)
+    cdef int[:, ::1] si = pts
+    for i in range(n):
+        # float -> int truncation, same as astype(np.int32)
+        si[i, 0] = <int>sf[i, 0]; si[i, 1] = <int>sf[i, 1]
+    if fill:
+        cv2.fillPoly(arr, [pts], _color_bgr(color))
+    else:
+        cv2.polylines(arr, [pts], closed, _color_bgr(color), t, lineType=_lt(aa))
 
 # DRAWING PRIMITIVES
-cpdef clear(np.ndarray arr, dict ts, tuple color):
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _fill_rows(np.uint8_t[:, :, ::1] a, const np.uint8_t[:, ::1] row_colors, bint per_row, Py_ssize_t y0, Py_ssize_t y1) noexcept nogil:
+    # Row y gets row_colors[y] (per_row) or row_colors[0]; row_colors holds one BGR color per row or column
+    cdef Py_ssize_t y, x, k, n = row_colors.shape[0]
+    for y in range(y0, y1):
+        k = y if per_row else 0
+        for x in range(a.shape[1]):
+            if not per_row and n > 1:k = x
+            a[y, x, 0] = row_colors[k, 0]; a[y, x, 1] = row_colors[k, 1]; a[y, x, 2] = row_colors[k, 2]
+
+cdef void _fill(np.uint8_t[:, :, ::1] a, const np.uint8_t[:, ::1] row_colors, bint per_row) noexcept nogil:
+    cdef Py_ssize_t tile, H = a.shape[0], n_tiles = (a.shape[0] + _TILE_ROWS - 1) // _TILE_ROWS
+    cdef int nt = _threads_for(a.shape[0] * a.shape[1])
+    if nt > 1:
+        for tile in prange(n_tiles, num_threads=nt, schedule='static'):
+            _fill_rows(a, row_colors, per_row, tile * _TILE_ROWS, min(H, (tile + 1) * _TILE_ROWS))
+    else:
+        _fill_rows(a, row_colors, per_row, 0, H)
+
+cdef inline bint _is_canvas(np.ndarray arr):
+    # uint8 BGR, C-contiguous: the layout the tiled kernels write directly
+    return arr.ndim == 3 and arr.shape[2] == 3 and arr.dtype == np.uint8 and arr.flags.c_contiguous
+
+cpdef clear(np.ndarray arr, TransformState ts, tuple color):
     cdef int W = arr.shape[1]
     cdef int H = arr.shape[0]
-    cv2.rectangle(arr, (0, 0), (W, H), _color_bgr(color), -1)
+    if _is_canvas(arr):
+        _fill(arr, np.array([_color_bgr(color)], dtype=np.uint8), False)
+    else:
+        cv2.rectangle(arr, (0, 0), (W, H), _color_bgr(color), -1)
+
+cpdef void gradient(np.ndarray arr, TransformState ts, tuple color_a, tuple color_b, bint horizontal=False):
+    """Fills the whole canvas with a linear gradient from color_a (top / left) to color_b (bottom / right)."""
+    cdef Py_ssize_t n = arr.shape[1] if horizontal else arr.shape[0]
+    # Integer-rounded ramp, one BGR entry per row (or column)
+    cdef np.ndarray i = np.arange(n, dtype=np.int64)[:, None]
+    cdef np.ndarray a = np.array(_color_bgr(color_a), dtype=np.int64), b = np.array(_color_bgr(color_b), dtype=np.int64)
+    ramp = a[None, :].repeat(n, 0) if n < 2 else (2 * (a * (n - 1 - i) + b * i) + (n - 1)) // (2 * (n - 1))
+    ramp = np.ascontiguousarray(ramp, dtype=np.uint8)
+    if _is_canvas(arr):
+        _fill(arr, ramp, not horizontal)
+    else:
+        arr[:] = ramp[None, :, :] if horizontal else ramp[:, None, :]
 
-cpdef void line(np.ndarray arr, dict ts, tuple d, tuple color, int thickness, bint aa=False):
-    cdef double t_size = <double>ts['size']
+cpdef void line(np.ndarray arr, TransformState ts, tuple d, tuple color, int thickness, bint aa=False):
+    cdef long long t0 = _prof_t0()
+    cdef double t_size = ts.st.size
     cdef int t = max(1, int(thickness * t_size))
-    cdef tuple start, end, start_scr, end_scr, d_match
-    
-    # Ensure d_match has the correct dimension for add_tuples
-    d_match = d + (0.0,) * (len(ts['cursor_pos']) - len(d))
-    start = ts['cursor_pos']
-    end = add_tuples(start, d_match)
+    cdef const double* m = ts.mat()
+    cdef bint is_3d = ts.st.is_3d, ok
+    cdef DrawList dl
+    cdef double[:, ::1] sf = _scratch(2)
     
-    ts['cursor_pos'] = end
-    start_scr, end_scr = _trans_pts([start, end], ts)
+    # Project the start, advance the cursor by d (padded to the cursor's dimension), project the end
+    ok = _put(sf, m, is_3d, 0, ts.st.cursor[0], ts.st.cursor[1], ts.st.cursor[2] if ts.st.cursor_dim == 3 else 0.0)
+    ts.move(d)
+    ok = _put(sf, m, is_3d, 1, ts.st.cursor[0], ts.st.cursor[1], ts.st.cursor[2] if ts.st.cursor_dim == 3 else 0.0) and ok
     
-    if start_scr and end_scr:
+    if not ok:
+        _prof_add(P_LINE, 0, t0); return
+    dl = _batch_for(arr)
+    if dl is not None:
+        dl.add(sf, color, t, False, False, aa)
+    else:
         cv2.line(
             arr, 
-            (int(start_scr[0]), int(start_scr[1])), 
-            (int(end_scr[0]), int(end_scr[1])), 
+            (int(sf[0, 0]), int(sf[0, 1])), 
+            (int(sf[1, 0]), int(sf[1, 1])), 
             _color_bgr(color), t, lineType=_lt(aa)
         )
+    _prof_add(P_LINE, 2, t0)
 
 # RECT (Optimized 2D path)
-cpdef void rect(np.ndarray arr, dict ts, tuple wh, tuple color, int thickness, bint fill=False, bint aa=False):
-    cdef double t_size = <double>ts['size']
+cpdef void rect(np.ndarray arr, TransformState ts, tuple wh, tuple color, int thickness, bint fill=False, bint aa=False):
+    cdef long long t0 = _prof_t0()
+    cdef double t_size = ts.st.size
     cdef int t = max(1, int(thickness * t_size))
-    cdef double w = <double>wh[0], h = <double>wh[1], z
-    cdef tuple p1 = ts['cursor_pos']
-    cdef tuple start_scr, end_scr
-    cdef list pts_world
-    cdef list screen_points
-    cdef np.ndarray pts
-    cdef int lt 
-
-    if ts['is_3d']:
-        z = <double>p1[2] if len(p1) == 3 else 0.0 
-        pts_world = [p1, (p1[0] + w, p1[1], z), (p1[0] + w, p1[1] + h, z), (p1[0], p1[1] + h, z)]
-        screen_points = _trans_pts(pts_world, ts)
-        
-        if all(screen_points):
-            pts = np.array(screen_points, np.int32).reshape((-1, 1, 2))
-            lt = _lt(aa) if not fill else cv2.LINE_4 
-            if fill: cv2.fillPoly(arr, [pts], _color_bgr(color))
-            else: cv2.polylines(arr, [pts], True, _color_bgr(color), t, lineType=lt)
+    cdef double w = <double>wh[0], h = <double>wh[1]
+    cdef double x = ts.st.cursor[0], y = ts.st.cursor[1], z = ts.st.cursor[2] if ts.st.cursor_dim == 3 else 0.0
+    cdef double x0, y0, x1, y1
+    cdef const double* m = ts.mat()
+    cdef bint is_3d = ts.st.is_3d
+    cdef DrawList dl
+    cdef double[:, ::1] sf = _scratch(4)
+
+    if is_3d:
+        if (_put(sf, m, is_3d, 0, x, y, z) and _put(sf, m, is_3d, 1, x + w, y, z)
+                and _put(sf, m, is_3d, 2, x + w, y + h, z) and _put(sf, m, is_3d, 3, x, y + h, z)):
+            _emit(arr, sf, 4, True, fill, color, t, aa)
+            _prof_add(P_RECT, 4, t0)
+        else:
+            _prof_add(P_RECT, 0, t0)
     else:
         # Optimized 2D path: Only transform two corners
-        start_scr = transform(p1, ts)
-        end_scr = transform((p1[0] + w, p1[1] + h), ts)
-        
-        if not np.isinf(start_scr[0]) and not np.isinf(end_scr[0]):
+        if not (_put(sf, m, is_3d, 0, x, y, 0.0) and _put(sf, m, is_3d, 1, x + w, y + h, 0.0)):
+            _prof_add(P_RECT, 0, t0); return
+        dl = _batch_for(arr)
+        if dl is not None:
+            # Batched as the equivalent screen-aligned quad
+            x0 = sf[0, 0]; y0 = sf[0, 1]; x1 = sf[1, 0]; y1 = sf[1, 1]
+            sf[1, 0] = x1; sf[1, 1] = y0; sf[2, 0] = x1; sf[2, 1] = y1; sf[3, 0] = x0; sf[3, 1] = y1
+            dl.add(sf, color, t, fill, True, aa)
+        else:
             cv2.rectangle(
                 arr, 
-                (int(start_scr[0]), int(start_scr[1])), 
-                (int(end_scr[0]), int(end_scr[1])), 
+                (int(sf[0, 0]), int(sf[0, 1])), 
+                (int(sf[1, 0]), int(sf[1, 1])), 
                 _color_bgr(color), 
                 -1 if fill else t, 
                 lineType=_lt(aa)
             )
+        _prof_add(P_RECT, 2, t0)
 
-# POLY (Optimization ensures minimal Python interaction in the loop)
-cpdef void poly(np.ndarray arr, dict ts, tuple ds, tuple color, int thickness, bint fill=False, bint aa=False):
-    cdef int t = max(1, int(thickness * <double>ts['size']))
-    cdef list pts = [ts['cursor_pos']]
-    cdef tuple d
-    cdef list screen_points
-    cdef np.ndarray poly_pts 
+# POLY (Optimization: world path accumulated and projected in one C loop, no per-shape arrays)
+cpdef void poly(np.ndarray arr, TransformState ts, tuple ds, tuple color, int thickness, bint fill=False, bint aa=False):
+    cdef long long t0 = _prof_t0()
+    cdef int t = max(1, int(thickness * ts.st.size))
     
-    # 1. Build list of world points
-    for d in ds:
-        pts.append(add_tuples(pts[-1], d + (0.0,) * (len(pts[-1]) - len(d))))
-        
-    # 2. Transform all world points to screen points
-    screen_points = _trans_pts(pts, ts)
+    # 1. Project the absolute world path (cursor_pos + running sum of ds); -1 if any vertex is unprojectable
+    cdef double[:, ::1] sf = _scratch(len(ds) + 1)
+    cdef Py_ssize_t n = _path_to_scratch(ts, sf, ds)
     
-    # 3. Draw using OpenCV
-    if all(screen_points):
-        poly_pts = np.array(screen_points, np.int32).reshape((-1, 1, 2))
-        
-        if fill:
-            cv2.fillPoly(arr, [poly_pts], _color_bgr(color))
-        else:
-            cv2.polylines(arr, [poly_pts], True, _color_bgr(color), t, lineType=_lt(aa))
-
-# CIRCLE (Optimized: C-level calculation of points/deltas)
-cpdef void circle(np.ndarray arr, dict ts, double radius, tuple color, int thickness=1, bint fill=False, bint aa=False, double multiplier=1.0):
-    cdef double r_check, factor, angle, x, y, prev_x, prev_y, angle_step
-    cdef int num_points, i
-    cdef list deltas = []
-    cdef double PI = M_PI
-    cdef double t_size = <double>ts['size']
-    cdef tuple start_point, temp_cursor_pos
+    # 2. Draw using OpenCV (only if every vertex could be projected)
+    if n > 0:
+        _emit(arr, sf, n, True, fill, color, t, aa)
+    _prof_add(P_POLY, max(n, 0), t0)
+
+# CIRCLE (Optimized: ring generated and projected in one C loop)
+cpdef void circle(np.ndarray arr, TransformState ts, double radius, tuple color, int thickness=1, bint fill=False, bint aa=False, double multiplier=1.0):
+    cdef long long t0 = _prof_t0()
+    cdef double r_check, factor
+    cdef int num_points
+    cdef int t = max(1, int(thickness * ts.st.size))
     
     # 1. Heuristic for point count
     for r_check, factor in [(200.0, 1.5), (150.0, 1.5), (100.0, 2.0), (50.0, 2.0)]:
         if radius >= r_check: multiplier /= factor
     
     num_points = max(6, int(radius * multiplier))
-    angle_step = 2.0 * PI / num_points
     
-    # 2. Pre-calculate deltas and start point
-    prev_x, prev_y = radius, 0.0
-    start_point = (<double>ts['cursor_pos'][0] + prev_x, <double>ts['cursor_pos'][1] + prev_y)
-
-    for i in range(1, num_points + 1):
-        angle = i * angle_step
-        x = radius * cos(angle); y = radius * sin(angle)
-        
-        # Calculate delta (relative to previous point)
-        deltas.append((x - prev_x, y - prev_y))
-        prev_x, prev_y = x, y
-        
-    # 3. Use poly to draw the line/fill
-    temp_cursor_pos = ts['cursor_pos'] 
-    ts['cursor_pos'] = start_point
-    
-    # Pass a tuple of deltas for faster argument handling
-    poly(arr, ts, tuple(deltas), color=color, thickness=thickness, fill=fill, aa=aa)
-    
-    # Restore cursor position
-    ts['cursor_pos'] = temp_cursor_pos
+    # 2. Closed ring of num_points + 1 world points around cursor_pos
+    # 3. Draw the line/fill (only if every point could be projected)
+    cdef double[:, ::1] sf = _scratch(num_points + 1)
+    if _ring_to_scratch(ts, sf, radius, radius, 0.0, 2.0 * M_PI / num_points, num_points + 1) == num_points + 1:
+        _emit(arr, sf, num_points + 1, True, fill, color, t, aa)
+        _prof_add(P_CIRCLE, num_points + 1, t0)
+    else:
+        _prof_add(P_CIRCLE, 0, t0)
 
-cpdef void ellipse(np.ndarray arr, dict ts, double rx, double ry, tuple color, int thickness=1, bint fill=False, bint aa=False, double multiplier=1.0):
+cpdef void ellipse(np.ndarray arr, TransformState ts, double rx, double ry, tuple color, int thickness=1, bint fill=False, bint aa=False, double multiplier=1.0):
     """
     Draws an ellipse centered at cursor_pos with radii rx and ry.
     Approximate smooth drawing using OpenCV ellipse function in 2D or polyline in 3D.
     """
-    cdef double t_size = <double>ts['size']
+    cdef long long t0 = _prof_t0()
+    cdef double t_size = ts.st.size
     cdef int t = max(1, int(thickness * t_size))
-    cdef tuple center_scr
-    cdef tuple temp_cursor_pos = ts['cursor_pos']
+    cdef double r_check, factor, max_r
+    cdef int num_points
+    cdef Py_ssize_t n = 0
+    cdef double[:, ::1] sf
 
     # 2D Optimized Path: Use cv2.ellipse (fast, handles rotation and center)
-    if not ts['is_3d']:
-        center_scr = transform(temp_cursor_pos, ts)
-
-        if not np.isinf(center_scr[0]):
+    if not ts.st.is_3d:
+        sf = _scratch(1)
+        if _put(sf, ts.mat(), False, 0, ts.st.cursor[0], ts.st.cursor[1], 0.0):
             scr_rx = int(rx * t_size)
             scr_ry = int(ry * t_size)
-            rot_deg = <double>ts['rot']
+            rot_deg = ts.st.rot
 
             cv2.ellipse(
                 arr,
-                (int(center_scr[0]), int(center_scr[1])),
+                (int(sf[0, 0]), int(sf[0, 1])),
                 (scr_rx, scr_ry),
                 rot_deg,               # Angle: Uses current world rotation
                 0.0, 360.0,            # Start/End Angle
@@ -339,14 +976,9 @@ cpdef void ellipse(np.ndarray arr, dict ts, double rx, double ry, tuple color, i
                 -1 if fill else t,
                 lineType=_lt(aa)
             )
+            n = 1
     else:
         # 3D Path: Use point approximation to respect perspective distortion
-        x, y, angle_step, angle = (
-         0, 0, 0, 0
-        )
-        num_points, i = (0, 0)
-        PI = M_PI
-        r_check, factor = (0, 0)
         max_r = max(rx, ry)
 
         # Heuristic for point count based on largest radius for smoothness
@@ -354,101 +986,65 @@ cpdef void ellipse(np.ndarray arr, dict ts, double rx, double ry, tuple color, i
             if max_r >= r_check: multiplier /= factor
 
         num_points = max(12, int(max_r * multiplier * 2.0))
-        angle_step = 2.0 * PI / num_points
-
-        # Calculate world points relative to (0, 0) offset by cursor_pos
-        world_pts = []
-        c_x = <double>temp_cursor_pos[0]
-        c_y = <double>temp_cursor_pos[1]
-        c_z = <double>temp_cursor_pos[2] if len(temp_cursor_pos) == 3 else 0.0
-
-        for i in range(num_points + 1):
-            angle = i * angle_step
-            x = c_x + rx * cos(angle)
-            y = c_y + ry * sin(angle)
-            world_pts.append((x, y, c_z))
 
-        # Transform and draw using polylines
-        screen_points = _trans_pts(world_pts, ts)
-        valid_points = [p for p in screen_points if p is not None]
+        # Project the ring around cursor_pos, keeping only the projectable points
+        sf = _scratch(num_points + 1)
+        n = _ring_to_scratch(ts, sf, rx, ry, 0.0, 2.0 * M_PI / num_points, num_points + 1)
 
-        if len(valid_points) >= 2:
-            poly_pts = np.array(valid_points, np.int32).reshape((-1, 1, 2))
-
-            if fill:
-                cv2.fillPoly(arr, [poly_pts], _color_bgr(color))
-            else:
-                # The ellipse is a closed shape, so set isClosed=True
-                cv2.polylines(arr, [poly_pts], True, _color_bgr(color), t, lineType=_lt(aa))
+        if n >= 2:
+            # The ellipse is a closed shape, so set isClosed=True
+            _emit(arr, sf, n, True, fill, color, t, aa)
+        else:
+            n = 0
+    _prof_add(P_ELLIPSE, n, t0)
 
 
-cpdef void arc(np.ndarray arr, dict ts, double radius, double start_deg, double end_deg, tuple color, int thickness=1, bint aa=False, double multiplier=1.0):
+cpdef void arc(np.ndarray arr, TransformState ts, double radius, double start_deg, double end_deg, tuple color, int thickness=1, bint aa=False, double multiplier=1.0):
     """
     Draws an arc (a segment of a circle) centered at cursor_pos.
     Uses point approximation for smoothness in both 2D and 3D.
     """
-    cdef double t_size = <double>ts['size']
+    cdef long long t0 = _prof_t0()
+    cdef double t_size = ts.st.size
     cdef int t = max(1, int(thickness * t_size))
     cdef double start_rad = c_radians(start_deg)
     cdef double end_rad = c_radians(end_deg)
     cdef double angle_range = end_rad - start_rad
-    cdef double angle_step
-    cdef int num_points, i
+    cdef int num_points
     cdef double PI = M_PI
-    cdef list world_pts = []
-    cdef tuple temp_cursor_pos = ts['cursor_pos']
-    cdef double c_x = <double>temp_cursor_pos[0]
-    cdef double c_y = <double>temp_cursor_pos[1]
-    cdef double c_z = <double>temp_cursor_pos[2] if len(temp_cursor_pos) == 3 else 0.0
-    cdef double angle
+    cdef Py_ssize_t n
 
     # Normalize angle_range to be positive [0, 2*PI]
     while angle_range < 0.0: angle_range += 2.0 * PI
     while angle_range > 2.0 * PI: angle_range -= 2.0 * PI
-    if angle_range < 1e-6: return
+    if angle_range < 1e-6:
+        _prof_add(P_ARC, 0, t0); return
 
     # Heuristic for point count based on arc length for smoothness
     num_points = max(2, int(radius * multiplier * angle_range / (2.0 * PI) * 6.0))
-    angle_step = angle_range / num_points
-
-    # Generate points in world space
-    for i in range(num_points + 1):
-        angle = start_rad + i * angle_step
-        x = c_x + radius * cos(angle)
-        y = c_y + radius * sin(angle)
-        world_pts.append((x, y, c_z))
-
-    # Transform and draw
-    cdef list screen_points = _trans_pts(world_pts, ts)
-
-    # Convert non-None screen points to a NumPy array for polylines
-    cdef list valid_points = [p for p in screen_points if p is not None]
-    if len(valid_points) >= 2:
-        poly_pts = np.array(valid_points, np.int32).reshape((-1, 1, 2))
-        # Draw the arc as an open polyline (isClosed=False)
-        cv2.polylines(arr, [poly_pts], False, _color_bgr(color), t, lineType=_lt(aa))
 
+    # Generate and project the points, keeping only the projectable ones
+    cdef double[:, ::1] sf = _scratch(num_points + 1)
+    n = _ring_to_scratch(ts, sf, radius, radius, start_rad, angle_range / num_points, num_points + 1)
 
-cpdef void graph(np.ndarray arr, dict ts, object func, double x_min, double x_max, tuple color, int thickness=1, bint aa=True, int resolution=100, double y_scale=1, double x_scale=1, int max_depth=5, double angle_threshold=0.1, double screen_dist_threshold=5.0, bint x_world=False):
-    """
-    Plots a 1D function y = f(x) from x_min to x_max using adaptive resolution.
-    - resolution: Serves as the *initial* number of segments.
-    - max_depth: Limits how many times a segment can be subdivided.
-    - angle_threshold: Maximum allowed change in angle (radians) between segments before subdivision.
-    - screen_dist_threshold: Maximum allowed distance (pixels) between screen points before subdivision.
-    """
-    if x_min >= x_max: return
+    if n >= 2:
+        # Draw the arc as an open polyline (isClosed=False)
+        _emit(arr, sf, n, False, False, color, t, aa)
+        _prof_add(P_ARC, n, t0)
+    else:
+        _prof_add(P_ARC, 0, t0)
 
-    cdef double t_size = <double>ts['size']
-    cdef int t = max(1, int(thickness * t_size))
-    
+
+# GRAPH HELPERS
+cdef list _graph_adaptive(TransformState ts, object func, double x_min, double x_max, int resolution, double y_scale, double x_scale, int max_depth, double screen_dist_threshold, bint x_world):
+    """Samples func one x at a time and subdivides depth-first; returns the world points, or None if nothing can be drawn."""
     cdef list world_pts = []
     
     # Store points as tuples of (world_x, world_y, world_z)
     cdef list initial_world_pts = []
     
     # Cursor offsets for world transformation
-    cdef tuple temp_cursor_pos = ts['cursor_pos']
+    cdef tuple temp_cursor_pos = ts.cursor_pos
     cdef double c_y_origin = <double>temp_cursor_pos[1]
     cdef double c_z = <double>temp_cursor_pos[2] if len(temp_cursor_pos) == 3 else 0.0
     cdef double c_x_offset = <double>temp_cursor_pos[0]
@@ -483,7 +1079,7 @@ cpdef void graph(np.ndarray arr, dict ts, object func, double x_min, double x_ma
         initial_world_pts.append((x_world_final, y, c_z))
 
     # If too few points, return early
-    if len(initial_world_pts) < 2: return
+    if len(initial_world_pts) < 2: return None
 
     # --- Adaptive Subdivision Loop ---
     # We will use the initial points as a starting point for subdivision.
@@ -491,25 +1087,29 @@ cpdef void graph(np.ndarray arr, dict ts, object func, double x_min, double x_ma
     cdef list world_stack = []
 
     # Push all initial segments onto the stack. A segment is (P1, P2, depth)
-    for i in range(len(initial_world_pts) - 1):
+    # Pushed last-to-first, so pop() walks the curve left to right and world_pts stays in order
+    for i in range(len(initial_world_pts) - 2, -1, -1):
         # We start with depth 0
         world_stack.append((initial_world_pts[i], initial_world_pts[i+1], 0))
 
     cdef tuple p1_w, p2_w, p_mid_w
     cdef int depth
     cdef double x1, y1, x2, y2, x_mid, y_mid
-    cdef tuple p1_s, p2_s, p_mid_s # Screen coordinates
+    cdef double s1x, s1y, s2x, s2y # Screen coordinates
+    cdef bint ok1, ok2
+    cdef const double* m = ts.mat()
+    cdef bint is_3d = ts.st.is_3d
 
     # Pre-transform p1_w to screen space for the threshold check
-    p1_s = _trans_pts([initial_world_pts[0]], ts)[0]
-    if p1_s is None:
-        return # Cannot transform the first point, abort.
+    ok1 = _project(m, is_3d, <double>initial_world_pts[0][0], <double>initial_world_pts[0][1], c_z, &s1x, &s1y)
+    if not ok1:
+        return None # Cannot transform the first point, abort.
 
     while world_stack:
         p1_w, p2_w, depth = world_stack.pop()
         
         # Transform the second point to screen space for the threshold check
-        p2_s = _trans_pts([p2_w], ts)[0]
+        ok2 = _project(m, is_3d, <double>p2_w[0], <double>p2_w[1], c_z, &s2x, &s2y)
 
         # Get world coordinates for midpoint calculation
         x1, y1 = p1_w[0], p1_w[1]
@@ -520,12 +1120,12 @@ cpdef void graph(np.ndarray arr, dict ts, object func, double x_min, double x_ma
         if depth >= max_depth:
             subdivide = False
         # 2. Check for steepness / change in line (in screen space)
-        elif p1_s is not None and p2_s is not None:
+        elif ok1 and ok2:
             # Simple check: distance in screen space is too large (more detail needed)
-            screen_dist_sq = (p2_s[0] - p1_s[0])**2 + (p2_s[1] - p1_s[1])**2
+            screen_dist_sq = (s2x - s1x)**2 + (s2y - s1y)**2
             if screen_dist_sq > screen_dist_threshold * screen_dist_threshold:
                 subdivide = True
-        elif p1_s is None or p2_s is None:
+        elif not ok1 or not ok2:
             # If one point is off-screen, it's safer to subdivide up to max_depth
             subdivide = False
         if subdivide:
@@ -538,7 +1138,7 @@ cpdef void graph(np.ndarray arr, dict ts, object func, double x_min, double x_ma
             except Exception:
                 # If function fails, treat as a break, don't subdivide
                 world_pts.append(p2_w)
-                p1_s = p2_s # Prepare for the next segment
+                ok1, s1x, s1y = ok2, s2x, s2y # Prepare for the next segment
                 continue
             # Transform midpoint back to world coordinates
             y_mid = c_y_origin + y_mid_func * y_scale
@@ -552,112 +1152,751 @@ cpdef void graph(np.ndarray arr, dict ts, object func, double x_min, double x_ma
         else:
             # No subdivision needed, add the second point and continue to the next segment
             world_pts.append(p2_w)
-            p1_s = p2_s # Prepare for the next segment
+            ok1, s1x, s1y = ok2, s2x, s2y # Prepare for the next segment
+    return world_pts
+
+cdef np.ndarray _eval_vec(object func, np.ndarray x):
+    """func over a whole x array as float64 (scalars broadcast). If func rejects arrays, falls back to per-sample calls (NaN on errors)."""
+    cdef Py_ssize_t i
+    cdef np.ndarray y
+    # Poles and domain errors (1/x, sqrt(x)) just give inf/NaN samples, silently, like the scalar path
+    with np.errstate(all='ignore'):
+        try:
+            y = np.asarray(func(x), dtype=np.float64)
+            return y if y.ndim == 1 and y.shape[0] == x.shape[0] else np.broadcast_to(y, (x.shape[0],))
+        except Exception:
+            y = np.empty(x.shape[0], dtype=np.float64)
+            for i in range(x.shape[0]):
+                try: y[i] = func(float(x[i]))
+                except Exception: y[i] = NAN
+            return y
+
+cdef tuple _graph_levels(TransformState ts, object func, double x_min, double x_max, int resolution, double y_scale, double x_scale, int max_depth, double screen_dist_threshold, bint x_world):
+    """
+    Vectorized counterpart of _graph_adaptive: evaluates all samples at once, then refines level by level,
+    splitting every flagged interval per pass and evaluating all of its midpoints in one call.
+    Returns (screen, valid) for the refined polyline; non-finite values end up invalid (gaps).
+    """
+    cdef tuple cp = ts.cursor_pos
+    cdef double c_x_offset = <double>cp[0], c_y_origin = <double>cp[1]
+    cdef double c_z = <double>cp[2] if len(cp) == 3 else 0.0
+    cdef double thr_sq = screen_dist_threshold * screen_dist_threshold
+    cdef np.ndarray wx = x_min + np.arange(resolution + 1) * ((x_max - x_min) / resolution)
+    cdef np.ndarray xf, pts, screen, valid, d, idx
+    cdef int depth
+
+    # Initial samples (world x and function-domain x, as in _graph_adaptive)
+    if x_world:
+        xf = (wx - c_x_offset) / x_scale if x_scale != 0 else wx - c_x_offset
+    else:
+        xf = wx; wx = c_x_offset + xf * x_scale
+    pts = np.empty((wx.shape[0], 3), dtype=np.float64)
+    pts[:, 0] = wx; pts[:, 1] = c_y_origin + _eval_vec(func, xf) * y_scale; pts[:, 2] = c_z
+    screen, valid = transform_points(pts, ts)
+
+    for depth in range(max_depth):
+        # Intervals with both ends projectable and too long on screen
+        d = np.diff(screen, axis=0)
+        with np.errstate(invalid='ignore'):
+            idx = np.flatnonzero(valid[:-1] & valid[1:] & ((d * d).sum(axis=1) > thr_sq))
+        if idx.shape[0] == 0:
+            break
+        xf = ((wx[idx] + wx[idx + 1]) / 2.0 - c_x_offset) / x_scale if x_scale != 0 else (wx[idx] + wx[idx + 1]) / 2.0 - c_x_offset
+        pts = np.empty((idx.shape[0], 3), dtype=np.float64)
+        pts[:, 0] = c_x_offset + xf * x_scale; pts[:, 1] = c_y_origin + _eval_vec(func, xf) * y_scale; pts[:, 2] = c_z
+        mid_screen, mid_valid = transform_points(pts, ts)
+        # Splice every midpoint in after its interval's left end
+        wx = np.insert(wx, idx + 1, pts[:, 0])
+        screen = np.insert(screen, idx + 1, mid_screen, axis=0)
+        valid = np.insert(valid, idx + 1, mid_valid)
+    return screen, valid
+
+cdef tuple _ts_key(TransformState ts):
+    """Hashable snapshot of everything that affects where world points land (cursor, mode and composed matrix)."""
+    cdef const double* m = ts.mat()
+    cdef list key = [ts.st.is_3d, ts.cursor_pos]
+    cdef int i
+    for i in range(12):
+        key.append(m[i])
+    return tuple(key)
+
+cdef tuple _ts_view_key(TransformState ts):
+    """_ts_key without the cursor (mode and composed matrix), for drawings that reset the cursor first, like Layer."""
+    cdef const double* m = ts.mat()
+    return (ts.st.is_3d,) + tuple([m[i] for i in range(12)])
+
+cpdef void graph(np.ndarray arr, TransformState ts, object func, double x_min, double x_max, tuple color, int thickness=1, bint aa=True, int resolution=100, double y_scale=1, double x_scale=1, int max_depth=5, double angle_threshold=0.1, double screen_dist_threshold=5.0, bint x_world=False, bint vectorized=False, bint cache=False, object cache_key=None, int version=0):
+    """
+    Plots a 1D function y = f(x) from x_min to x_max using adaptive resolution.
+    - resolution: Serves as the *initial* number of segments.
+    - max_depth: Limits how many times a segment can be subdivided.
+    - angle_threshold: Maximum allowed change in angle (radians) between segments before subdivision.
+    - screen_dist_threshold: Maximum allowed distance (pixels) between screen points before subdivision.
+    - vectorized: func takes and returns NumPy arrays; the samples, then every refinement level, are evaluated in one call.
+    - cache: reuse the refined polyline (GRAPH_CACHE) while func (the same object), version, the parameters, canvas size
+      and transform are unchanged. What func computes is not inspected: bump version when its parameters change, and pass
+      a hashable cache_key instead of func's identity for a lambda rebuilt every frame.
+    """
+    cdef long long t0 = _prof_t0()
+    if x_min >= x_max:
+        _prof_add(P_GRAPH, 0, t0); return
+
+    cdef double t_size = ts.st.size
+    cdef int t = max(1, int(thickness * t_size))
+    cdef tuple key = None
+    cdef list runs
+
+    # Static plots: the refined polyline is reused while nothing it depends on changes
+    if cache:
+        key = (func if cache_key is None else cache_key, version, x_min, x_max, resolution, y_scale, x_scale, max_depth, screen_dist_threshold, x_world, vectorized, 
+               arr.shape[0], arr.shape[1], _ts_key(ts))
+        runs = GRAPH_CACHE.get(key)
+        if runs is not None:
+            if runs:
+                cv2.polylines(arr, runs, False, _color_bgr(color), t, lineType=_lt(aa))
+            _prof_add(P_GRAPH, _run_vertices(runs), t0); return
+    
     # --- Transformation and Drawing (robust) ---
-    cdef list screen_points = _trans_pts(world_pts, ts)
+    cdef np.ndarray screen, valid, ok
+    if vectorized:
+        screen, valid = _graph_levels(ts, func, x_min, x_max, resolution, y_scale, x_scale, max_depth, screen_dist_threshold, x_world)
+    else:
+        world_pts = _graph_adaptive(ts, func, x_min, x_max, resolution, y_scale, x_scale, max_depth, screen_dist_threshold, x_world)
+        if world_pts is None:
+            _prof_add(P_GRAPH, 0, t0); return
+        screen, valid = transform_points(world_pts, ts)
 
-    # Split into continuous segments: remove None, non-finite, and absurdly-large coordinates
-    # but do not connect across gaps — draw each continuous run separately.
+    # Split into continuous segments: drop unprojectable, non-finite, and absurdly-large coordinates
+    # but do not connect across gaps — every continuous run becomes its own contour.
     cdef int W = arr.shape[1]
     cdef int H = arr.shape[0]
-    cdef double px, py
     cdef double margin = 1200.0  # allow some leeway beyond screen for continuity
 
-    cdef list seg = []
-    for p in screen_points:
-        if p is None:
-            # end current segment
-            if len(seg) >= 2:
-                poly_pts = np.array(seg, np.int32).reshape((-1, 1, 2))
-                cv2.polylines(arr, [poly_pts], False, _color_bgr(color), t, lineType=_lt(aa))
-            seg = []
-            continue
+    with np.errstate(invalid='ignore'):
+        ok = valid & (screen[:, 0] >= -margin) & (screen[:, 0] <= W + margin) & (screen[:, 1] >= -margin) & (screen[:, 1] <= H + margin)
 
-        px, py = p[0], p[1]
-        # skip non-finite values
-        if not (np.isfinite(px) and np.isfinite(py)):
-            if len(seg) >= 2:
-                poly_pts = np.array(seg, np.int32).reshape((-1, 1, 2))
-                cv2.polylines(arr, [poly_pts], False, _color_bgr(color), t, lineType=_lt(aa))
-            seg = []
-            continue
+    runs = _split_runs(screen, ok)
+    if cache:
+        GRAPH_CACHE.put(key, runs)
+    if runs:
+        cv2.polylines(arr, runs, False, _color_bgr(color), t, lineType=_lt(aa))
+    _prof_add(P_GRAPH, _run_vertices(runs), t0)
 
-        # skip absurdly large coords which cause long off-screen lines
-        if px < -margin or px > W + margin or py < -margin or py > H + margin:
-            if len(seg) >= 2:
-                poly_pts = np.array(seg, np.int32).reshape((-1, 1, 2))
-                cv2.polylines(arr, [poly_pts], False, _color_bgr(color), t, lineType=_lt(aa))
-            seg = []
+cdef Py_ssize_t _run_vertices(list runs):
+    cdef Py_ssize_t n = 0
+    for r in runs:
+        n += r.shape[0]
+    return n
+
+# MESH: Indexed triangle / quad meshes, projected in one pass, culled with masks and filled far-to-near in fillPoly batches (or depth-tested in one raster pass)
+MESH_CULL = {'back':1, 'front':-1, 'none':0}
+cdef double _MESH_NEAR = 1e-6  # Near plane (depth); vertices closer than this are unprojectable and their faces get clipped
+cdef double _MESH_GUARD = 4096.0  # Faces reaching further off-canvas than this are clipped to it, keeping the edge functions exact
+
+cdef tuple _mesh_project(TransformState ts, np.ndarray v):
+    """
+    (N, 3) vertices, relative to the cursor -> (proj, hom): (N, 3) float64 [screen x, screen y, depth], depth 0 where
+    unprojectable, and the (N, 3) homogeneous [x, y, w] before the divide, which near-plane clipping interpolates.
+    """
+    cdef const double* m = ts.mat()
+    cdef double cz = ts.st.cursor[2] if ts.st.cursor_dim == 3 else 0.0
+    M = np.array([m[i] for i in range(12)], dtype=np.float64).reshape((3, 4))
+    # Cursor offset folded into the translation column, so the vertices are read once
+    M[:, 3] += M[:, 0] * ts.st.cursor[0] + M[:, 1] * ts.st.cursor[1] + M[:, 2] * cz
+    cdef np.ndarray hom = v @ M[:, :3].T
+    hom += M[:, 3]
+    cdef np.ndarray out = hom.copy()
+    w = hom[:, 2]
+    ok = (w > _MESH_NEAR) if ts.st.is_3d else (np.abs(w) > _MESH_NEAR)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[:, 0] /= w; out[:, 1] /= w
+    # 2D has no depth: every face sits at 1, so the stable sort keeps face order
+    out[:, 2] = np.where(ok, w if ts.st.is_3d else 1.0, 0.0)
+    return out, hom
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef np.ndarray _mesh_visible(const double[:, ::1] proj, const Py_ssize_t[:, ::1] f, int W, int H, int sign, bint near_clip):
+    """
+    Per-face mask: 1 draws the face as is (every vertex projectable, winding kept by sign, i.e. shoelace area in y-down
+    screen space, negative = counter-clockwise as displayed, and bounds overlapping the canvas within _MESH_GUARD of it),
+    2 sends it to _mesh_clip (partly behind the near plane when near_clip, or reaching past the guard band), 0 drops it.
+    """
+    cdef Py_ssize_t n = f.shape[0], k_n = f.shape[1], k, i, a, b, behind
+    cdef np.ndarray mask = np.empty(n, dtype=np.uint8)
+    cdef np.uint8_t[::1] m = mask
+    cdef double area, x0, x1, y0, y1
+    with nogil:
+        for k in range(n):
+            behind = 0; area = 0.0
+            x0 = x1 = proj[f[k, 0], 0]; y0 = y1 = proj[f[k, 0], 1]
+            for i in range(k_n):
+                a = f[k, i]; b = f[k, (i + 1) % k_n]
+                if not proj[a, 2] > 0:
+                    behind += 1; continue
+                area += proj[a, 0] * proj[b, 1] - proj[b, 0] * proj[a, 1]
+                x0 = min(x0, proj[a, 0]); x1 = max(x1, proj[a, 0]); y0 = min(y0, proj[a, 1]); y1 = max(y1, proj[a, 1])
+            if behind:
+                m[k] = 2 if near_clip and behind < k_n else 0
+            elif x1 < 0 or x0 >= W or y1 < 0 or y0 >= H:
+                m[k] = 0
+            elif x0 < -_MESH_GUARD or x1 > W + _MESH_GUARD or y0 < -_MESH_GUARD or y1 > H + _MESH_GUARD:
+                m[k] = 2
+            else:
+                m[k] = not sign or area * sign < 0
+    return mask
+
+cdef list _clip_poly(list poly, int axis, double bound, bint keep_above):
+    """Sutherland-Hodgman against one plane: poly is a list of attribute lists, clipped where poly[i][axis] crosses bound."""
+    cdef list out = []
+    cdef Py_ssize_t n = len(poly), i
+    cdef double da, db, t
+    for i in range(n):
+        a = poly[i]; b = poly[(i + 1) % n]
+        da = a[axis] - bound; db = b[axis] - bound
+        if not keep_above:
+            da = -da; db = -db
+        if da >= 0:
+            out.append(a)
+        if (da >= 0) != (db >= 0):
+            t = da / (da - db)
+            out.append([a[j] + (b[j] - a[j]) * t for j in range(len(a))])
+    return out
+
+cdef tuple _mesh_clip(np.ndarray proj, np.ndarray hom, np.ndarray f, np.ndarray faces, int W, int H, int sign, bint near_clip):
+    """
+    Clips the given faces against the near plane (in homogeneous space, before the divide) and the guard band
+    (in screen space, where 1 / depth is linear), culls their winding, and fans them into triangles.
+    Returns ((T, 3, 3) screen triangles, (T,) face index, (T,) mean depth) for the rare faces _mesh_visible marks 2.
+    """
+    cdef list tris = [], owner = [], keys = [], poly
+    cdef double area, G = _MESH_GUARD
+    cdef Py_ssize_t i
+    for k in faces:
+        if near_clip:
+            poly = _clip_poly([[hom[i, 0], hom[i, 1], hom[i, 2]] for i in f[k]], 2, _MESH_NEAR, True)
+            poly = [[x / w, y / w, 1.0 / w] for x, y, w in poly]
+        else:
+            poly = [[proj[i, 0], proj[i, 1], 1.0] for i in f[k]]
+        for axis, bound, above in ((0, -G, True), (0, W + G, False), (1, -G, True), (1, H + G, False)):
+            if len(poly) < 3:
+                break
+            poly = _clip_poly(poly, axis, bound, above)
+        if len(poly) < 3:
+            continue
+        area = 0.0
+        for i in range(len(poly)):
+            area += poly[i][0] * poly[(i + 1) % len(poly)][1] - poly[(i + 1) % len(poly)][0] * poly[i][1]
+        if sign and not area * sign < 0:
             continue
+        if max(p[0] for p in poly) < 0 or min(p[0] for p in poly) >= W or max(p[1] for p in poly) < 0 or min(p[1] for p in poly) >= H:
+            continue
+        pts = [(p[0], p[1], 1.0 / p[2]) for p in poly]
+        for i in range(1, len(pts) - 1):
+            tris.append((pts[0], pts[i], pts[i + 1])); owner.append(k)
+        keys.extend([sum(p[2] for p in pts) / len(pts)] * (len(pts) - 2))
+    return (np.array(tris, dtype=np.float64).reshape((-1, 3, 3)), np.array(owner, dtype=np.intp), np.array(keys, dtype=np.float64))
+
+cdef inline double _edge(double ax, double ay, double bx, double by, double px, double py) noexcept nogil:
+    # Evaluated from the lexicographically smaller end, so both triangles sharing an edge get exactly opposite values
+    if bx < ax or (bx == ax and by < ay):
+        return -((ax - bx) * (py - by) - (ay - by) * (px - bx))
+    return (bx - ax) * (py - ay) - (by - ay) * (px - ax)
+
+cdef inline bint _top_left(double ax, double ay, double bx, double by) noexcept nogil:
+    # Shared edges are owned by exactly one of the two triangles (edges of the positively wound triangle)
+    return (ay == by and bx < ax) or by < ay
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cdef void _raster_tris(np.uint8_t[:, :, ::1] img, float[:, ::1] zbuf, const double[:, :, ::1] tri, const np.uint8_t[:, ::1] bgr, bint depth_test) noexcept nogil:
+    """
+    Fills (T, 3, [x, y, depth]) screen triangles in order, one flat color each. With depth_test, a pixel is only written
+    where 1 / depth (linear in screen space) is >= zbuf, which is then updated; otherwise later triangles simply cover earlier ones.
+    """
+    cdef Py_ssize_t t, a, b
+    cdef int W = img.shape[1], H = img.shape[0], px, py, x0, x1, y0, y1
+    cdef double ax, ay, bx, by, cx, cy, area, e0, e1, e2, cyc, cxc, iw
+    cdef double ia = 0, ib = 0, ic = 0
+    cdef bint t0, t1, t2
+    for t in range(tri.shape[0]):
+        ax = tri[t, 0, 0]; ay = tri[t, 0, 1]
+        # Orient counter-clockwise in edge-function terms, so inside means all edges >= 0
+        area = _edge(ax, ay, tri[t, 1, 0], tri[t, 1, 1], tri[t, 2, 0], tri[t, 2, 1])
+        if area == 0:
+            continue
+        a, b = (1, 2) if area > 0 else (2, 1)
+        bx = tri[t, a, 0]; by = tri[t, a, 1]; cx = tri[t, b, 0]; cy = tri[t, b, 1]
+        area = fabs(area)
+        if depth_test:
+            ia = 1.0 / (tri[t, 0, 2] * area); ib = 1.0 / (tri[t, a, 2] * area); ic = 1.0 / (tri[t, b, 2] * area)
+        t0 = _top_left(bx, by, cx, cy); t1 = _top_left(cx, cy, ax, ay); t2 = _top_left(ax, ay, bx, by)
+        # Pixel centers (px + 0.5, py + 0.5) inside the bounds, clipped to the canvas
+        x0 = max(0, <int>floor(min(ax, min(bx, cx)) - 0.5) + 1); x1 = min(W - 1, <int>floor(max(ax, max(bx, cx)) - 0.5))
+        y0 = max(0, <int>floor(min(ay, min(by, cy)) - 0.5) + 1); y1 = min(H - 1, <int>floor(max(ay, max(by, cy)) - 0.5))
+        for py in range(y0, y1 + 1):
+            cyc = py + 0.5
+            for px in range(x0, x1 + 1):
+                cxc = px + 0.5
+                e0 = _edge(bx, by, cx, cy, cxc, cyc)
+                if e0 < 0 or (e0 == 0 and not t0): continue
+                e1 = _edge(cx, cy, ax, ay, cxc, cyc)
+                if e1 < 0 or (e1 == 0 and not t1): continue
+                e2 = _edge(ax, ay, bx, by, cxc, cyc)
+                if e2 < 0 or (e2 == 0 and not t2): continue
+                if depth_test:
+                    iw = e0 * ia + e1 * ib + e2 * ic
+                    if iw < zbuf[py, px]: continue
+                    zbuf[py, px] = <float>iw
+                img[py, px, 0] = bgr[t, 0]; img[py, px, 1] = bgr[t, 1]; img[py, px, 2] = bgr[t, 2]
+
+cdef np.ndarray _ZBUF = np.zeros((0, 0), dtype=np.float32)
+
+def depth_buffer(arr:np.ndarray) -> np.ndarray:
+    """A cleared depth buffer for arr, to share between mesh(..., zbuffer=buf) calls; clear it with buf[:] = 0 each frame."""
+    return np.zeros((arr.shape[0], arr.shape[1]), dtype=np.float32)
+
+cdef np.ndarray _ZBUF_for(np.ndarray arr):
+    global _ZBUF
+    if _ZBUF.shape[0] != arr.shape[0] or _ZBUF.shape[1] != arr.shape[1]:
+        _ZBUF = depth_buffer(arr)
+    else:
+        _ZBUF.fill(0)
+    return _ZBUF
 
-        # append valid point to current segment
-        seg.append((int(px), int(py)))
-
-    # draw final segment if any
-    if len(seg) >= 2:
-        poly_pts = np.array(seg, np.int32).reshape((-1, 1, 2))
-        cv2.polylines(arr, [poly_pts], False, _color_bgr(color), t, lineType=_lt(aa))
-# BLIT CORE (Optimized: C-level transformation and Homography calculation)
-cdef np.ndarray blit_core(np.ndarray arr, dict ts, np.ndarray src_img, tuple dest_world) noexcept:
-    cdef list screen_points
-    cdef np.ndarray dst_corners
-    cdef np.ndarray src_corners
-    cdef np.ndarray M
-    cdef int W = src_img.shape[1]
-    cdef int H = src_img.shape[0]
+cdef void _raster(np.ndarray arr, np.ndarray zb, np.ndarray tri, np.ndarray bgr):
+    cdef np.uint8_t[:, :, ::1] img = arr
+    cdef float[:, ::1] z = _ZBUF if zb is None else zb
+    cdef const double[:, :, ::1] t = tri
+    cdef const np.uint8_t[:, ::1] c = bgr
+    with nogil:
+        _raster_tris(img, z, t, c, zb is not None)
 
-    # 1. Transform world-space corners to screen pixels
-    # _trans_pts is a cdef function and is used here.
-    screen_points = _trans_pts(list(dest_world), ts)
-    
-    # Check if all points were successfully projected
-    if not all(screen_points):
-        return None # Return None to signal failure/clipping
+cdef DrawList _MESH_DL = None
 
-    # 2. Prepare corner arrays for Homography
-    src_corners = np.float32([[0, 0], [W, 0], [W, H], [0, H]])
-    dst_corners = np.float32(screen_points)
+cdef void _fill_faces(np.ndarray arr, np.ndarray tri, np.ndarray bgr) except *:
+    """
+    Fills (T, 3, [x, y, depth]) screen triangles in order, one flat color each, as poly(fill=True) would: recorded into
+    the active batch when it keeps order, otherwise through a DrawList of its own, flushed straight away.
+    """
+    global _MESH_DL
+    cdef DrawList dl = _batch_for(arr)
+    cdef bint own = dl is None or not dl.strict_order
+    cdef double[:, :, ::1] pts = np.ascontiguousarray(tri[:, :, :2])
+    cdef Py_ssize_t i
+    if own:
+        if _MESH_DL is None:
+            _MESH_DL = DrawList(arr, True)
+        dl = _MESH_DL; dl.arr = arr; dl.clear()
+    # One tuple per distinct color, so runs of same-colored faces hit the DrawList's last-group shortcut
+    uniq, inv = np.unique(bgr, axis=0, return_inverse=True)
+    cdef list colors = [(int(c[2]), int(c[1]), int(c[0])) for c in uniq]
+    cdef long long[::1] ci = inv.reshape(-1).astype(np.int64)
+    for i in range(pts.shape[0]):
+        dl.add(pts[i], colors[ci[i]], 1, True, True, False)
+    if own:
+        dl.flush(); dl.arr = None
+
+cpdef void mesh(np.ndarray arr, TransformState ts, object vertices, object faces, object colors, str cull='back', object zbuffer=None, bint cache=False, int version=0):
+    """
+    Draws an indexed mesh at the cursor: vertices is (N, 3) (or (N, 2)), faces (M, 3) triangles or (M, 4) quads of vertex indices,
+    colors one RGB tuple or an (M, 3) RGB array, one color per face.
+    - cull: 'back' drops faces wound clockwise on screen, 'front' the counter-clockwise ones, 'none' keeps both.
+      Faces partly behind the camera are clipped at the near plane, and faces reaching far off-canvas (a large floor
+      near the camera) are clipped to a guard band around it, so they are drawn in part rather than dropped.
+    - zbuffer: None sorts the faces far-to-near (painter's order) and fills them in cv2.fillPoly batches, like poly();
+      True depth-tests every pixel against a per-call buffer in one nogil raster pass (pixel centers inside a face);
+      an array from depth_buffer(arr) is tested and updated in place, so several meshes in a frame occlude each other.
+    - cache: reuse the projected vertices (MESH_CACHE) while the vertices array object, version and transform are unchanged.
+      The array contents are not rehashed: after editing vertices in place (verts[:] = animated), bump version.
+    arr must be a uint8 BGR C-contiguous canvas.
+    """
+    cdef long long t0 = _prof_t0()
+    cdef int W = arr.shape[1], H = arr.shape[0]
+    cdef int sign = MESH_CULL[cull]
+    cdef np.ndarray proj = None, hom, f, P, order, bgr, vis, idx, cidx, key
+    cdef tuple ck = None
+    if not _is_canvas(arr):
+        raise ValueError("mesh draws into uint8 BGR C-contiguous canvases only")
+    if cache:
+        ck = (id(vertices), np.shape(vertices), version, _ts_key(ts))
+        hit = MESH_CACHE.get(ck)
+        if hit is not None and hit[0] is vertices:proj, hom = hit[1], hit[2]
+    if proj is None:
+        v = np.asarray(vertices, dtype=np.float64)
+        if v.ndim != 2 or v.shape[1] not in (2, 3):
+            raise ValueError(f"mesh expects (N, 2) or (N, 3) vertices, got shape {np.shape(vertices)}")
+        if v.shape[1] == 2:v = np.column_stack((v, np.zeros(v.shape[0])))
+        proj, hom = _mesh_project(ts, v)
+        if cache:MESH_CACHE.put(ck, (vertices, proj, hom))
+
+    f = np.ascontiguousarray(faces, dtype=np.intp)
+    if f.ndim != 2 or f.shape[1] not in (3, 4):
+        raise ValueError(f"mesh expects (M, 3) or (M, 4) faces, got shape {np.shape(faces)}")
+    if f.shape[0] and (f.min() < 0 or f.max() >= proj.shape[0]):
+        raise IndexError(f"mesh face indices must be in [0, {proj.shape[0]})")
+    cols = np.asarray(colors, dtype=np.uint8)
+    bgr = np.broadcast_to(cols.reshape((-1, 3))[:, ::-1], (f.shape[0], 3))
+
+    vis = _mesh_visible(proj, f, W, H, sign, ts.st.is_3d)
+    idx = np.flatnonzero(vis == 1); cidx = np.flatnonzero(vis == 2)
+    if idx.shape[0] == 0 and cidx.shape[0] == 0:
+        _prof_add(P_MESH, 0, t0); return
+    P = proj[f[idx]]; key = P[:, :, 2].mean(axis=1); cols = bgr[idx]
+    if P.shape[1] == 4:
+        # Quads as two triangles (0, 1, 2) and (0, 2, 3), kept adjacent so the painter's order holds
+        P = np.stack((P[:, :3], P[:, [0, 2, 3]]), axis=1).reshape((-1, 3, 3)); cols = np.repeat(cols, 2, axis=0); key = np.repeat(key, 2)
+    if cidx.shape[0]:
+        CP, owner, ckey = _mesh_clip(proj, hom, f, cidx, W, H, sign, ts.st.is_3d)
+        P = np.concatenate((P, CP)); cols = np.concatenate((cols, bgr[owner])); key = np.concatenate((key, ckey))
+    bgr = cols
+
+    zb = None
+    if zbuffer is True:
+        zb = _ZBUF_for(arr)
+    elif zbuffer is not None and zbuffer is not False:
+        zb = zbuffer
+        if zb.shape[0] != H or zb.shape[1] != W or zb.dtype != np.float32:
+            raise ValueError(f"mesh expects a ({H}, {W}) float32 depth buffer (see depth_buffer), got {np.shape(zb)}")
+    if zb is None:
+        # Painter's order: far faces first (stable, so equal depths keep face order and quad halves together)
+        order = np.argsort(-key, kind='stable')
+        _fill_faces(arr, P[order], bgr[order])
+    else:
+        _raster(arr, zb, np.ascontiguousarray(P), np.ascontiguousarray(bgr))
+    _prof_add(P_MESH, (idx.shape[0] + cidx.shape[0]) * f.shape[1], t0)
 
-    # 3. Calculate the transformation matrix
-    M = cv2.getPerspectiveTransform(src_corners, dst_corners)
+# BLIT CORE (Optimized: warp only into the clipped screen bounding box, integer alpha compositing in place)
+cdef tuple blit_core(np.ndarray arr, TransformState ts, np.ndarray src_img, tuple dest_world):
+    """
+    Projects the destination corners and warps src_img into the clipped screen bounding box only.
+    Returns (warped ROI image, x0, y0), or None if a corner cannot be projected or nothing lands on the canvas.
+    Axis-aligned, unscaled placements skip the warp and return a view of src_img.
+    """
+    cdef np.ndarray screen, valid
+    cdef int W = src_img.shape[1], H = src_img.shape[0]
+    cdef int CW = arr.shape[1], CH = arr.shape[0]
+    cdef int ox, oy, x0, y0, x1, y1, i
+    cdef double[:, ::1] s
+    cdef double min_x, max_x, min_y, max_y
+
+    # 1. Transform world-space corners to screen pixels (single batch)
+    screen, valid = transform_points(dest_world, ts)
     
-    # 4. Apply the warp (This part remains OpenCV/C++)
-    return cv2.warpPerspective(src_img, M, (arr.shape[1], arr.shape[0]), flags=cv2.INTER_LINEAR)
+    # Check if all points were successfully projected
+    if not valid.all():
+        return None # Return None to signal failure/clipping
+    s = screen
+
+    # 2. Fast path: the quad is src_img translated (no rotation/scale/perspective), so just clip it
+    if (fabs(s[1, 0] - s[0, 0] - W) < 1e-6 and fabs(s[1, 1] - s[0, 1]) < 1e-6
+            and fabs(s[2, 0] - s[0, 0] - W) < 1e-6 and fabs(s[2, 1] - s[0, 1] - H) < 1e-6
+            and fabs(s[3, 0] - s[0, 0]) < 1e-6 and fabs(s[3, 1] - s[0, 1] - H) < 1e-6):
+        ox = <int>floor(s[0, 0] + 0.5); oy = <int>floor(s[0, 1] + 0.5)
+        x0 = max(ox, 0); y0 = max(oy, 0); x1 = min(ox + W, CW); y1 = min(oy + H, CH)
+        if x0 >= x1 or y0 >= y1:
+            return None
+        return src_img[y0 - oy:y1 - oy, x0 - ox:x1 - ox], x0, y0
+
+    # 3. Bounding box of the projected quad (plus the 1px bilinear border), clipped to the canvas
+    min_x = max_x = s[0, 0]; min_y = max_y = s[0, 1]
+    for i in range(1, 4):
+        min_x = min(min_x, s[i, 0]); max_x = max(max_x, s[i, 0])
+        min_y = min(min_y, s[i, 1]); max_y = max(max_y, s[i, 1])
+    x0 = max(<int>floor(min_x) - 1, 0); y0 = max(<int>floor(min_y) - 1, 0)
+    x1 = min(<int>floor(max_x) + 2, CW); y1 = min(<int>floor(max_y) + 2, CH)
+    if x0 >= x1 or y0 >= y1:
+        return None
+
+    # 4. Homography into ROI coordinates, then warp (This part remains OpenCV/C++)
+    M = cv2.getPerspectiveTransform(np.float32([[0, 0], [W, 0], [W, H], [0, H]]), (screen - (x0, y0)).astype(np.float32))
+    return cv2.warpPerspective(src_img, M, (x1 - x0, y1 - y0), flags=cv2.INTER_LINEAR), x0, y0
+
+# Exact round(v / 255) for v in [0, 255 * 255], no division
+cdef inline unsigned int _div255(unsigned int v) noexcept nogil:
+    v += 128
+    return (v + (v >> 8)) >> 8
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cpdef np.ndarray premultiply(np.ndarray img):
+    """Returns a premultiplied-alpha copy of a uint8 4-channel image (color * alpha / 255, rounded)."""
+    cdef np.ndarray out = np.array(img, dtype=np.uint8, order='C', copy=True)
+    cdef np.uint8_t[:, :, ::1] o = out
+    cdef Py_ssize_t y, x, c
+    cdef unsigned int a
+    with nogil:
+        for y in range(o.shape[0]):
+            for x in range(o.shape[1]):
+                a = o[y, x, 3]
+                if a == 255: continue
+                for c in range(3):
+                    o[y, x, c] = <np.uint8_t>_div255(o[y, x, c] * a)
+    return out
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _blend_premul_rows(np.uint8_t[:, :, :] dst, const np.uint8_t[:, :, :] src, Py_ssize_t y0, Py_ssize_t y1) noexcept nogil:
+    cdef Py_ssize_t y, x, c
+    cdef unsigned int a, inv, v
+    for y in range(y0, y1):
+        for x in range(src.shape[1]):
+            a = src[y, x, 3]
+            if a == 0: continue
+            if a == 255:
+                dst[y, x, 0] = src[y, x, 0]; dst[y, x, 1] = src[y, x, 1]; dst[y, x, 2] = src[y, x, 2]
+                continue
+            inv = 255 - a
+            for c in range(3):
+                v = src[y, x, c] + _div255(dst[y, x, c] * inv)
+                dst[y, x, c] = <np.uint8_t>(v if v < 255 else 255)
+
+cdef void _blend_premul(np.uint8_t[:, :, :] dst, const np.uint8_t[:, :, :] src) noexcept nogil:
+    """In place: dst = src + dst * (255 - alpha) / 255 over the 3 color channels (src premultiplied BGRA, same h/w)."""
+    cdef Py_ssize_t tile, H = src.shape[0], n_tiles = (src.shape[0] + _TILE_ROWS - 1) // _TILE_ROWS
+    cdef int nt = _threads_for(src.shape[0] * src.shape[1])
+    if nt > 1:
+        for tile in prange(n_tiles, num_threads=nt, schedule='static'):
+            _blend_premul_rows(dst, src, tile * _TILE_ROWS, min(H, (tile + 1) * _TILE_ROWS))
+    else:
+        _blend_premul_rows(dst, src, 0, H)
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef void _unblend_rows(const np.uint8_t[:, :, ::1] black, const np.uint8_t[:, :, ::1] white, np.uint8_t[:, :, ::1] out, int[:, ::1] span, Py_ssize_t y0, Py_ssize_t y1) noexcept nogil:
+    cdef Py_ssize_t y, x, c
+    cdef int d, a
+    for y in range(y0, y1):
+        span[y, 0] = -1; span[y, 1] = -1
+        for x in range(black.shape[1]):
+            # Over black: alpha * color / 255; over white the same plus 255 - alpha
+            d = 255
+            for c in range(3):
+                d = min(d, max(0, <int>white[y, x, c] - <int>black[y, x, c]))
+            a = 255 - d
+            for c in range(3):
+                out[y, x, c] = <np.uint8_t>min(<int>black[y, x, c], a)
+            out[y, x, 3] = <np.uint8_t>a
+            if a:
+                if span[y, 0] < 0: span[y, 0] = x
+                span[y, 1] = x + 1
+
+cpdef tuple alpha_from_pair(np.ndarray black, np.ndarray white):
+    """
+    Recovers a premultiplied BGRA image from the same drawing rendered over black and over white (uint8 BGR, C-contiguous).
+    Returns (image, rect) where rect is the (x0, y0, x1, y1) bounds of the nonzero alpha, or None when nothing was drawn.
+    """
+    cdef Py_ssize_t H = black.shape[0], W = black.shape[1], tile, n_tiles = (black.shape[0] + _TILE_ROWS - 1) // _TILE_ROWS
+    cdef np.ndarray out = np.empty((H, W, 4), dtype=np.uint8), spans = np.empty((H, 2), dtype=np.int32)
+    cdef const np.uint8_t[:, :, ::1] b = black
+    cdef const np.uint8_t[:, :, ::1] w = white
+    cdef np.uint8_t[:, :, ::1] o = out
+    cdef int[:, ::1] sp = spans
+    cdef int nt = _threads_for(H * W)
+    with nogil:
+        if nt > 1:
+            for tile in prange(n_tiles, num_threads=nt, schedule='static'):
+                _unblend_rows(b, w, o, sp, tile * _TILE_ROWS, min(H, (tile + 1) * _TILE_ROWS))
+        else:
+            _unblend_rows(b, w, o, sp, 0, H)
+    rows = np.flatnonzero(spans[:, 0] >= 0)
+    if rows.shape[0] == 0:
+        return out, None
+    used = spans[rows]
+    return out, (int(used[:, 0].min()), int(rows[0]), int(used[:, 1].max()), int(rows[-1]) + 1)
+
+cpdef void merge_layer(np.ndarray dst, np.ndarray layer):
+    """Composites a premultiplied BGRA layer (same height / width) over a uint8 canvas, in place."""
+    if layer.shape[0] != dst.shape[0] or layer.shape[1] != dst.shape[1] or layer.shape[2] != 4:
+        raise ValueError(f"merge_layer expects a ({dst.shape[0]}, {dst.shape[1]}, 4) layer, got {np.shape(layer)}")
+    cdef np.uint8_t[:, :, :] d = dst
+    cdef const np.uint8_t[:, :, :] l = layer
+    with nogil:
+        _blend_premul(d, l)
 
 
 # -------------------- PYTHON/LIBRARY WRAPPERS --------------------
 
-import sys, os, time, threading, math, shutil, glob
+import sys, os, time, threading, queue, math, shutil, glob, json, hashlib, importlib, zipfile, zlib, mmap, struct, fnmatch, stat
+from concurrent.futures import ThreadPoolExecutor, Future
+from importlib.machinery import EXTENSION_SUFFIXES
+from collections import OrderedDict, deque
+import csv
 import numpy as np; import cv2
-import pygame; pygame.mixer.init(44100, -16, 2, 512)
-from pynput import keyboard, mouse
+
+# Lazy subsystems: audio (pygame), input (pynput) and fonts (PIL) are imported and started on first use,
+# so importing the module for headless drawing on NumPy arrays stays cheap (see import_time)
+_LAZY_LOCK = threading.RLock()
+class _LazyModule:
+    """Stands in for a module until its first attribute access, which imports it and runs on_load(module) once."""
+    def __init__(self, name:str, on_load = None):self._name = name; self._on_load = on_load; self._mod = None
+    @property
+    def loaded(self) -> bool:return self._mod is not None
+    def _load(self):
+        with _LAZY_LOCK:
+            if self._mod is None:
+                mod = importlib.import_module(self._name)
+                if self._on_load is not None:self._on_load(mod)
+                self._mod = mod
+        return self._mod
+    def __getattr__(self, attr):return getattr(self._mod if self._mod is not None else self._load(), attr)
+def _start_audio(mod):mod.mixer.init(44100, -16, 2, 512)
+pygame = _LazyModule('pygame', _start_audio)
+keyboard = _LazyModule('pynput.keyboard'); mouse = _LazyModule('pynput.mouse')
+ImageFont = _LazyModule('PIL.ImageFont'); ImageDraw = _LazyModule('PIL.ImageDraw'); Image = _LazyModule('PIL.Image')
 
 # NEW FONT CACHE
-FONT_CACHE: Dict[Tuple[str, int], ImageFont.FreeTypeFont] = {}
+FONT_CACHE: Dict[Tuple[str, int], 'ImageFont.FreeTypeFont'] = {}
 
 
 # Globals
 GLOBAL_VOLUME = [1.0]; KEYS = {}; RUN = True
 MOUSE_SCR_POS = (0, 0)
 MOUSE_STATE = {'world_pos':(0.0, 0.0), 'buttons':[False] * 3, 'scroll':0.0}
-TS_STACK = []
 TEXT_FILE_EXTENSIONS = ['.tvf', '.txt', '.json', '.csv', '.md', '.py', '.c', '.pyx', '.tsx']
 
+class LRUCache:
+    """
+    Bounded LRU map. Each entry costs weigh(value) (1 if weigh is None); the least recently used entries
+    are evicted once the total cost exceeds max_cost. hits / misses count get() lookups.
+    """
+    def __init__(self, max_cost:int, weigh = None):
+        self.max_cost = max_cost; self.weigh = weigh; self.cost = 0; self.hits = 0; self.misses = 0; self._d = OrderedDict()
+    def __len__(self):return len(self._d)
+    def __contains__(self, key):return key in self._d
+    def get(self, key):
+        v = self._d.get(key)
+        if v is None:
+            self.misses += 1; return None
+        self._d.move_to_end(key); self.hits += 1
+        return v[0]
+    def put(self, key, value):
+        old = self._d.pop(key, None)
+        if old is not None:self.cost -= old[1]
+        c = self.weigh(value) if self.weigh is not None else 1
+        self._d[key] = (value, c); self.cost += c
+        self.evict()
+        return value
+    def evict(self):
+        """Drops least recently used entries until the cost fits max_cost again."""
+        while self.cost > self.max_cost and len(self._d) > 1:self.cost -= self._d.popitem(last = False)[1][1]
+    def pop(self, key, default = None):
+        old = self._d.pop(key, None)
+        if old is None:return default
+        self.cost -= old[1]; return old[0]
+    def clear(self):self._d.clear(); self.cost = 0; self.hits = 0; self.misses = 0
+    def stats(self) -> dict:return {'entries':len(self._d), 'cost':self.cost, 'max_cost':self.max_cost, 'hits':self.hits, 'misses':self.misses}
+
 # Asset Management
+def _asset_nbytes(v):return v.nbytes if isinstance(v, np.ndarray) else v[1].nbytes
 class AssetManager:
-    """Manages cached assets."""
-    def __init__(self):self.images:Dict[str, np.ndarray] = {}; self.sounds:Dict[str, pygame.mixer.Sound] = {}
+    """
+    Manages cached assets. load_image only registers a path; the image is decoded on first get_img (or earlier, on a
+    prefetch worker) into a byte-bounded LRU (budget), and decoded again if it was evicted. With cache_dir, decoded
+    pixels are also written there as .npy files and memory-mapped (copy-on-write) on later runs, skipping PNG/JPEG decoding.
+    get_img returns the cached array itself, as before: edits made in place are seen by later get_img calls until the
+    image is evicted (add_image the edited array to keep it), and touch(name) refreshes blit_cached's premultiplied copy.
+    A path that fails to load is reported once and not retried until its file changes.
+    Images given directly with add_image are kept outside the LRU, as they cannot be reloaded.
+    """
+    def __init__(self, budget:int = 512 << 20, cache_dir:str = None, workers:int = 4):
+        self.paths:Dict[str, str] = {}; self.pinned:Dict[str, np.ndarray] = {}; self.sounds:Dict[str, 'pygame.mixer.Sound'] = {}
+        self.images = LRUCache(budget, _asset_nbytes)  # name -> decoded image, (name, 'premul') -> (image, premultiplied copy)
+        self.cache_dir = cache_dir; self.workers = workers; self.decodes = 0
+        self.failed:Dict[str, Opt[tuple]] = {}  # path -> (mtime_ns, size) (None if missing) when it last failed to load
+        self._lock = threading.RLock(); self._pending = {}; self._pool = None
     def load_image(self, name:str, path:str):
-        if name in self.images:return
+        if name in self.paths or name in self.pinned:return
+        self.paths[name] = path
+    def add_image(self, name:str, img:np.ndarray):
+        """Registers an in-memory image (never evicted)."""
+        with self._lock:self.pinned[name] = img; self.images.pop(name); self.images.pop((name, 'premul'))
+    def unload(self, name:str):
+        """Forgets an image: its registration, decoded copy and premultiplied copy."""
+        with self._lock:
+            self.paths.pop(name, None); self.pinned.pop(name, None); self.images.pop(name); self.images.pop((name, 'premul'))
+    def set_budget(self, budget:int):
+        with self._lock:self.images.max_cost = budget; self.images.evict()
+    def _cache_path(self, path:str) -> Opt[str]:
+        if self.cache_dir is None:return None
+        st = os.stat(path)
+        key = hashlib.sha1(f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}".encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + '.npy')
+    def _decode(self, name:str, path:str) ->Opt[np.ndarray]:
+        path = resource_path(path)
+        try:st = os.stat(path); stamp = (st.st_mtime_ns, st.st_size)
+        except OSError:stamp = None
+        with self._lock:
+            if path in self.failed and self.failed[path] == stamp:return None
         try:
-            img = cv2.imread(path, cv2.IMREAD_UNCHANGED); self.images[name] = img
-        except Exception as e:print(f"Asset Error loading image '{name}':{e}")
+            npy = self._cache_path(path)
+            if npy is not None and os.path.exists(npy):return np.load(npy, mmap_mode = 'c')
+            img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+            if img is None:raise IOError(f"cannot decode '{path}'")
+            with self._lock:self.decodes += 1
+            if npy is not None:
+                # Written aside and renamed, so a concurrent or interrupted run never maps a partial file
+                os.makedirs(self.cache_dir, exist_ok = True); tmp = f"{npy}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, 'wb') as f:np.save(f, img)
+                os.replace(tmp, npy)
+            with self._lock:self.failed.pop(path, None)
+            return img
+        except Exception as e:
+            with self._lock:self.failed[path] = stamp
+            print(f"Asset Error loading image '{name}':{e}"); return None
+    def _load(self, name:str, path:str) ->Opt[np.ndarray]:
+        img = self._decode(name, path)
+        with self._lock:
+            self._pending.pop(name, None)
+            if img is not None and self.paths.get(name) == path:self.images.put(name, img)
+        return img
+    def prefetch(self, names = None, wait:bool = False):
+        """Decodes registered images (all of them by default) on a thread pool, ahead of their first get_img."""
+        with self._lock:
+            if self._pool is None:self._pool = ThreadPoolExecutor(max_workers = self.workers, thread_name_prefix = 'pygraph-assets')
+            futures = []
+            for name in (self.paths if names is None else names):
+                path = self.paths.get(name)
+                if path is None or name in self.images:continue
+                fut = self._pending.get(name)
+                if fut is None:fut = self._pending[name] = self._pool.submit(self._load, name, path)
+                futures.append(fut)
+        if wait:
+            for fut in futures:fut.result()
+        return futures
     def load_sound(self, name:str, path:str):
         if name in self.sounds:return
-        try:self.sounds[name] = pygame.mixer.Sound(path)
+        try:self.sounds[name] = pygame.mixer.Sound(resource_path(path))
         except Exception as e:print(f"Asset Error loading sound '{name}':{e}")
-    def get_img(self, name:str) ->Opt[np.ndarray]:return self.images.get(name)
-    def get_snd(self, name:str) ->Opt[pygame.mixer.Sound]:return self.sounds.get(name)
+    def get_img(self, name:str, readonly:bool = False) ->Opt[np.ndarray]:
+        """The image registered as name (the cached array, shared by every caller), or a read-only view of it with readonly."""
+        img = self._get_img(name)
+        if readonly and img is not None:img = img.view(); img.setflags(write = False)
+        return img
+    def _get_img(self, name:str) ->Opt[np.ndarray]:
+        img = self.pinned.get(name)
+        if img is not None:return img
+        with self._lock:
+            img = self.images.get(name)
+            if img is not None:return img
+            fut = self._pending.get(name); path = self.paths.get(name)
+        if fut is not None:return fut.result()  # Already decoding on a prefetch worker
+        return None if path is None else self._load(name, path)
+    def touch(self, name:str):
+        """Drops the premultiplied copy of name, after its image was edited in place."""
+        with self._lock:self.images.pop((name, 'premul'))
+    def get_premul(self, name:str) ->Opt[np.ndarray]:
+        """Premultiplied-alpha copy of a uint8 BGRA image, made once (other images are returned as-is)."""
+        img = self._get_img(name)
+        if img is None or img.ndim != 3 or img.shape[2] != 4 or img.dtype != np.uint8:return img
+        with self._lock:
+            hit = self.images.get((name, 'premul'))
+            if hit is None or hit[0] is not img:hit = self.images.put((name, 'premul'), (img, premultiply(img)))  # Rebuilt if the image was replaced
+        return hit[1]
+    def stats(self) -> dict:
+        with self._lock:return dict(self.images.stats(), registered = len(self.paths), pinned = len(self.pinned), pending = len(self._pending), decodes = self.decodes, failed = len(self.failed))
+    def get_snd(self, name:str) ->Opt['pygame.mixer.Sound']:return self.sounds.get(name)
 ASSETS = AssetManager()
 
 # Color definitions (rgb)
@@ -698,18 +1937,15 @@ C = {
 }
 
 # --- Transform State (TS) Management ---
-STATE_KEYS = ['shift', 'rot', 'size', 'cursor_pos', 'full_transform', 'full_transform_inv', 'cam_pos_3d', 'cam_rot_3d', 'is_3d']
-push_state = lambda ts:TS_STACK.append({k:ts[k] for k in STATE_KEYS})
-pop_state = lambda ts:ts.update(TS_STACK.pop()) if TS_STACK else None
-peek_state = lambda ts:ts.update(TS_STACK[-1].copy()) if TS_STACK else None
-set_cam_pos = lambda ts, p:ts.update({'cam_pos_3d':tuple(map(float, p))})
-set_cam_rot = lambda ts, r:ts.update({'cam_rot_3d':tuple(map(float, r))})
-cycle_state = lambda ts:TS_STACK.insert(0, TS_STACK.pop()) if TS_STACK else None
-def set_3d_mode(ts:Dict, is_3d:bool):
-    ts['is_3d'] = is_3d
-    cp = ts['cursor_pos']
-    if is_3d and len(cp) == 2:ts['cursor_pos'] = (cp[0], cp[1], 0.0)
-    elif not is_3d and len(cp) == 3:ts['cursor_pos'] = (cp[0], cp[1])
+# The state stack lives on each TransformState (ts.push()/ts.pop()); these keep the old call style.
+push_state = lambda ts:ts.push()
+pop_state = lambda ts:ts.pop()
+peek_state = lambda ts:ts.peek()
+set_cam_pos = lambda ts, p:ts.set_cam_pos(tuple(map(float, p)))
+set_cam_rot = lambda ts, r:ts.set_cam_rot(tuple(map(float, r)))
+cycle_state = lambda ts:ts.cycle()
+def set_3d_mode(ts:TransformState, is_3d:bool):
+    ts.set_3d_mode(is_3d)
 
 # --- Drawing Primitives Helpers ---
 cpdef tuple set_homography_core(list src_pts, list dst_pts):
@@ -724,7 +1960,7 @@ cpdef tuple set_homography_core(list src_pts, list dst_pts):
     if H is None or H_inv is None:
         return (None, None)
     return (H, H_inv)
-set_homography = lambda ts, src_pts, dst_pts:ts.update(zip(('full_transform', 'full_transform_inv'), set_homography_core(src_pts, dst_pts)))
+set_homography = lambda ts, src_pts, dst_pts:ts.set_homography(src_pts, dst_pts)
 full_transform = set_homography_core 
 
 # --- FONT UTILITIES ---
@@ -739,6 +1975,7 @@ def load_font(font_path_or_name: str, size: int):
         
     # 2. Load if not found
     try:
+        font_path_or_name = resource_path(font_path_or_name)
         if os.path.exists(font_path_or_name):
             font_obj = ImageFont.truetype(font_path_or_name, size)
         else:
@@ -754,11 +1991,16 @@ def load_font(font_path_or_name: str, size: int):
 def text_size(text_content: str, font_info: str, size: float) -> Tuple[int, int]:
     """
     Calculates the width and height of the text block for a given font and size.
-    Returns (width, height) in pixels.
+    Returns (width, height) in pixels. Results are kept in TEXT_METRICS (shared with text()).
     """
     if not text_content:
         return (0, 0)
     
+    cdef tuple key = (text_content, font_info, int(size))
+    wh = TEXT_METRICS.get(key)
+    if wh is not None:
+        return wh
+    
     # Load the font object
     font_obj = load_font(font_info, int(size))
     
@@ -769,133 +2011,212 @@ def text_size(text_content: str, font_info: str, size: float) -> Tuple[int, int]
     width = bbox[2] - bbox[0]
     height = bbox[3] - bbox[1]
     
-    return width, height
+    return TEXT_METRICS.put(key, (width, height))
+
+# --- TEXT CACHES ---
+TEXT_SPRITES = LRUCache(32 << 20, lambda v:v[0].nbytes)  # (content, font, effective size, color) -> (premultiplied BGRA, text_h); cost in bytes
+TEXT_METRICS = LRUCache(8192)  # (content, font, int size) -> (width, height)
+GRAPH_CACHE = LRUCache(16 << 20, lambda runs:sum(r.nbytes for r in runs))  # graph(cache=True) key -> refined int32 polyline runs; cost in bytes
+MESH_CACHE = LRUCache(64 << 20, lambda e:e[1].nbytes + e[2].nbytes)  # (vertex array id, version, transform) -> (vertex array, projected, homogeneous); cost in bytes
+
+class GlyphAtlas:
+    """
+    Alpha bitmaps of single glyphs for one (font, size), rendered once with PIL. Strings are composed from them
+    with NumPy slicing (pen advance per glyph, no kerning), so changing strings such as counters skip PIL entirely.
+    """
+    def __init__(self, font_info:str, size:int):
+        self.font = load_font(font_info, size); self.glyphs:Dict[str, tuple] = {}
+    def glyph(self, ch:str) -> tuple:
+        """(bitmap or None, left, top, right, bottom, advance); the box is relative to the pen position."""
+        g = self.glyphs.get(ch)
+        if g is None:
+            l, t, r, b = self.font.getbbox(ch); bm = None
+            if r > l and b > t:
+                img = Image.new('L', (r - l, b - t), 0)
+                ImageDraw.Draw(img).text((-l, -t), ch, font = self.font, fill = 255)
+                bm = np.array(img)
+            g = self.glyphs[ch] = (bm, l, t, r, b, self.font.getlength(ch))
+        return g
+    def render(self, content:str, color:Tuple) -> Tuple[Opt[np.ndarray], int]:
+        """Premultiplied BGRA sprite laid out and cropped like text()'s PIL path, and its text_h (None if blank)."""
+        cdef double pen = 0.0
+        cdef int gx, gy, x0, y0, x1, y1
+        placed = []
+        for ch in content:
+            g = self.glyph(ch)
+            if g[0] is not None:placed.append((int(round(pen)), g))
+            pen += g[5]
+        if not placed:
+            return None, 0
+        w = max(x + g[3] for x, g in placed) - min(x + g[1] for x, g in placed)
+        h = max(g[4] for _, g in placed) - min(g[2] for _, g in placed)
+        alpha = np.zeros((h + 1, w + 1), dtype = np.uint8)
+        for x, g in placed:
+            bm = g[0]; gx = x + g[1]; gy = g[2]
+            x0 = max(gx, 0); y0 = max(gy, 0); x1 = min(gx + bm.shape[1], w + 1); y1 = min(gy + bm.shape[0], h + 1)
+            if x0 < x1 and y0 < y1:
+                np.maximum(alpha[y0:y1, x0:x1], bm[y0 - gy:y1 - gy, x0 - gx:x1 - gx], out = alpha[y0:y1, x0:x1])
+        sprite = np.empty((h + 1, w + 1, 4), dtype = np.uint8); sprite[:, :, 3] = alpha
+        a16 = alpha.astype(np.uint16)
+        for c in range(3):
+            v = a16 * color[c] + 128; sprite[:, :, c] = (v + (v >> 8)) >> 8  # round(alpha * color / 255)
+        return sprite, h
+GLYPH_ATLASES = LRUCache(16)  # (font, effective size) -> GlyphAtlas; bounded so zooming text does not keep one per pixel size
 
 
 # Missing Drawing Primitives (Python Wrappers)
 
 # Original OpenCV text function (renamed and made internal)
-cpdef void _text_cv2(np.ndarray arr, dict ts, tuple p_scr, content:str, color:Tuple, scale:float, thickness:int, bgr_color:Tuple, aa:bool = False):
+cpdef void _text_cv2(np.ndarray arr, TransformState ts, tuple p_scr, content:str, color:Tuple, scale:float, thickness:int, bgr_color:Tuple, aa:bool = False):
     cdef double x_scr = <double>p_scr[0]
     cdef double y_scr = <double>p_scr[1]
     
-    final_scale = scale * ts['size'] * 0.5 
-    final_thickness = max(1, int(thickness * ts['size'] * 0.5))
+    final_scale = scale * ts.st.size * 0.5 
+    final_thickness = max(1, int(thickness * ts.st.size * 0.5))
     
     cv2.putText(arr, content, (int(x_scr), int(y_scr)),
         cv2.FONT_HERSHEY_SIMPLEX, final_scale, bgr_color, final_thickness, 
         lineType=_lt(aa))
 
 # NEW Public TEXT Function (Supports Custom Fonts via PIL)
-def text(arr:np.ndarray, ts:Dict, content:str, font_info:str, size:float, color:Tuple, thickness:int = 1, aa:bool = True):
+def text(arr:np.ndarray, ts:TransformState, content:str, font_info:str, size:float, color:Tuple, thickness:int = 1, aa:bool = True, atlas:bool = False):
     """
     Renders text at cursor_pos using a specified font. 
     If font_info is 'CV2', it uses OpenCV's default font.
     Otherwise, it uses Pillow (PIL) for custom font rendering and blits the result.
+    Rendered sprites are cached in TEXT_SPRITES; atlas=True composes single-line text from the font's GlyphAtlas
+    instead (for strings that change every frame and would only churn the sprite cache).
     The size is scaled by ts['size'].
     """
+    cdef long long t0 = _prof_t0()
     cdef double x_scr, y_scr
     
     # Get screen position (C-typed for speed)
-    x_scr, y_scr = transform(ts['cursor_pos'], ts)
+    screen, valid = transform_points(ts.cursor_pos, ts)
     
-    if np.isinf(x_scr):
-        return
+    if not valid[0]:
+        _prof_add(P_TEXT, 0, t0); return
+    x_scr, y_scr = screen[0, 0], screen[0, 1]
         
     bgr_color = _color_bgr(color)
     
     if font_info.upper() == 'CV2':
         # Use the Cythonized OpenCV default text function
         _text_cv2(arr, ts, (x_scr, y_scr), content, color, size, thickness, bgr_color, aa)
-        return
+        _prof_add(P_TEXT, 1, t0); return
 
     # --- Custom Font Rendering via PIL ---
     
     # Calculate effective font size and thickness
-    font_scale = <double>ts['size']
+    font_scale = ts.st.size
     effective_size = int(size * font_scale)
     
     if effective_size < 1:
-        return
-
-    # Load font and determine size
-    font_obj = load_font(font_info, effective_size)
-    
-    # Determine the dimensions needed for the text image
-    text_w, text_h = text_size(content, font_info, effective_size)
-    
-    # Create a transparent Pillow image (RGBA)
-    text_img_pil = Image.new('RGBA', (text_w + 1, text_h + 1), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(text_img_pil)
+        _prof_add(P_TEXT, 0, t0); return
+
+    if atlas and '\n' not in content:
+        glyphs = GLYPH_ATLASES.get((font_info, effective_size))
+        if glyphs is None:glyphs = GlyphAtlas(font_info, effective_size); GLYPH_ATLASES.put((font_info, effective_size), glyphs)
+        text_img_cv, text_h = glyphs.render(content, color)
+        if text_img_cv is None:
+            _prof_add(P_TEXT, 0, t0); return
+    else:
+        key = (content, font_info, effective_size, color)
+        hit = TEXT_SPRITES.get(key)
+        if hit is None:
+            # Load font and determine size
+            font_obj = load_font(font_info, effective_size)
+            
+            # Determine the dimensions needed for the text image
+            text_w, text_h = text_size(content, font_info, effective_size)
+            
+            # Create a transparent Pillow image (RGBA)
+            text_img_pil = Image.new('RGBA', (text_w + 1, text_h + 1), (0, 0, 0, 0))
+            draw = ImageDraw.Draw(text_img_pil)
 
-    # Draw the text onto the PIL image
-    draw.text((0, 0), content, font=font_obj, fill=color + (255,))
-    
-    # Convert the PIL image to OpenCV BGR + Alpha format
-    text_img_cv = np.array(text_img_pil)
+            # Draw the text onto the PIL image
+            draw.text((0, 0), content, font=font_obj, fill=color + (255,))
+            
+            # Convert the PIL image to OpenCV BGR + Alpha format (premultiplied once, here)
+            hit = TEXT_SPRITES.put(key, (premultiply(np.array(text_img_pil)), text_h))
+        text_img_cv, text_h = hit
     
     # Use the existing blit logic for projection and blending
-    # Create a temporary transformation state to place the text image
-    ts_temp = ts.copy()
-    # Adjust Y position (Pillow uses top-left, we want the text to start at cursor_pos)
-    ts_temp['cursor_pos'] = (ts['cursor_pos'][0], ts['cursor_pos'][1] - text_h / font_scale) 
-    
-    blit(arr, ts_temp, text_img_cv, (1.0 / font_scale, 1.0 / font_scale))
+    # Adjust Y position (Pillow uses top-left, we want the text to start at cursor_pos), restored afterwards
+    cp = ts.cursor_pos
+    ts.set_pos_raw((cp[0], cp[1] - text_h / font_scale) + cp[2:])
+    try:
+        blit(arr, ts, text_img_cv, (1.0 / font_scale, 1.0 / font_scale), premultiplied = True)
+    finally:
+        ts.set_pos_raw(cp)
+    _prof_add(P_TEXT, 4, t0)
 
 
-def blit(arr:np.ndarray, ts:Dict, src_img:np.ndarray, scale_factor:Tuple):
+def blit(arr:np.ndarray, ts:TransformState, src_img:np.ndarray, scale_factor:Tuple | float, premultiplied:bool = False):
     """
     Draws an image (src_img) at cursor_pos, applying current transformations (rot, size, shift).
-    The core logic (transforming corners, perspective warp) is Cythonized.
+    scale_factor is (sx, sy) or a single uniform scale (as written by TVF 'blit' commands).
+    premultiplied=True means a 4-channel src_img already holds premultiplied alpha (see ASSETS.get_premul).
+    The core logic (transforming corners, ROI warp, alpha compositing) is Cythonized.
     """
+    cdef long long t0 = _prof_t0()
     cdef int W = src_img.shape[1]
     cdef int H = src_img.shape[0]
+    if not isinstance(scale_factor, tuple):scale_factor = (scale_factor, scale_factor)
     cdef double sx = <double>scale_factor[0]
     cdef double sy = <double>scale_factor[1]
+    cdef bint fixed_point = src_img.dtype == np.uint8 and arr.dtype == np.uint8
+    cdef np.uint8_t[:, :, :] roi_v
+    cdef const np.uint8_t[:, :, :] warped_v
     
     # Get the image anchor point (cursor_pos)
-    cp = ts['cursor_pos']
+    cp = ts.cursor_pos
     
-    # Calculate destination corners in world space, scaled by scale_factor
+    # Calculate destination corners in world space, scaled by scale_factor (all on the cursor's z plane)
+    cz = (cp[2],) if len(cp) == 3 else ()
     dest_world = (
-        cp,
-        (cp[0] + W * sx, cp[1]),
-        (cp[0] + W * sx, cp[1] + H * sy),
-        (cp[0], cp[1] + H * sy),
+        (cp[0], cp[1]) + cz,
+        (cp[0] + W * sx, cp[1]) + cz,
+        (cp[0] + W * sx, cp[1] + H * sy) + cz,
+        (cp[0], cp[1] + H * sy) + cz,
     )
     
+    # Premultiply before warping, so interpolated edge pixels blend without dark fringes
+    if src_img.shape[2] == 4 and fixed_point and not premultiplied:
+        src_img = premultiply(src_img)
+
     # Call the Cython core function
-    warped_img = blit_core(arr, ts, src_img, dest_world)
+    res = blit_core(arr, ts, src_img, dest_world)
 
-    if warped_img is None:
-        return # Transformation failed (e.g., clipped in 3D)
+    if res is None:
+        _prof_add(P_BLIT, 0, t0); return # Transformation failed (e.g., clipped in 3D) or off-canvas
+    warped_img, x0, y0 = res
+    roi = arr[y0:y0 + warped_img.shape[0], x0:x0 + warped_img.shape[1]]
     
-    # Blit logic to handle alpha (if the source image has 4 channels)
+    # Blit logic to handle alpha (if the source image has 4 channels), limited to the ROI
     if src_img.shape[2] == 4:
-        # Split channels: BGR and Alpha (OpenCV operations remain fast)
-        b, g, r, a = cv2.split(warped_img)
-        alpha_mask = a / 255.0
-        
-        # BGR destination for the alpha mask
-        alpha_mask_3ch = cv2.merge([alpha_mask, alpha_mask, alpha_mask])
-        
-        # Extract the BGR part of the warped image
-        bgr_warped = cv2.merge([b, g, r])
-        
-        # Alpha blending: (Source * Alpha) + (Dest * (1 - Alpha))
-        arr[:, :] = arr * (1.0 - alpha_mask_3ch) + bgr_warped * alpha_mask_3ch
-        arr[:, :] = np.uint8(arr)
+        if fixed_point:
+            # Integer blend in place: Source (premultiplied) + Dest * (255 - Alpha) / 255
+            roi_v = roi; warped_v = warped_img
+            with nogil:
+                _blend_premul(roi_v, warped_v)
+        else:
+            alpha_mask_3ch = warped_img[:, :, 3:4] / 255.0
+            roi[:] = roi * (1.0 - alpha_mask_3ch) + warped_img[:, :, :3] * alpha_mask_3ch
     else:
         # No alpha, just combine (simple overlay)
-        arr[warped_img != 0] = warped_img[warped_img != 0]
+        mask = warped_img != 0
+        roi[mask] = warped_img[mask]
+    _prof_add(P_BLIT, 4, t0)
 
-def blit_cached(arr:np.ndarray, ts:Dict, asset_name:str, scale_factor:Tuple):
+def blit_cached(arr:np.ndarray, ts:TransformState, asset_name:str, scale_factor:Tuple | float):
     """
-    Same as blit, but loads the image from the ASSETS manager.
+    Same as blit, but loads the image (premultiplied once, if it has alpha) from the ASSETS manager.
+    After editing a loaded image in place (ASSETS.get_img returns the cached array), call ASSETS.touch(asset_name).
     """
-    src_img = ASSETS.get_img(asset_name)
+    src_img = ASSETS.get_premul(asset_name)
     if src_img is not None:
-        blit(arr, ts, src_img, scale_factor)
+        blit(arr, ts, src_img, scale_factor, premultiplied = True)
     else:
         print(f"Error:Cached image '{asset_name}' not found.")
 
@@ -905,51 +2226,191 @@ quad = lambda arr, ts, d1, d2, d3, * a, ** kw:poly(arr, ts, (d1, d2, d3), * a, *
 
 # --- Transform Utilities ---
 # set_homography uses the set_homography_core function
-set_homography = lambda ts, src_pts, dst_pts:ts.update(zip(('full_transform', 'full_transform_inv'), set_homography_core(src_pts, dst_pts)))
-# Standard setters / getters
-move = lambda ts, xy:ts.__setitem__('cursor_pos', add_tuples(ts['cursor_pos'], xy + (0.0, ) * (len(ts['cursor_pos']) - len(xy))))
-shift = lambda ts, xy:ts.__setitem__('shift', add_tuples(ts['shift'], xy + (0.0, ) * (len(ts['shift']) - len(xy))))
-set_shift = lambda ts, xy:ts.__setitem__('shift', xy + (0.0, ) * (len(ts['shift']) - len(xy)))
-scale = lambda ts, ds:ts.__setitem__('size', ts['size'] + ds)
-set_size = lambda ts, ds:ts.__setitem__('size', ds)
-rotate = lambda ts, dr:ts.__setitem__('rot', ts['rot'] + dr)
-set_rotate = lambda ts, dr:ts.__setitem__('rot', dr)
-def set_pos(ts:Dict, xy:Tuple):
-    ts['cursor_pos'] = (xy[0], xy[1], xy[2]) if ts['is_3d'] and len(xy) == 3 else (xy[0], xy[1], 0.0) if ts['is_3d'] else (xy[0], xy[1])
+set_homography = lambda ts, src_pts, dst_pts:ts.set_homography(src_pts, dst_pts)
+# Standard setters / getters (each one invalidates the cached matrix only if it affects it)
+move = lambda ts, xy:ts.move(tuple(xy))
+shift = lambda ts, xy:ts.shift_by(tuple(xy))
+set_shift = lambda ts, xy:ts.set_shift(tuple(xy))
+scale = lambda ts, ds:ts.scale(ds)
+set_size = lambda ts, ds:ts.set_size(ds)
+rotate = lambda ts, dr:ts.rotate(dr)
+set_rotate = lambda ts, dr:ts.set_rotate(dr)
+def set_pos(ts:TransformState, xy:Tuple):
+    ts.set_pos(tuple(xy))
 
 # --- Utilities and Command Parsing  --
 # Simplified for size, relies on base Python types now
-array_to_str = lambda arr:f'{arr.dtype.name}, {arr.shape}, {arr.tobytes().hex()}'
+array_to_str = lambda arr:f'{arr.dtype.name}, {str(arr.shape).replace(" ", "")}, {arr.tobytes().hex()}'  # No spaces in the shape, so it splits as one field
 str_to_array = lambda s:np.frombuffer(bytes.fromhex(s.split(', ')[2]), dtype = s.split(', ')[0]).reshape(eval(s.split(', ')[1]))
-# draw_command_convert and draw_command
-def draw_command_convert(arr, ts, cmd_str:str, info:str | int):
-    TC = {0:lambda x:x.lower() in ('true', '1', 't'), 1:int, 2:float, 3:lambda s:eval(f'({s.strip()})'), 10:str_to_array, 11:str}
-    # UPDATED SYNTAX FOR TEXT: [text, content, font_info, size, color, thickness, aa]
-    SYNTAX = {'tri':[3, 3, 1, 1, 0, 0], 'line':[3, 1, 1, 0], 'rect':[3, 1, 1, 0, 0], 'circle':[2, 1, 1, 0, 0, 2], 'clear':[3], 'move':[3], 'blit':[10, 2], 'blit_c':[11, 2], 'quad':[3, 3, 3, 1, 1, 0, 0], 'text':[11, 11, 2, 3, 1, 0], 'push_state':[], 'pop_state':[], 'set_size':[2], 'set_rotate':[2], 'set_shift':[3], 'set_cam_pos':[3], 'set_cam_rot':[3], 'set_3d_mode':[0], 'set_pos':[3], 'shift':[3], 'rotate':[2], 'scale':[2]}
-    cmds = [c.strip() for c in cmd_str.split(', ')]; name = cmds[0]; exp_types = SYNTAX.get(name)
+# Argument converters and command signatures (built once, shared by draw_command and the TVF compiler)
+TVF_TC = {0:lambda x:x.lower() in ('true', '1', 't'), 1:int, 2:float, 3:lambda s:eval(f'({s.strip()})'), 10:str_to_array, 11:str}
+# UPDATED SYNTAX FOR TEXT: [text, content, font_info, size, color, thickness, aa]
+TVF_SYNTAX = {'tri':[3, 3, 1, 1, 0, 0], 'line':[3, 1, 1, 0], 'rect':[3, 1, 1, 0, 0], 'circle':[2, 1, 1, 0, 0, 2], 'clear':[3], 'move':[3], 'blit':[10, 2], 'blit_c':[11, 2], 'quad':[3, 3, 3, 1, 1, 0, 0], 'text':[11, 11, 2, 3, 1, 0], 'push_state':[], 'pop_state':[], 'set_size':[2], 'set_rotate':[2], 'set_shift':[3], 'set_cam_pos':[3], 'set_cam_rot':[3], 'set_3d_mode':[0], 'set_pos':[3], 'shift':[3], 'rotate':[2], 'scale':[2]}
+TVF_ARR_FUNCS = (clear, line, rect, circle, poly, blit, blit_cached, text)  # Commands that draw (called with arr)
+def _parse_command(cmd_str:str, info:str | int):
+    """Splits and converts one command line. Returns (name, args) or None (after printing the error)."""
+    cmds = [c.strip() for c in cmd_str.split(', ')]; name = cmds[0]; exp_types = TVF_SYNTAX.get(name)
+    if exp_types is not None and 10 in exp_types and len(cmds[1:]) == len(exp_types) + 2 * exp_types.count(10):
+        # An embedded array_to_str value ('dtype, shape, hex') itself spans three ', '-separated fields
+        fields = iter(cmds[1:]); cmds = cmds[:1] + [', '.join([f, next(fields), next(fields)]) if t_int == 10 else f for f, t_int in zip(fields, exp_types)]
     if exp_types is None or len(cmds[1:]) != len(exp_types):
         return print(f"Error @ {info}:Cmd '{name}' {'unknown' if exp_types is None else f'expects {len(exp_types)} args, got {len(cmds[1:])}'}.")
-    func = sys.modules[__name__].__dict__.get(name); result = [func]
+    args = []
     for arg, t_int in zip(cmds[1:], exp_types):
-        try:result.append(TC[t_int](arg.strip()))
+        try:args.append(TVF_TC[t_int](arg.strip()))
         except Exception as e:return print(f"Error @ {info}:Arg '{arg}' for '{name}' failed:{e}")
-    return result
+    return name, args
+# draw_command_convert and draw_command
+def draw_command_convert(arr, ts, cmd_str:str, info:str | int):
+    parsed = _parse_command(cmd_str, info)
+    if parsed is None:return
+    return [globals().get(parsed[0])] + parsed[1]
 def draw_command(arr, ts, cmd_str:str, info:str | int = 'Direct Call'):
     result = draw_command_convert(arr, ts, cmd_str, info)
     if result is None:return
     func, * args = result
     try:
-        if func in [clear, line, rect, circle, poly, blit, blit_cached, text]:func(arr, ts, * args)
+        if func in TVF_ARR_FUNCS:func(arr, ts, * args)
         else:func(ts, * args)
     except Exception as e:print(f"Execution Error @ {info}:{e} in {func.__name__}(...)")
-def draw_tvf(arr, ts, file_name:str):
-    tvf_path = file_name + ".tvf"
-    try:
+
+# --- TVF Compiler: a .tvf is parsed once into opcodes + typed argument arrays and replayed without parsing ---
+TVF_OPS = tuple(TVF_SYNTAX)  # opcode -> command name
+TVF_OPCODES = {name:i for i, name in enumerate(TVF_OPS)}
+# Argument kinds (TVFProgram.args[:, 0]); numbers and number tuples live in the float64 pool, the rest in strs/imgs
+K_BOOL, K_INT, K_FLOAT, K_ITUP, K_FTUP, K_STR, K_IMG, K_EXPR = range(8)
+TVFC_VERSION = 1
+TVF_CACHE: Dict[str, Tuple[Tuple[int, int], 'TVFProgram']] = {}  # .tvf path -> ((mtime_ns, size), program)
+
+class TVFProgram:
+    """
+    A compiled .tvf: one opcode per command, arguments as (kind, offset, length) rows into typed pools.
+    ops (n,) int16 | lines (n,) int32 source line | cmds (n + 1,) int32 offsets into args
+    args (k, 3) int32 | vals (v,) float64 | strs: list of str | imgs: list of decoded images
+    """
+    def __init__(self, path:str, ops, lines, cmds, args, vals, strs:list, imgs:list):
+        self.path = path; self.ops = ops; self.lines = lines; self.cmds = cmds; self.args = args
+        self.vals = vals; self.strs = strs; self.imgs = imgs; self._calls = None
+    def __len__(self):return self.ops.shape[0]
+
+    @staticmethod
+    def compile(tvf_path:str) -> 'TVFProgram':
+        ops, lines, cmds, args, vals, strs, imgs = [], [], [0], [], [], [], []
         with open(tvf_path, 'r') as file:
             for i, line in enumerate(file, 1):
                 cmd = line.strip()
-                if cmd and not cmd.startswith('#'):draw_command(arr, ts, cmd, f"TVF '{tvf_path}' line {i}")
-    except Exception as e:print(f"Error reading TVF '{tvf_path}':{e}")
+                if not cmd or cmd.startswith('#'):continue
+                parsed = _parse_command(cmd, f"TVF '{tvf_path}' line {i}")
+                if parsed is None:continue
+                if globals().get(parsed[0]) is None:
+                    print(f"Error @ TVF '{tvf_path}' line {i}:Cmd '{parsed[0]}' has no function."); continue
+                for v in parsed[1]:_encode_arg(v, args, vals, strs, imgs)
+                ops.append(TVF_OPCODES[parsed[0]]); lines.append(i); cmds.append(len(args))
+        return TVFProgram(tvf_path, np.array(ops, dtype=np.int16), np.array(lines, dtype=np.int32), np.array(cmds, dtype=np.int32), 
+                          np.array(args, dtype=np.int32).reshape(-1, 3), np.array(vals, dtype=np.float64), strs, imgs)
+
+    def calls(self) -> list:
+        """Binds opcodes to functions and decodes the arguments once; [(func, takes_arr, args, line), ...]."""
+        if self._calls is None:
+            g = globals(); vals = self.vals; calls = []
+            for c in range(self.ops.shape[0]):
+                func = g[TVF_OPS[self.ops[c]]]
+                args = tuple(_decode_arg(int(k), int(o), int(n), vals, self.strs, self.imgs) for k, o, n in self.args[self.cmds[c]:self.cmds[c + 1]])
+                calls.append((func, func in TVF_ARR_FUNCS, args, int(self.lines[c])))
+            self._calls = calls
+        return self._calls
+
+    def run(self, arr, ts):
+        """Executor: replays the program on arr/ts, same semantics (and error reporting) as draw_command."""
+        for func, takes_arr, args, line in self.calls():
+            try:
+                if takes_arr:func(arr, ts, * args)
+                else:func(ts, * args)
+            except Exception as e:print(f"Execution Error @ TVF '{self.path}' line {line}:{e} in {func.__name__}(...)")
+
+    def save(self, tvfc_path:str, stamp:Tuple[int, int]):
+        """
+        Writes the program as a single uint8 .npy: 8-byte header length, JSON header, then 64-byte aligned sections,
+        so load() can memory-map it and view every array in place.
+        """
+        arrays = {'ops':self.ops, 'lines':self.lines, 'cmds':self.cmds, 'args':self.args, 'vals':self.vals}
+        arrays.update({f'img{i}':np.ascontiguousarray(img) for i, img in enumerate(self.imgs)})
+        sections, off = {}, 0
+        for name, a in arrays.items():
+            sections[name] = [off, a.dtype.str, list(a.shape)]; off += -(-a.nbytes // 64) * 64
+        header = json.dumps({'version':TVFC_VERSION, 'stamp':list(stamp), 'strs':self.strs, 'n_imgs':len(self.imgs), 'sections':sections}).encode()
+        base = -(-(8 + len(header)) // 64) * 64
+        blob = np.zeros(base + off, dtype=np.uint8)
+        blob[:8] = np.frombuffer(np.uint64(len(header)).tobytes(), dtype=np.uint8); blob[8:8 + len(header)] = np.frombuffer(header, dtype=np.uint8)
+        for name, a in arrays.items():
+            o = base + sections[name][0]; blob[o:o + a.nbytes] = np.frombuffer(a.tobytes(), dtype=np.uint8)
+        # Written aside and renamed, so load() never maps a sidecar cut short by a crash or a concurrent writer
+        tmp = f"{tvfc_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:np.save(f, blob)
+            os.replace(tmp, tvfc_path)
+        except OSError as e:
+            print(f"Error writing TVFC '{tvfc_path}':{e}")
+            if os.path.exists(tmp):os.remove(tmp)
+
+    @staticmethod
+    def load(tvfc_path:str, tvf_path:str, stamp:Tuple[int, int]) -> Opt['TVFProgram']:
+        """Memory-maps a .tvfc sidecar; None if it is missing, unreadable or was compiled from a different source stamp."""
+        try:
+            blob = np.load(tvfc_path, mmap_mode='r')
+            n = int(np.frombuffer(blob[:8].tobytes(), dtype=np.uint64)[0]); header = json.loads(blob[8:8 + n].tobytes())
+            if header['version'] != TVFC_VERSION or tuple(header['stamp']) != tuple(stamp):return None
+            base = -(-(8 + n) // 64) * 64; a = {}
+            for name, (o, dtype, shape) in header['sections'].items():
+                dt = np.dtype(dtype); size = dt.itemsize * int(np.prod(shape))
+                a[name] = blob[base + o:base + o + size].view(dt).reshape(shape)
+            return TVFProgram(tvf_path, a['ops'], a['lines'], a['cmds'], a['args'], a['vals'], header['strs'], 
+                              [a[f'img{i}'] for i in range(header['n_imgs'])])
+        except Exception:return None
+
+def _encode_arg(v, list args, list vals, list strs, list imgs):
+    if isinstance(v, np.ndarray):args.append((K_IMG, len(imgs), 0)); imgs.append(v)
+    elif isinstance(v, str):args.append((K_STR, len(strs), 0)); strs.append(v)
+    elif isinstance(v, bool):args.append((K_BOOL, len(vals), 1)); vals.append(float(v))
+    elif isinstance(v, int):args.append((K_INT, len(vals), 1)); vals.append(float(v))
+    elif isinstance(v, float):args.append((K_FLOAT, len(vals), 1)); vals.append(v)
+    elif isinstance(v, tuple) and all(type(x) is int for x in v):args.append((K_ITUP, len(vals), len(v))); vals.extend(map(float, v))
+    elif isinstance(v, tuple) and all(type(x) in (int, float) for x in v):args.append((K_FTUP, len(vals), len(v))); vals.extend(map(float, v))
+    else:args.append((K_EXPR, len(strs), 0)); strs.append(repr(v))  # Anything else round-trips through its repr
+
+def _decode_arg(int kind, int o, int n, vals, list strs, list imgs):
+    if kind == K_BOOL:return bool(vals[o])
+    if kind == K_INT:return int(vals[o])
+    if kind == K_FLOAT:return float(vals[o])
+    if kind == K_ITUP:return tuple(int(x) for x in vals[o:o + n])
+    if kind == K_FTUP:return tuple(float(x) for x in vals[o:o + n])
+    if kind == K_STR:return strs[o]
+    if kind == K_IMG:return imgs[o]
+    return eval(strs[o])
+
+compile_tvf = TVFProgram.compile
+def load_tvf(file_name:str, sidecar:bool = False) -> Opt[TVFProgram]:
+    """
+    Returns the compiled program for file_name + '.tvf', cached in memory by path and mtime.
+    With sidecar=True a file_name + '.tvfc' is memory-mapped when current, or (re)written after compiling.
+    """
+    tvf_path = resource_path(file_name + ".tvf"); tvfc_path = resource_path(file_name + ".tvfc")
+    try:
+        st = os.stat(tvf_path); stamp = (st.st_mtime_ns, st.st_size)
+        hit = TVF_CACHE.get(tvf_path)
+        if hit is not None and hit[0] == stamp:return hit[1]
+        prog = TVFProgram.load(tvfc_path, tvf_path, stamp) if sidecar else None
+        if prog is None:prog = TVFProgram.compile(tvf_path)
+        else:sidecar = False
+    except Exception as e:return print(f"Error reading TVF '{tvf_path}':{e}")
+    # save() only reports a sidecar it cannot write (read-only directory), which costs a recompile on the next run;
+    # a bundled one resolves into the shared extraction cache, which must never be overwritten
+    if sidecar and tvfc_path == file_name + ".tvfc":prog.save(tvfc_path, stamp)
+    TVF_CACHE[tvf_path] = (stamp, prog)
+    return prog
+def draw_tvf(arr, ts, file_name:str, sidecar:bool = False):
+    prog = load_tvf(file_name, sidecar)
+    if prog is not None:prog.run(arr, ts)
 
 # --- Input Handling ---
 def on_press(key):
@@ -1020,15 +2481,260 @@ def get_window_size(window_name:str) -> Tuple[int, int]:
         return rect[2], rect[3]
     return -1, -1
 
+# --- Profiler (opt-in frame and primitive timings) ---
+class Profiler:
+    """
+    Per-frame phase timings (perf_counter_ns) recorded by run(), plus per-primitive call / vertex / time counters
+    for every drawing primitive (PROF_PRIMS). Off by default: PROFILER.enable() to record,
+    PROFILER.show_overlay = True to draw the numbers on the canvas. Export with to_json / to_csv.
+    """
+    PHASES = ('clear', 'tick', 'present', 'waitkey', 'sleep', 'total')
+    def __init__(self, max_frames:int = 1000):
+        self.enabled = False; self.show_overlay = False; self.frames = deque(maxlen = max_frames); self.frame_index = 0
+    def enable(self, on:bool = True, overlay:bool = None):
+        global _PROF
+        self.enabled = _PROF = bool(on)
+        if overlay is not None:self.show_overlay = overlay
+    def reset(self):
+        cdef int p
+        self.frames.clear(); self.frame_index = 0
+        for p in range(P_COUNT):
+            _PROF_CALLS[p] = 0; _PROF_VERTS[p] = 0; _PROF_NS[p] = 0
+    def add_frame(self, * phase_ns):
+        """Records one frame: ns spent in each of PHASES (run() calls this while enabled)."""
+        self.frames.append((self.frame_index,) + phase_ns); self.frame_index += 1
+    def primitives(self) -> Dict[str, dict]:
+        """{name:{'calls', 'vertices', 'ns'}} accumulated since the last reset()."""
+        cdef int p
+        return {PROF_PRIMS[p]:{'calls':_PROF_CALLS[p], 'vertices':_PROF_VERTS[p], 'ns':_PROF_NS[p]} for p in range(P_COUNT)}
+    def summary(self) -> dict:
+        """Mean / max ms per phase over the recorded frames, fps from the mean total, and the primitive counters."""
+        out = {'frames':len(self.frames), 'phases':{}, 'primitives':self.primitives()}
+        if self.frames:
+            a = np.array(self.frames, dtype = np.int64)[:, 1:] / 1e6
+            out['phases'] = {ph:{'mean_ms':float(a[:, i].mean()), 'max_ms':float(a[:, i].max())} for i, ph in enumerate(self.PHASES)}
+            out['fps'] = 1000.0 / out['phases']['total']['mean_ms'] if out['phases']['total']['mean_ms'] > 0 else 0.0
+        return out
+    def to_json(self, path:str = None) -> str:
+        s = json.dumps({'summary':self.summary(), 'frames':[dict(zip(('frame',) + tuple(f'{ph}_ns' for ph in self.PHASES), f)) for f in self.frames]}, indent = 1)
+        if path is not None:
+            with open(path, 'w') as f:f.write(s)
+        return s
+    def to_csv(self, path:str, primitives:bool = False):
+        """One row per recorded frame (ns per phase), or with primitives=True one row per primitive."""
+        with open(path, 'w', newline = '') as f:
+            w = csv.writer(f)
+            if primitives:
+                w.writerow(('primitive', 'calls', 'vertices', 'ns'))
+                for name, c in self.primitives().items():w.writerow((name, c['calls'], c['vertices'], c['ns']))
+            else:
+                w.writerow(('frame',) + tuple(f'{ph}_ns' for ph in self.PHASES)); w.writerows(self.frames)
+    def draw_overlay(self, arr:np.ndarray):
+        """Last frame's phases and the busiest primitives, in screen space at the top-left corner."""
+        if not self.frames:return
+        f = self.frames[-1]
+        lines = [f"frame {f[6] / 1e6:.2f}ms  " + "  ".join(f"{ph} {f[i + 1] / 1e6:.2f}" for i, ph in enumerate(self.PHASES[:5]))]
+        prims = sorted(self.primitives().items(), key = lambda kv:-kv[1]['ns'])
+        lines += [f"{n}: {c['calls']} calls {c['vertices']} v {c['ns'] / 1e6:.1f}ms" for n, c in prims if c['calls']][:4]
+        for i, l in enumerate(lines):
+            cv2.putText(arr, l, (6, 16 + 16 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.42, (0, 0, 0), 3, cv2.LINE_AA)
+            cv2.putText(arr, l, (6, 16 + 16 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.42, (255, 255, 255), 1, cv2.LINE_AA)
+PROFILER = Profiler()
+
+# --- Frame Sinks (headless output, called on the writer thread) ---
+class FrameSink:
+    """Receives finished frames in order. The frame buffer is reused once write() returns, so copy it to keep it."""
+    def write(self, frame:np.ndarray, index:int):pass
+    def close(self):pass
+class CallbackSink(FrameSink):
+    """In-memory output: fn(frame, index) per frame."""
+    def __init__(self, fn):self.fn = fn
+    def write(self, frame:np.ndarray, index:int):self.fn(frame, index)
+class PNGSequenceSink(FrameSink):
+    """Numbered images: pattern.format(index), e.g. 'out/frame_{:06d}.png' (directory created on demand)."""
+    def __init__(self, pattern:str, params:list = None):
+        self.pattern = pattern; self.params = params or []
+        d = os.path.dirname(pattern.format(0))
+        if d:os.makedirs(d, exist_ok = True)
+    def write(self, frame:np.ndarray, index:int):cv2.imwrite(self.pattern.format(index), frame, self.params)
+class VideoSink(FrameSink):
+    """cv2.VideoWriter output, opened on the first frame (its size sets the video size)."""
+    def __init__(self, path:str, fps:float = 60.0, fourcc:str = 'mp4v'):self.path = path; self.fps = fps; self.fourcc = fourcc; self.writer = None
+    def write(self, frame:np.ndarray, index:int):
+        if self.writer is None:
+            self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(* self.fourcc), self.fps, (frame.shape[1], frame.shape[0]))
+        self.writer.write(frame)
+    def close(self):
+        if self.writer is not None:self.writer.release(); self.writer = None
+def make_sink(sink) -> FrameSink:
+    """FrameSink as-is; a callable -> CallbackSink; a '.png' pattern -> PNGSequenceSink; any other path -> VideoSink."""
+    if isinstance(sink, FrameSink):return sink
+    if callable(sink):return CallbackSink(sink)
+    if isinstance(sink, str):return PNGSequenceSink(sink) if sink.lower().endswith('.png') else VideoSink(sink)
+    raise TypeError(f"Unsupported sink {sink!r}")
+
+class FramePipeline:
+    """
+    Hands finished canvases to a sink on a background writer thread. Canvases come from a fixed pool of
+    depth + 1 preallocated buffers; acquire() blocks only when the writer is depth frames behind.
+    The first exception the sink raises stops the output: later frames are dropped, and acquire(), submit() and
+    close() re-raise it.
+    """
+    def __init__(self, sink:FrameSink, shape:tuple, depth:int = 3):
+        self.sink = sink; self.error = None
+        self.pool = [np.empty(shape, dtype = np.uint8) for _ in range(depth + 1)]; self._pooled = {id(c) for c in self.pool}
+        self.free = queue.Queue(); self.pending = queue.Queue(maxsize = depth)
+        for c in self.pool:self.free.put(c)
+        self.thread = threading.Thread(target = self._work, daemon = True); self.thread.start()
+    def check(self):
+        if self.error is not None:raise self.error
+    def acquire(self) -> np.ndarray:
+        self.check(); canvas = self.free.get(); self.check()
+        return canvas
+    def release(self, canvas:np.ndarray):
+        if id(canvas) in self._pooled:self.free.put(canvas)
+    def submit(self, frame:np.ndarray, index:int):self.check(); self.pending.put((frame, index))
+    def _work(self):
+        while True:
+            item = self.pending.get()
+            if item is None:break
+            try:
+                if self.error is None:self.sink.write(* item)
+            except Exception as e:self.error = e
+            finally:self.release(item[0])
+    def close(self, check:bool = True):
+        """Drains the queue, stops the writer and closes the sink, then re-raises the sink's error (unless check=False)."""
+        self.pending.put(None); self.thread.join()
+        try:self.sink.close()
+        except Exception as e:
+            if self.error is None:self.error = e
+        if check:self.check()
+
+# --- Layers (cached parts of the scene, recomposited only where they changed) ---
+def _merge_rects(rects:list, int max_rects) -> list:
+    """Merges overlapping (x0, y0, x1, y1) rectangles; more than max_rects left collapse into their union."""
+    rects = [r for r in rects if r is not None and r[2] > r[0] and r[3] > r[1]]
+    merged = True
+    while merged:
+        merged = False; out = []
+        for r in rects:
+            for i, o in enumerate(out):
+                if r[0] <= o[2] and o[0] <= r[2] and r[1] <= o[3] and o[1] <= r[3]:
+                    out[i] = (min(r[0], o[0]), min(r[1], o[1]), max(r[2], o[2]), max(r[3], o[3])); merged = True; break
+            else:out.append(r)
+        rects = out
+    if len(rects) > max_rects:
+        rects = [(min(r[0] for r in rects), min(r[1] for r in rects), max(r[2] for r in rects), max(r[3] for r in rects))]
+    return rects
+
+def _changed_rect(np.ndarray a, np.ndarray b):
+    """Bounds (x0, y0, x1, y1) of the pixels where two same-sized uint8 images differ, or None."""
+    cdef int C = a.shape[2] if a.ndim == 3 else 1
+    x, y, w, h = cv2.boundingRect(cv2.absdiff(a, b).reshape((a.shape[0], -1)))  # Columns are counted in bytes
+    return None if w == 0 else (x // C, y, (x + w + C - 1) // C, y + h)
+
+class Layer:
+    """
+    A separately cached part of the scene. draw(canvas, ts) renders it off-screen and is only called again after
+    invalidate() or when the transform it is drawn with changes (the frame's, or its own). draw should be
+    deterministic: a transparent layer is drawn over black and over white, and the two give its premultiplied BGRA image.
+    - ts: None follows the frame's TransformState (draw gets a copy, with the cursor at the origin; moving the cursor does
+      not re-render the layer, only changing the transform does); a TransformState pins the layer to it (e.g. a HUD), and
+      any change to that state, cursor included, re-renders it.
+    - opaque: the layer covers the whole frame over bg_color (a background); it is drawn once and copied, not blended.
+    - region: (x, y, w, h) screen rectangle the layer is confined to. Its canvases are only that big (the transform is
+      shifted to match, so it must not use a homography), which keeps frequently invalidated layers cheap.
+    """
+    def __init__(self, draw, ts:TransformState = None, opaque:bool = False, bg_color:Tuple = (0, 0, 0), region:Tuple = None, name:str = None):
+        self.draw = draw; self.ts = ts; self.opaque = opaque; self.bg_color = bg_color; self.region = region
+        self.name = name or getattr(draw, '__name__', 'layer')
+        self.visible = True; self.dirty = True; self.renders = 0
+        self.image = None   # Premultiplied BGRA, or BGR when opaque, covering the region (the whole frame by default)
+        self.rect = None    # Bounds of the drawn content in frame pixels (x0, y0, x1, y1)
+        self._key = None; self._size = None; self._origin_xy = (0, 0); self._shown = False; self._black = None; self._white = None
+    def invalidate(self):self.dirty = True
+    def needs_render(self, ts:TransformState, size:Tuple[int, int]) -> bool:
+        if self.dirty or self.image is None or self._size != size:return True
+        return self._key != (_ts_view_key(ts) if self.ts is None else _ts_key(self.ts))
+    def _origin(self, size:Tuple[int, int]) -> tuple:
+        """(x, y, w, h) of the layer's canvas in the frame: its region clipped to the frame, or the whole frame."""
+        if self.region is None:return 0, 0, size[0], size[1]
+        x, y = max(0, int(self.region[0])), max(0, int(self.region[1]))
+        return x, y, max(0, min(size[0], int(self.region[0] + self.region[2])) - x), max(0, min(size[1], int(self.region[1] + self.region[3])) - y)
+    def render(self, ts:TransformState, size:Tuple[int, int]):
+        """Redraws the layer for a (W, H) frame. Returns the rectangle that changed (old and new content), or None."""
+        x, y, w, h = self._origin(size)
+        src = (ts if self.ts is None else self.ts).copy()
+        # Layers following the frame start at the origin, so wherever the tick left the cursor does not re-render them
+        if self.ts is None:src.set_pos((0.0, 0.0, 0.0))
+        if x or y:src.set_shift((src.shift[0] - x, src.shift[1] - y))
+        old = self.rect
+        if self.opaque:
+            self.image = np.empty((h, w, 3), dtype = np.uint8); clear(self.image, src, self.bg_color); self.draw(self.image, src)
+            self.rect = (x, y, x + w, y + h) if w and h else None
+        else:
+            if self._black is None or self._black.shape[0] != h or self._black.shape[1] != w:
+                self._black = np.empty((h, w, 3), dtype = np.uint8); self._white = np.empty((h, w, 3), dtype = np.uint8)
+            self._black.fill(0); self._white.fill(255)
+            self.draw(self._black, src.copy()); self.draw(self._white, src)
+            self.image, r = alpha_from_pair(self._black, self._white)
+            self.rect = None if r is None else (r[0] + x, r[1] + y, r[2] + x, r[3] + y)
+        self._origin_xy = (x, y); self._size = size
+        self._key = _ts_view_key(ts) if self.ts is None else _ts_key(self.ts)
+        self.dirty = False; self.renders += 1
+        if old is None:return self.rect
+        return old if self.rect is None else (min(old[0], self.rect[0]), min(old[1], self.rect[1]), max(old[2], self.rect[2]), max(old[3], self.rect[3]))
+
+class LayerStack:
+    """
+    Composites Layers, in order, over bg_color into a cached frame. compose() re-renders only the layers that need it
+    and recomposites only the rectangles they changed, which it returns (nothing is redone for a static scene).
+    """
+    def __init__(self, layers = (), bg_color:Tuple = (0, 0, 0), max_rects:int = 8):
+        self.layers = list(layers); self.bg_color = bg_color; self.max_rects = max_rects
+        self.frame = None; self._pending = []
+    def add(self, layer:Layer) -> Layer:self.layers.append(layer); return layer
+    def remove(self, layer:Layer):self.layers.remove(layer); self._pending.append(layer.rect if layer._shown else None); layer._shown = False
+    def invalidate(self):
+        """Re-renders every layer and recomposites the whole frame on the next compose()."""
+        for layer in self.layers:layer.invalidate()
+        self.frame = None
+    def compose(self, ts:TransformState, size:Tuple[int, int]) -> list:
+        """Brings frame up to date for a (W, H) canvas and returns the changed (x0, y0, x1, y1) rectangles."""
+        W, H = size
+        full = self.frame is None or self.frame.shape[1] != W or self.frame.shape[0] != H
+        if full:self.frame = np.empty((H, W, 3), dtype = np.uint8)
+        rects = self._pending; self._pending = []
+        for layer in self.layers:
+            if layer.visible and layer.needs_render(ts, size):rects.append(layer.render(ts, size))
+            if layer.visible != layer._shown:rects.append(layer.rect); layer._shown = layer.visible
+        rects = [(0, 0, W, H)] if full else _merge_rects(rects, self.max_rects)
+        bg = _color_bgr(self.bg_color)
+        for x0, y0, x1, y1 in rects:
+            dst = self.frame[y0:y1, x0:x1]; dst[:] = bg
+            for layer in self.layers:
+                r = layer.rect
+                if not layer.visible or r is None or r[0] >= x1 or r[2] <= x0 or r[1] >= y1 or r[3] <= y0:continue
+                # Overlap of the rectangle and the layer's content, in frame and in layer coordinates
+                ax, ay, bx, by = max(x0, r[0]), max(y0, r[1]), min(x1, r[2]), min(y1, r[3]); ox, oy = layer._origin_xy
+                sub, src = dst[ay - y0:by - y0, ax - x0:bx - x0], layer.image[ay - oy:by - oy, ax - ox:bx - ox]
+                if layer.opaque:sub[:] = src
+                else:merge_layer(sub, src)
+        return rects
+
 # --- Setup and Run ---
 _get_win_props = lambda wi:wi if isinstance(wi, tuple) and len(wi) == 2 else ((600, 400), "PyGraph Window")
 convert_win_info = lambda wi:_get_win_props(wi)[1]
 
-def init(window_info, bg_color):
+def init(window_info, bg_color, backend:str = 'window'):
+    """Creates the canvas and transform state. backend='offscreen' skips the window and the input listeners."""
     (W, H), w_name = _get_win_props(window_info)
+    canvas = np.full((H, W, 3), _color_bgr(bg_color), dtype = np.uint8)
+    ts = TransformState(shift = (W / 2, H / 2))
+    if backend == 'offscreen':
+        return canvas, ts
     cv2.namedWindow(w_name, cv2.WINDOW_NORMAL | cv2.WINDOW_KEEPRATIO)
     cv2.resizeWindow(w_name, W, H)
-    canvas = np.full((H, W, 3), _color_bgr(bg_color), dtype = np.uint8)
     if not hasattr(init, 'listeners_started'):
         # Create and start pynput listeners properly. Creating the Listener object
         # alone does not start it; we must call .start() so it runs in background.
@@ -1052,103 +2758,597 @@ def init(window_info, bg_color):
         except Exception as e:
             print(f"Warning: failed to start input listeners: {e}")
         init.listeners_started = True
-    ts = {'rot':0.0, 'size':1.0, 'shift':(W / 2, H / 2), 'cursor_pos':(0.0, 0.0), 'full_transform':None, 'full_transform_inv':None, 
-    'cam_pos_3d':(0.0, 0.0, -10.0), 'cam_rot_3d':(0.0, 0.0, 0.0), 'is_3d':False}
     return canvas, ts
-def run(tick_function, window_info, bg_color, target_fps = 60, dynamic_resize = False):
-    w_name = convert_win_info(window_info); canvas, ts = init(window_info, bg_color)
-    bg_color_t = _color_bgr(bg_color); global RUN; target_fps += 1.5
-    frame_duration, last_frame_time = 1.0 / target_fps, time.time()
-    while RUN:
-        start_time = time.time(); 
-        # --- Dynamic Resize Logic ---
-        if dynamic_resize:
-            current_W, current_H = get_window_size(w_name)
-            if current_W != canvas.shape[1] or current_H != canvas.shape[0]:
-                if current_W > 0 and current_H > 0:
-                    print(f"Resizing canvas to ({current_W}, {current_H})")
-                    canvas = np.full((current_H, current_W, 3), bg_color_t, dtype = np.uint8)
-                    ts['shift'] = (current_W / 2, current_H / 2)
+def run(tick_function, window_info, bg_color, target_fps = 60, dynamic_resize = False, backend:str = 'window', sink = None, max_frames:int = None, queue_depth:int = 3, layers = None, dirty_rects:bool = False):
+    """
+    Runs tick_function(canvas, ts) every frame until it returns False (or (False, canvas)), ESC / window close,
+    or max_frames. target_fps=None runs uncapped.
+    backend='offscreen' renders headless (no window, no input listeners). sink (FrameSink, callable, '.png' pattern
+    or video path, see make_sink) receives every frame on a background writer thread through a bounded queue of
+    queue_depth reusable canvases; dynamic_resize is ignored then, as the output size is fixed.
+    layers (a LayerStack, or a list of Layers over bg_color) replaces the per-frame clear: the cached composite is
+    copied in and the tick draws the dynamic part on top. With dirty_rects, the canvas keeps its pixels between
+    frames and only the rectangles the stack recomposited, plus the bounds of whatever the previous frame drew over
+    the composite, are copied; finding those bounds compares the frame with the composite once, so dirty_rects pays
+    off when the tick draws little outside its layers (it is ignored with a sink, whose canvases rotate).
+    Returns the number of frames rendered. An exception raised by the sink (or, offscreen, by the tick) stops the
+    loop and is re-raised here; in a window, tick errors are printed and end the loop.
+    """
+    cdef bint offscreen = backend == 'offscreen'
+    global RUN
+    RUN = True  # A previous run() may have ended by clearing it
+    w_name = convert_win_info(window_info); canvas, ts = init(window_info, bg_color, backend)
+    bg_color_t = _color_bgr(bg_color)
+    frame_duration = 1.0 / (target_fps + 1.5) if target_fps else 0.0
+    pipe = FramePipeline(make_sink(sink), canvas.shape, queue_depth) if sink is not None else None
+    stack = layers if layers is None or isinstance(layers, LayerStack) else LayerStack(layers, bg_color)
+    synced = None   # The canvas that already holds the composite, for dirty-rectangle updates
+    drawn = None    # Bounds of what the last frame drew over the composite (tick, overlay), restored before the next tick
+    last_frame_time = perf_counter_ns(); frames = 0
+    try:
+        while RUN and (max_frames is None or frames < max_frames):
+            start_time = perf_counter_ns()
+            # --- Dynamic Resize Logic ---
+            if dynamic_resize and not offscreen and pipe is None:
+                current_W, current_H = get_window_size(w_name)
+                if current_W != canvas.shape[1] or current_H != canvas.shape[0]:
+                    if current_W > 0 and current_H > 0:
+                        print(f"Resizing canvas to ({current_W}, {current_H})")
+                        canvas = np.full((current_H, current_W, 3), bg_color_t, dtype = np.uint8)
+                        ts.set_shift((current_W / 2, current_H / 2))
+                    else:
+                        RUN = False
+                        break
+
+            if pipe is not None:canvas = pipe.acquire()
+            t_clear = perf_counter_ns()
+            if stack is None:
+                clear(canvas, ts, bg_color_t) 
+            else:
+                rects = stack.compose(ts, (canvas.shape[1], canvas.shape[0]))
+                if dirty_rects and pipe is None and synced is canvas:
+                    if drawn is not None:rects = _merge_rects(rects + [drawn], stack.max_rects)
+                    for x0, y0, x1, y1 in rects:canvas[y0:y1, x0:x1] = stack.frame[y0:y1, x0:x1]
                 else:
-                    RUN = False
-                    break
-
-        clear(canvas, ts, bg_color_t) 
-        try:
-            result = tick_function(canvas, ts) 
-            if isinstance(result, tuple) and len(result) == 2:RUN, canvas = result
-            elif result is False:RUN = False
-        except Exception as e:print(f"Error in tick function:{e}"); RUN = False 
-        cv2.imshow(w_name, canvas)
-        if cv2.waitKey(1) == 27 or cv2.getWindowProperty(w_name, cv2.WND_PROP_VISIBLE) < 1:RUN = False
-        elapsed = time.time() - start_time; time.sleep(max(0, frame_duration - elapsed))
-        delta = time.time() - last_frame_time; fps = 1.0 / delta if delta > 0 else target_fps
-        cv2.setWindowTitle(w_name, f"{w_name} | FPS:{fps:.2f}"); last_frame_time = time.time()
-    cv2.destroyAllWindows()
+                    np.copyto(canvas, stack.frame); synced = canvas
+            frame = canvas
+            t_tick = perf_counter_ns()
+            try:
+                result = tick_function(canvas, ts) 
+                if isinstance(result, tuple) and len(result) == 2:RUN, frame = result
+                elif result is False:RUN = False
+            except Exception as e:
+                if offscreen:raise  # Headless jobs must not end with silently truncated output
+                print(f"Error in tick function:{e}"); RUN = False 
+            if _AUDIO is not None:_AUDIO.sync_volume()
+            t_present = perf_counter_ns()
+            if PROFILER.show_overlay and PROFILER.enabled:PROFILER.draw_overlay(frame)
+            if stack is not None and dirty_rects and pipe is None:
+                drawn = _changed_rect(frame, stack.frame) if frame is canvas and frame.shape == stack.frame.shape else None
+            if not offscreen:cv2.imshow(w_name, frame)
+            if pipe is not None:
+                if frame is not canvas:pipe.release(canvas)
+                pipe.submit(frame, frames)
+            elif frame is not canvas:canvas = frame
+            t_wait = perf_counter_ns()
+            if not offscreen and (cv2.waitKey(1) == 27 or cv2.getWindowProperty(w_name, cv2.WND_PROP_VISIBLE) < 1):RUN = False
+            t_sleep = perf_counter_ns()
+            if frame_duration:time.sleep(max(0, frame_duration - (t_sleep - start_time) / 1e9))
+            end_time = perf_counter_ns(); frames += 1
+            if PROFILER.enabled:
+                # present includes waiting for a free pipeline canvas
+                PROFILER.add_frame(t_tick - t_clear, t_present - t_tick, t_wait - t_present + t_clear - start_time, t_sleep - t_wait, end_time - t_sleep, end_time - start_time)
+            if not offscreen:
+                delta = (end_time - last_frame_time) / 1e9; fps = 1.0 / delta if delta > 0 else (target_fps or 0.0)
+                cv2.setWindowTitle(w_name, f"{w_name} | FPS:{fps:.2f}")
+            last_frame_time = end_time
+    except BaseException:
+        if pipe is not None:pipe.close(check = False)
+        if not offscreen:cv2.destroyAllWindows()
+        raise
+    if pipe is not None:pipe.close()
+    if not offscreen:cv2.destroyAllWindows()
+    return frames
+
+# --- Benchmarks (headless, fixed synthetic scenes) ---
+def _bench_scene(name:str, int n, rng):
+    """Returns (tick(arr, ts), is_3d, primitives per frame) for one synthetic scene."""
+    is_3d = name.endswith('3d')
+    if name.startswith('circles'):
+        pts = rng.uniform(-300, 300, (n, 3)); pts[:, 2] = rng.uniform(0, 2, n) if is_3d else 0
+        cols = [tuple(int(v) for v in c) for c in rng.integers(0, 256, (n, 3))]
+        def tick(arr, ts):
+            for i in range(n):
+                ts.set_pos(tuple(pts[i])); circle(arr, ts, 6.0, cols[i], 1)
+        return tick, is_3d, n
+    if name.startswith('sprites'):
+        spr = rng.integers(0, 256, (32, 32, 4), dtype = np.uint8); spr[:, :, 3] = np.linspace(0, 255, 32, dtype = np.uint8)[None, :]
+        ASSETS.add_image('_bench_sprite', spr)
+        pts = rng.uniform(-300, 300, (n, 3)); pts[:, 2] = rng.uniform(0, 2, n) if is_3d else 0
+        rots = rng.uniform(0, 360, n)
+        def tick(arr, ts):
+            for i in range(n):
+                ts.set_pos(tuple(pts[i])); ts.set_rotate(rots[i]); blit_cached(arr, ts, '_bench_sprite', (1.0, 1.0))
+            ts.set_rotate(0.0)
+        return tick, is_3d, n
+    if name.startswith('graphs'):
+        phases = rng.uniform(0, 6.28, n)
+        funcs = [(lambda p:lambda x:math.sin(x + p) * 2.0)(p) for p in phases]
+        def tick(arr, ts):
+            for i in range(n):
+                ts.set_pos((0.0, -200.0 + 400.0 * i / max(1, n - 1), i / max(1, n - 1))); graph(arr, ts, funcs[i], -6.0, 6.0, (255, 255, 255), 1, x_scale = 50.0, y_scale = 20.0)
+        return tick, is_3d, n
+    if name.startswith('mesh'):
+        # UV sphere of ~n triangles (flattened in z, which the default camera maps to depth 10..30), one color per face
+        rings = max(2, int(math.sqrt(n / 5.0))); segs = max(3, n // (2 * rings))
+        th, ph = np.meshgrid(np.linspace(0, math.pi, rings + 1), np.linspace(0, 2 * math.pi, segs, endpoint = False), indexing = 'ij')
+        verts = np.stack((300 * np.sin(th) * np.cos(ph), 300 * np.cos(th), np.sin(th) * np.sin(ph) + 1.0), -1).reshape((-1, 3))
+        i, j = np.arange(rings)[:, None], np.arange(segs)[None, :]
+        a, b, c, d = i * segs + j, i * segs + (j + 1) % segs, (i + 1) * segs + j, (i + 1) * segs + (j + 1) % segs
+        faces = np.concatenate((np.stack((a, b, d), -1).reshape((-1, 3)), np.stack((a, d, c), -1).reshape((-1, 3))))
+        cols = rng.integers(0, 256, (faces.shape[0], 3), dtype = np.uint8)
+        def tick(arr, ts):
+            ts.set_pos((0.0, 0.0, 0.0)); mesh(arr, ts, verts, faces, cols, cull = 'none', zbuffer = True)
+        return tick, is_3d, faces.shape[0]
+    raise ValueError(f"Unknown benchmark scene '{name}'")
+
+BENCH_SCENES = {'circles_2d':2000, 'circles_3d':2000, 'sprites_2d':300, 'sprites_3d':300, 'graphs_2d':20, 'graphs_3d':20, 'mesh_3d':50000}
+IMPORT_BUDGET_MS = 150.0  # Cold 'import _pygraph_core' in a fresh interpreter (numpy and cv2 take most of it)
+LAZY_MODULES = ('pygame', 'pynput', 'PIL', 'setuptools', 'Cython')  # Must not be imported by the import itself
+def import_time(runs:int = 3, budget_ms:float = None) -> dict:
+    """
+    Times a cold import of this module in fresh interpreters (best of runs) and lists any LAZY_MODULES it pulled in.
+    ok is True when it fits budget_ms (IMPORT_BUDGET_MS by default) and no lazy subsystem was started.
+    """
+    import subprocess
+    root = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(__name__.count('.')):root = os.path.dirname(root)
+    code = (f"import sys, time, json; sys.path.insert(0, {root!r}); t = time.perf_counter(); import {__name__}; "
+            f"t = time.perf_counter() - t; print(json.dumps([t * 1000.0, sorted({{m.split('.')[0] for m in sys.modules}} & {set(LAZY_MODULES)!r})]))")
+    times = []; loaded = []
+    for _ in range(max(1, runs)):
+        out = subprocess.run([sys.executable, '-c', code], capture_output = True, text = True, check = True).stdout
+        ms, loaded = json.loads(out.strip().splitlines()[-1]); times.append(ms)
+    budget = IMPORT_BUDGET_MS if budget_ms is None else budget_ms
+    return {'ms':min(times), 'runs':times, 'budget_ms':budget, 'lazy_loaded':loaded, 'ok':min(times) <= budget and not loaded}
+
+def benchmark(scenes:dict = None, frames:int = 60, size:Tuple[int, int] = (1280, 720), seed:int = 0, warmup:int = 3, out:str = None, imports:bool = True) -> dict:
+    """
+    Draws fixed synthetic scenes headlessly (same seed -> same scene) and reports per-scene ms/frame, fps and
+    primitives/s, plus the profiler's primitive counters. scenes maps a BENCH_SCENES name to its N / K.
+    With imports, the cold import time is checked against IMPORT_BUDGET_MS too (see import_time).
+    With out, the results are also written as JSON, e.g. to diff against a previous run.
+    """
+    results = {'size':list(size), 'frames':frames, 'seed':seed, 'scenes':{}}
+    if imports:results['import'] = import_time()
+    was_enabled = PROFILER.enabled
+    for name, n in (scenes or BENCH_SCENES).items():
+        tick, is_3d, per_frame = _bench_scene(name, n, np.random.default_rng(seed))
+        canvas, ts = init((size, 'benchmark'), (0, 0, 0), backend = 'offscreen')
+        if is_3d:ts.set_3d_mode(True); ts.set_size(10.0)  # Default camera: 1 world unit ~ 1px on the z = 0 plane
+        for _ in range(warmup):clear(canvas, ts, (0, 0, 0)); tick(canvas, ts)
+        PROFILER.reset(); PROFILER.enable(True)
+        times = np.empty(frames, dtype = np.int64)
+        for f in range(frames):
+            t = perf_counter_ns(); clear(canvas, ts, (0, 0, 0)); tick(canvas, ts); times[f] = perf_counter_ns() - t
+        PROFILER.enable(was_enabled)
+        ms = times / 1e6
+        results['scenes'][name] = {'n':n, 'mean_ms':float(ms.mean()), 'median_ms':float(np.median(ms)), 'min_ms':float(ms.min()), 
+                                   'fps':float(1000.0 / ms.mean()), 'primitives_per_s':float(per_frame * 1000.0 / ms.mean()), 
+                                   'primitives':{k:v for k, v in PROFILER.primitives().items() if v['calls']}}
+    ASSETS.unload('_bench_sprite')
+    if out is not None:
+        with open(out, 'w') as f:json.dump(results, f, indent = 1)
+    return results
 
 # --- Compilation ---
-def compile_project(main_file_path):
-    import inspect, json, base64, zlib, shutil, tempfile, atexit
+# A bundle is a launcher line followed by a zip archive: python runs its __main__.py and modules import through zipimport.
+# Every file is stored once in the cache, content-addressed (objects/<sha1>), and the program runs in a tree of read-only
+# hard links to those objects (trees/<sha1 of the tree's file hashes>), so relative open() / cv2.imread paths work as in
+# the project directory, a rebuild only extracts the files that changed, and old trees are pruned (see also Bundle).
+BUNDLE_MANIFEST = '__bundle__.json'
+BUNDLE_EXCLUDE = ('*.pyc', '__pycache__', '*_c.py', '*.tmp', '.git', '.hg', '.svn', '.vscode', '.idea')
+BUNDLE_STORED_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp', '.ogg', '.mp3', '.flac', '.mp4', '.zip', '.gz', '.npz')
+BUNDLE_KEEP_TREES = 4  # Most recently run trees kept in the cache; older ones and the objects only they used are removed
+# The launcher runs before this module can be imported and repeats this function: keep the two in step
+def _default_cache_dir() -> str:
+    return os.environ.get('PYGRAPH_CACHE') or os.path.join(os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache'), 'pygraph')
+_BUNDLE_LAUNCHER = """import os, sys, json, stat, zipfile, runpy, hashlib, shutil
+from importlib.machinery import EXTENSION_SUFFIXES
+def _default_cache_dir():
+    return os.environ.get('PYGRAPH_CACHE') or os.path.join(os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache'), 'pygraph')
+def extract(z, name, fp):
+    os.makedirs(os.path.dirname(fp), exist_ok = True); tmp = f"{{fp}}.{{os.getpid()}}.tmp"
+    with open(tmp, 'wb') as f:f.write(z.read(name))
+    os.chmod(tmp, stat.S_IREAD); os.replace(tmp, fp)
+def in_tree(name, files, native_pkgs):
+    # Packages holding native extensions import from the tree: the zip cannot load the extension, and a package's
+    # modules only come from its own __path__
+    if name.split('/')[0] in native_pkgs:return True
+    if name.endswith(tuple(EXTENSION_SUFFIXES)):return False
+    if not name.endswith('.py'):return True
+    # Modules under a directory without __init__.py (namespace packages) cannot come from the zip: they import from the tree
+    parts = name.split('/')[:-1]
+    return any('/'.join(parts[:i + 1]) + '/__init__.py' not in files for i in range(len(parts)))
+def writable(func, path, exc):os.chmod(path, stat.S_IWRITE); func(path)
+def prune(cache, keep):
+    trees = os.path.join(cache, 'trees'); used = []
+    for d in os.listdir(trees):
+        done = os.path.join(trees, d, '.complete')
+        if os.path.exists(done):used.append((os.path.getmtime(done), d))
+    stale = sorted(used, reverse = True)[keep:]
+    for _, d in stale:shutil.rmtree(os.path.join(trees, d), onerror = writable)
+    if not stale:return
+    # Objects no tree links to any more (link count 1) go too; Bundle.extract recreates any it needs again
+    for root, _, names in os.walk(os.path.join(cache, 'objects')):
+        for n in names:
+            fp = os.path.join(root, n)
+            try:
+                if os.stat(fp).st_nlink == 1:os.chmod(fp, stat.S_IWRITE); os.remove(fp)
+            except OSError:pass
+def main():
+    bundle = os.path.dirname(os.path.abspath(__file__))
+    cache = os.environ['PYGRAPH_CACHE'] = _default_cache_dir()
+    with zipfile.ZipFile(bundle) as z:
+        manifest = json.loads(z.read('{manifest}')); files = manifest['files']
+        native_pkgs = {{name.split('/')[0] for name in files if '/' in name and name.endswith(tuple(EXTENSION_SUFFIXES))}}
+        tree_files = sorted((name, files[name][0]) for name in files if in_tree(name, files, native_pkgs))
+        tree = os.path.join(cache, 'trees', hashlib.sha1(json.dumps(tree_files).encode()).hexdigest()); done = os.path.join(tree, '.complete')
+        if not os.path.exists(done):
+            for name, h in tree_files:
+                obj = os.path.join(cache, 'objects', h[:2], h + os.path.splitext(name)[1]); fp = os.path.join(tree, *name.split('/'))
+                if not os.path.exists(obj):extract(z, name, obj)
+                os.makedirs(os.path.dirname(fp), exist_ok = True)
+                if os.path.exists(fp):continue
+                try:os.link(obj, fp)
+                except OSError:shutil.copyfile(obj, fp)
+            os.makedirs(tree, exist_ok = True); open(done, 'w').close()
+        os.utime(done); prune(cache, {keep})
+        # Top-level native extensions cannot be imported from a zip: extract each (once per content hash) and import from there
+        for name, (h, size, mtime) in files.items():
+            if '/' in name or not name.endswith(tuple(EXTENSION_SUFFIXES)):continue
+            d = os.path.join(cache, 'native', h); fp = os.path.join(d, name)
+            if not os.path.exists(fp):extract(z, name, fp)
+            sys.path.insert(1, d)
+    # The tree goes ahead of the zip, so packages it holds (namespace or native) are not imported from the zip instead
+    os.environ['PYGRAPH_BUNDLE'] = bundle; sys.path.insert(0, tree)
+    orig_cwd = os.getcwd(); os.chdir(tree)
+    try:runpy.run_module(manifest['main'], run_name = '__main__', alter_sys = True)
+    finally:os.chdir(orig_cwd)
+if __name__ == "__main__":main()
+"""
+def _bundle_name(path:str) -> str:return os.path.normpath(path).replace(os.sep, '/')
+def _zip_data_offset(buf, info:zipfile.ZipInfo) -> int:
+    """Offset of an entry's (compressed) data, from its local header in buf (bytes-like, indexed from the archive's file start)."""
+    n, m = struct.unpack('<HH', buf[info.header_offset + 26:info.header_offset + 30])
+    return info.header_offset + 30 + n + m
+def _zip_raw(f, info:zipfile.ZipInfo) -> bytes:
+    """An entry's compressed bytes, read from the archive file f (header_offset already counts any prefix)."""
+    f.seek(info.header_offset); head = f.read(30)
+    f.seek(info.header_offset + 30 + sum(struct.unpack('<HH', head[26:30]))); return f.read(info.compress_size)
+def _dos_time(date_time) -> tuple:
+    y, mo, d, h, mi, sec = date_time[:6]
+    return h << 11 | mi << 5 | sec // 2, (y - 1980) << 9 | mo << 5 | d
+class _ZipWriter:
+    """
+    Writes a zip archive from entries whose compressed bytes are already known, so compile_project can copy unchanged
+    files from the previous bundle as they are: a local header and the data per entry, then the central directory and
+    end record on close(). Offsets are counted from where the archive starts in f (readers skip a prefix, like the
+    launcher line). Sizes and offsets past 32 bits go in zip64 extra fields, with a zip64 end record when needed.
+    """
+    Z32 = 0xFFFFFFFF
+    def __init__(self, f):self.f = f; self.start = f.tell(); self.central = []
+    def add(self, name:str, data:bytes, compress:bool = True):
+        """Adds data under name, deflated (level 9) unless compress is False."""
+        raw = data
+        if compress:c = zlib.compressobj(9, zlib.DEFLATED, -15); raw = c.compress(data) + c.flush()
+        self.add_raw(name, raw, zlib.crc32(data), len(data), zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED, time.localtime()[:6])
+    def add_raw(self, name:str, raw:bytes, crc:int, size:int, method:int, date_time, external_attr:int = 0o644 << 16):
+        """Adds an entry from its compressed bytes raw, the uncompressed data's crc32 and size, and the method used."""
+        fname = name.encode('utf-8'); flags = 0 if fname.isascii() else 0x800
+        offset = self.f.tell() - self.start; dtime, ddate = _dos_time(date_time)
+        big = size >= self.Z32 or len(raw) >= self.Z32; version = 45 if big or offset >= self.Z32 else 20
+        extra = struct.pack('<HHQQ', 1, 16, size, len(raw)) if big else b''
+        self.f.write(struct.pack('<IHHHHHIIIHH', 0x04034b50, version, flags, method, dtime, ddate, crc,
+                                 self.Z32 if big else len(raw), self.Z32 if big else size, len(fname), len(extra)))
+        self.f.write(fname); self.f.write(extra); self.f.write(raw)
+        # Central directory zip64 extra: only the fields that overflow, in this order
+        wide = [v for v in (size, len(raw), offset) if v >= self.Z32]
+        extra = struct.pack(f'<HH{len(wide)}Q', 1, 8 * len(wide), * wide) if wide else b''
+        self.central.append(struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, 3 << 8 | version, version, flags, method, dtime, ddate, crc,
+                                        min(len(raw), self.Z32), min(size, self.Z32), len(fname), len(extra), 0, 0, 0, external_attr,
+                                        min(offset, self.Z32)) + fname + extra)
+    def close(self):
+        cd_offset = self.f.tell() - self.start; n = len(self.central)
+        for c in self.central:self.f.write(c)
+        cd_size = self.f.tell() - self.start - cd_offset
+        if n >= 0xFFFF or cd_offset >= self.Z32 or cd_size >= self.Z32:
+            end64 = self.f.tell() - self.start
+            self.f.write(struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 3 << 8 | 45, 45, 0, 0, n, n, cd_size, cd_offset))
+            self.f.write(struct.pack('<IIQI', 0x07064b50, 0, end64, 1))
+        self.f.write(struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, min(n, 0xFFFF), min(n, 0xFFFF), min(cd_size, self.Z32), min(cd_offset, self.Z32), 0))
+def _excluded(rel:str, patterns) -> bool:
+    return any(fnmatch.fnmatch(rel, p) or fnmatch.fnmatch(os.path.basename(rel), p) for p in patterns)
+
+def compile_project(main_file_path:str, exclude = (), output:str = None) -> str:
+    """
+    Bundles the directory of main_file_path (a .py file) into one runnable file (default <main>_c.py, run with python):
+    a zip archive holding every project file that matches no exclude pattern (fnmatch, on the relative path or the file
+    name, on top of BUNDLE_EXCLUDE), this module when it is a top-level extension, a hash manifest and a launcher.
+    The launcher runs main in a cached tree of the project's data files, so relative paths behave as in the project;
+    errors in main propagate (traceback, exit status 1).
+    Rebuilds are incremental: files whose size and mtime, or else sha1, match the previous bundle's manifest are copied
+    without recompressing. Returns the bundle path.
+    """
     if not os.path.exists(main_file_path):raise FileNotFoundError(f"File not found:{main_file_path}")
     base_dir, main_filename = os.path.dirname(os.path.abspath(main_file_path)), os.path.basename(main_file_path)
-    output_file_path = os.path.join(base_dir, main_filename.replace('.py', '_c.py'))
-    vfr_files = {'PyGraph.py':inspect.getsource(sys.modules[__name__]).encode('utf - 8')}
-    for root, _, files in os.walk(base_dir):
+    main_module, ext = os.path.splitext(main_filename)
+    if ext != '.py':raise ValueError(f"compile_project expects a .py main file, got '{main_filename}'")
+    output_file_path = os.path.abspath(output or os.path.join(base_dir, f"{main_module}_c.py"))
+    patterns = tuple(BUNDLE_EXCLUDE) + tuple(exclude)
+    sources = {}
+    for root, dirs, files in os.walk(base_dir):
+        rel_root = os.path.relpath(root, base_dir)
+        dirs[:] = [d for d in dirs if not _excluded(_bundle_name(os.path.join(rel_root, d)), patterns)]
         for fn in files:
-            full_path = os.path.join(root, fn); rel_path = os.path.relpath(full_path, base_dir)
-            if fn.endswith(('.pyc', '_c.py')) or fn.startswith('__pycache__') or fn == main_filename:continue
-            is_text = any(rel_path.lower().endswith(ext) for ext in TEXT_FILE_EXTENSIONS) or fn.endswith('.py')
-            try:vfr_files[rel_path] = open(full_path, 'rb').read()
-            except Exception as e:print(f"Warning:Could not read file {rel_path}:{e}")
-    vfr_files[main_filename] = open(main_file_path, 'rb').read()
-    vfr = [(fn, base64.b64encode(zlib.compress(content, 9)).decode('utf - 8')) for fn, content in vfr_files.items()]
-    compiled_script_content = f"""
-importos,sys,tempfile,base64,zlib,json,atexit,shutil
-VFR=json.loads({repr(json.dumps(vfr))})
-def cleanup(d):
-    try:shutil.rmtree(d) if os.path.exists(d) else None
-    except:pass
-def run_compiled():
-    tmp_d = tempfile.mkdtemp(); atexit.register(cleanup, tmp_d); sys.path.insert(0, tmp_d)
-    for fn, edata in VFR:
-        try:
-            fp = os.path.join(tmp_d, fn); os.makedirs(os.path.dirname(fp), exist_ok = True)
-            with open(fp, 'wb') as f:f.write(zlib.decompress(base64.b64decode(edata)))
-        except Exception as e:print(f"Error extracting {{fn}}:{{e}}"); return
-    orig_cwd = os.getcwd(); os.chdir(tmp_d)
-    try:__import__("{main_filename.replace('.py', '')}")
-    except Exception as e:print(f"Runtime error:{{e}}")
-    finally:os.chdir(orig_cwd)
-if __name__ == "__main__":run_compiled()
-"""
-    with open(output_file_path, 'w') as f:f.write(compiled_script_content)
+            full_path = os.path.join(root, fn); rel_path = _bundle_name(os.path.join(rel_root, fn))
+            if full_path == output_file_path or (fn != main_filename and _excluded(rel_path, patterns)):continue
+            sources[rel_path] = full_path
+    core = getattr(sys.modules[__name__], '__file__', None)
+    if '.' not in __name__ and core and core.endswith(tuple(EXTENSION_SUFFIXES)):sources.setdefault(os.path.basename(core), core)
+    old = old_raw = None
+    try:
+        old = zipfile.ZipFile(output_file_path); old_files = json.loads(old.read(BUNDLE_MANIFEST))['files']; old_raw = open(output_file_path, 'rb')
+    except Exception:
+        if old is not None:old.close()
+        old = None; old_files = {}
+    files = {}; reused = 0; tmp = f"{output_file_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(b"#!/usr/bin/env python3\n")
+            z = _ZipWriter(f)
+            for rel_path, full_path in sorted(sources.items()):
+                try:
+                    st = os.stat(full_path); prev = old_files.get(rel_path); data = None
+                    if prev is not None and prev[1] == st.st_size and prev[2] == st.st_mtime_ns:h = prev[0]
+                    else:
+                        with open(full_path, 'rb') as src:data = src.read()
+                        h = hashlib.sha1(data).hexdigest()
+                    files[rel_path] = [h, st.st_size, st.st_mtime_ns]
+                    if prev is not None and prev[0] == h:
+                        info = old.getinfo(rel_path)
+                        z.add_raw(rel_path, _zip_raw(old_raw, info), info.CRC, info.file_size, info.compress_type, info.date_time, info.external_attr)
+                        reused += 1; continue
+                    if data is None:
+                        with open(full_path, 'rb') as src:data = src.read()
+                    z.add(rel_path, data, not rel_path.lower().endswith(BUNDLE_STORED_EXTENSIONS))
+                except Exception as e:print(f"Warning:Could not read file {rel_path}:{e}"); files.pop(rel_path, None)
+            z.add(BUNDLE_MANIFEST, json.dumps({'main':main_module, 'files':files}).encode())
+            z.add('__main__.py', _BUNDLE_LAUNCHER.format(manifest = BUNDLE_MANIFEST, keep = BUNDLE_KEEP_TREES).encode())
+            z.close()
+    finally:
+        if old is not None:old.close(); old_raw.close()
+    os.replace(tmp, output_file_path)
+    print(f"Bundled {len(files)} files into {output_file_path} ({len(files) - reused} compressed, {reused} unchanged).")
     return output_file_path
 
-# --- Dynamic Volume Monitor and Playback ---
-def _volume_monitor():
- while True:
-  try:
-    v = max(0.0, min(1.0, GLOBAL_VOLUME[0])); pygame.mixer.set_volume(v)
-    for i in range(pygame.mixer.get_num_channels()):pygame.mixer.Channel(i).set_volume(v)
-    time.sleep(0.1) 
-  except Exception:break
-threading.Thread(target = _volume_monitor, daemon = True).start(); print("Volume monitor thread started.")
-
-def _play_sound_logic(sound:pygame.mixer.Sound, filename:str, start_time:float, prefix:str):
-    print(f"{prefix} Playing '{filename}' starting at {start_time:.2f} seconds...")
-    try:
-        duration = sound.get_length(); channel = sound.play(start = start_time); channel.set_volume(GLOBAL_VOLUME[0])
-        time.sleep(max(0, duration - start_time) + 0.1)
-        print(f"{prefix} Playback finished."); return True
-    except Exception as e:print(f"{prefix} Error playing sound:{e}"); return False
-def play_sound(asset_name:str, start_time:float = 0.0):
-    sound = ASSETS.get_snd(asset_name)
-    if sound:_play_sound_logic(sound, asset_name, start_time, "\n[Blocking]")
-    else:print(f"Error:Cached sound '{asset_name}' not found.")
-def start_sound(asset_name:str, start_time:float = 0.0):
+class Bundle:
+    """
+    Read-only view of a compile_project bundle. read() decompresses a file, view() maps a stored (uncompressed) file
+    straight from the archive, and extract() writes a file once into the content-addressed cache (cache_dir/objects,
+    keyed by sha1, kept across runs) and returns that path, for loaders that need a real file after the program has
+    left the bundle's working directory.
+    """
+    def __init__(self, path:str, cache_dir:str = None):
+        self.path = os.path.abspath(path); self.zip = zipfile.ZipFile(self.path)
+        self.manifest = json.loads(self.zip.read(BUNDLE_MANIFEST)); self.files:Dict[str, list] = self.manifest['files']
+        self.cache_dir = cache_dir or _default_cache_dir(); self.extracted = 0
+        self._lock = threading.Lock(); self._map = None
+    def __contains__(self, path:str) -> bool:return _bundle_name(path) in self.files
+    def read(self, path:str) -> bytes:return self.zip.read(_bundle_name(path))
+    def view(self, path:str) -> memoryview:
+        info = self.zip.getinfo(_bundle_name(path))
+        if info.compress_type != zipfile.ZIP_STORED:return memoryview(self.read(path))
+        with self._lock:
+            if self._map is None:
+                with open(self.path, 'rb') as f:self._map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        start = _zip_data_offset(self._map, info)
+        return memoryview(self._map)[start:start + info.file_size]
+    def extract(self, path:str) -> str:
+        name = _bundle_name(path); h = self.files[name][0]
+        cached = os.path.join(self.cache_dir, 'objects', h[:2], h + os.path.splitext(name)[1])
+        if not os.path.exists(cached):
+            # Written aside and renamed, so concurrent runs never see a partial file
+            os.makedirs(os.path.dirname(cached), exist_ok = True); tmp = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:f.write(self.read(name))
+            os.chmod(tmp, stat.S_IREAD); os.replace(tmp, cached); self.extracted += 1
+        return cached
+
+BUNDLE = None
+if os.environ.get('PYGRAPH_BUNDLE'):
+    try:BUNDLE = Bundle(os.environ['PYGRAPH_BUNDLE'])
+    except Exception as e:print(f"Bundle Error:{e}")
+def resource_path(path:str) -> str:
+    """
+    The real path of a project file. Inside a compiled bundle, a relative path that no longer resolves (the program
+    changed directory) gives the cached copy of the bundled file; any other path is returned as is.
+    """
+    if BUNDLE is None or os.path.isabs(path) or os.path.exists(path) or path not in BUNDLE:return path
+    return BUNDLE.extract(path)
+
+# --- Audio (one scheduler thread, fixed channel pool, event-driven completion) ---
+class MixerBackend:
+    """What AudioEngine drives; only ever called from its worker thread. Channels are 0 .. channels - 1."""
+    def open(self, channels:int):pass
+    def play(self, channel:int, sound, start:float, loops:int, fade_ms:int):pass
+    def stop(self, channel:int, fade_ms:int = 0):pass
+    def set_volume(self, channel:int, volume:float):pass
+    def busy(self, channel:int) -> bool:return False
+    def length(self, sound) -> float:return 0.0
+class PygameMixer(MixerBackend):
+    """pygame.mixer channels (the mixer starts on first use, see _start_audio)."""
+    def open(self, channels:int):pygame.mixer.set_num_channels(channels)
+    def play(self, channel:int, sound, start:float, loops:int, fade_ms:int):
+        if start > 0:
+            # Channels cannot seek: play a copy trimmed to the start offset
+            freq = pygame.mixer.get_init()[0]
+            sound = pygame.sndarray.make_sound(np.ascontiguousarray(pygame.sndarray.array(sound)[int(start * freq):]))
+        pygame.mixer.Channel(channel).play(sound, loops = loops, fade_ms = fade_ms)
+    def stop(self, channel:int, fade_ms:int = 0):
+        if fade_ms > 0:pygame.mixer.Channel(channel).fadeout(fade_ms)
+        else:pygame.mixer.Channel(channel).stop()
+    def set_volume(self, channel:int, volume:float):pygame.mixer.Channel(channel).set_volume(volume)
+    def busy(self, channel:int) -> bool:return pygame.mixer.Channel(channel).get_busy()
+    def length(self, sound) -> float:return sound.get_length()
+class StubMixer(MixerBackend):
+    """
+    Device-free backend for tests and headless runs: a sound is its length in seconds (or has get_length()),
+    a channel is busy until its clip would have ended. log records every call as (name, channel, args...).
+    """
+    def __init__(self, clock = time.monotonic):self.clock = clock; self.ends = {}; self.volumes = {}; self.log = []
+    def open(self, channels:int):self.log.append(('open', channels))
+    def play(self, channel:int, sound, start:float, loops:int, fade_ms:int):
+        self.ends[channel] = math.inf if loops < 0 else self.clock() + max(0.0, self.length(sound) - start) * (loops + 1)
+        self.log.append(('play', channel, sound, start, loops, fade_ms))
+    def stop(self, channel:int, fade_ms:int = 0):
+        self.ends[channel] = self.clock() + fade_ms / 1000.0; self.log.append(('stop', channel, fade_ms))
+    def set_volume(self, channel:int, volume:float):self.volumes[channel] = volume; self.log.append(('volume', channel, volume))
+    def busy(self, channel:int) -> bool:return self.ends.get(channel, 0.0) > self.clock()
+    def length(self, sound) -> float:return float(sound) if isinstance(sound, (int, float)) else sound.get_length()
+
+class Voice(Future):
+    """
+    One playback. Resolves to True when the clip finishes, False when it is stopped, stolen by a higher-priority
+    play or rejected (no channel); result() blocks on that event and add_done_callback runs on the audio thread.
+    """
+    def __init__(self, sound, name:str, priority:int, volume:float, start:float, loops:int, fade_ms:int):
+        super().__init__(); self.sound = sound; self.name = name; self.priority = priority; self.volume = volume
+        self.start = start; self.loops = loops; self.fade_ms = fade_ms
+        self.channel = -1; self.started = 0.0; self.deadline = None; self.stopping = False; self.reason = None
+
+class AudioEngine:
+    """
+    A single worker thread owning a fixed channel pool. play / stop / fade / set_volume only enqueue commands;
+    the worker applies them, reserves a free channel for each play (else steals the lowest-priority, oldest voice
+    of no higher priority), and otherwise sleeps until the next command or the earliest expected end of a voice,
+    so it never polls while idle. The master volume (GLOBAL_VOLUME[0]) is applied only when it changes.
+    Backend errors are reported and resolve the voices involved with False ('error'); after close(), play() is rejected.
+    """
+    def __init__(self, backend:MixerBackend = None, channels:int = 16):
+        self.backend = backend if backend is not None else PygameMixer(); self.channels = channels
+        self.voices = [None] * channels; self.master = None; self.stolen = 0; self.rejected = 0
+        self._q = queue.Queue(); self._closed = False; self._close_lock = threading.Lock()
+        self.thread = threading.Thread(target = self._work, name = 'pygraph-audio', daemon = True); self.thread.start()
+    # --- Commands (any thread) ---
+    def play(self, sound, priority:int = 0, volume:float = 1.0, start:float = 0.0, loops:int = 0, fade_ms:int = 0, on_done = None, name:str = None) -> Voice:
+        """Queues a playback; loops=-1 repeats until stopped. Returns its Voice."""
+        v = Voice(sound, name or str(sound), priority, volume, start, loops, fade_ms)
+        if on_done is not None:v.add_done_callback(on_done)
+        with self._close_lock:
+            # Queued before close()'s sentinel, or not at all: no Voice is left waiting on a finished worker
+            if not self._closed:self._q.put(('play', v)); return v
+        self.rejected += 1; v.reason = 'rejected'; v.set_result(False); return v
+    def stop(self, voice:Voice = None, fade_ms:int = 0):
+        """Stops one voice, or every voice when voice is None, fading out over fade_ms."""
+        self._q.put(('stop', voice, fade_ms))
+    def fade(self, voice:Voice = None, fade_ms:int = 500):self.stop(voice, fade_ms)
+    def set_volume(self, volume:float, voice:Voice = None):
+        """Sets the master volume (GLOBAL_VOLUME[0]) or one voice's volume."""
+        if voice is None:GLOBAL_VOLUME[0] = volume
+        else:voice.volume = volume
+        self._q.put(('volume', voice))
+    def sync_volume(self):
+        """Queues a volume update if GLOBAL_VOLUME[0] was changed directly (cheap; run() calls it every frame)."""
+        if GLOBAL_VOLUME[0] != self.master:self._q.put(('volume', None))
+    def active(self) -> list:return [v for v in self.voices if v is not None]
+    @property
+    def closed(self) -> bool:return self._closed
+    def close(self):
+        """Stops every voice and the worker."""
+        with self._close_lock:
+            if self._closed:return
+            self._closed = True; self._q.put(('stop', None, 0)); self._q.put(None)
+        self.thread.join()
+    # --- Worker ---
+    def _apply_volume(self, voice:Voice = None):
+        self.master = GLOBAL_VOLUME[0]; m = max(0.0, min(1.0, self.master))
+        for v in ([voice] if voice is not None else self.voices):
+            if v is not None and v.channel >= 0:self.backend.set_volume(v.channel, m * v.volume)
+    def _release(self, v:Voice, bint ok, str reason):
+        if self.voices[v.channel] is v:self.voices[v.channel] = None
+        v.reason = reason
+        if not v.done():v.set_result(ok)
+    def _play(self, v:Voice):
+        now = time.monotonic()
+        ch = next((i for i, o in enumerate(self.voices) if o is None), -1)
+        if ch < 0:
+            # Steal the lowest-priority, oldest voice that is not more important than the new one
+            victim = min((o for o in self.voices if o.priority <= v.priority), key = lambda o:(o.priority, o.started), default = None)
+            if victim is None:self.rejected += 1; v.reason = 'rejected'; v.set_result(False); return
+            ch = victim.channel; self.backend.stop(ch); self._release(victim, False, 'stolen'); self.stolen += 1
+        try:
+            v.channel = ch; v.started = now
+            self.backend.set_volume(ch, max(0.0, min(1.0, GLOBAL_VOLUME[0])) * v.volume)
+            self.backend.play(ch, v.sound, v.start, v.loops, v.fade_ms)
+            length = self.backend.length(v.sound)
+            v.deadline = None if v.loops < 0 else now + max(0.0, length - v.start) * (v.loops + 1)
+            self.voices[ch] = v
+        except Exception as e:
+            print(f"Error playing sound '{v.name}':{e}"); v.reason = 'error'; v.set_result(False)
+    def _stop(self, v:Voice, int fade_ms):
+        for o in ([v] if v is not None else self.voices):
+            if o is None or o.channel < 0 or self.voices[o.channel] is not o:continue
+            self.backend.stop(o.channel, fade_ms)
+            if fade_ms > 0:o.stopping = True; o.deadline = time.monotonic() + fade_ms / 1000.0
+            else:self._release(o, False, 'stopped')
+    def _run(self, cmd:tuple):
+        try:
+            if cmd[0] == 'play':self._play(cmd[1])
+            elif cmd[0] == 'stop':self._stop(cmd[1], cmd[2])
+            elif cmd[0] == 'volume':self._apply_volume(cmd[1])
+        except Exception as e:
+            print(f"Audio Error ({cmd[0]}):{e}")
+            if cmd[0] == 'play' and not cmd[1].done():cmd[1].reason = 'error'; cmd[1].set_result(False)
+    def _work(self):
+        try:self.backend.open(self.channels)
+        except Exception as e:print(f"Audio Error (open):{e}")
+        while True:
+            deadlines = [v.deadline for v in self.voices if v is not None and v.deadline is not None]
+            try:cmd = self._q.get(timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None)
+            except queue.Empty:cmd = ()
+            while cmd is not None:
+                if cmd:self._run(cmd)
+                try:cmd = self._q.get_nowait()
+                except queue.Empty:break
+            if cmd is None and self._closed:break
+            if GLOBAL_VOLUME[0] != self.master:self._run(('volume', None))
+            # Voices whose expected end has passed: done once their channel has really gone idle
+            now = time.monotonic()
+            for v in self.voices:
+                if v is None or v.deadline is None or v.deadline > now:continue
+                try:busy = self.backend.busy(v.channel)
+                except Exception as e:print(f"Audio Error (busy):{e}"); self._release(v, False, 'error'); continue
+                if busy:v.deadline = now + 0.005
+                else:self._release(v, not v.stopping, 'stopped' if v.stopping else 'finished')
+        for v in self.voices:
+            if v is not None:self._release(v, False, 'stopped')
+
+_AUDIO = None
+def audio(backend:MixerBackend = None, channels:int = 16) -> AudioEngine:
+    """The shared AudioEngine, started on first use (pygame mixer by default; pass StubMixer() to run without a device)."""
+    global _AUDIO
+    with _LAZY_LOCK:
+        if _AUDIO is None or _AUDIO.closed or backend is not None:
+            if _AUDIO is not None:_AUDIO.close()
+            _AUDIO = AudioEngine(backend, channels)
+    return _AUDIO
+
+def play_sound(asset_name:str, start_time:float = 0.0, priority:int = 0) -> bool:
+    """Plays a cached sound and blocks until it ends. Returns True if it played to the end."""
+    v = start_sound(asset_name, start_time, priority)
+    return v is not None and v.result()
+def start_sound(asset_name:str, start_time:float = 0.0, priority:int = 0, on_done = None) ->Opt[Voice]:
+    """Plays a cached sound without blocking. Returns its Voice (a Future), or None if the sound is not loaded."""
     sound = ASSETS.get_snd(asset_name)
-    if sound:
-        print(f"\n[Non - Blocking] Starting thread to play '{asset_name}'...");
-        threading.Thread(target = _play_sound_logic, args = (sound, asset_name, start_time, "[Non - Blocking Thread]"), daemon = True).start()
-        print("[Non - Blocking] Function returned immediately.")
-    else:print(f"Error:Cached sound '{asset_name}' not found.")
+    if not sound:print(f"Error:Cached sound '{asset_name}' not found."); return None
+    return audio().play(sound, priority = priority, start = start_time, on_done = on_done, name = asset_name)
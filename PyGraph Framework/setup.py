@@ -18,17 +18,20 @@ long_description = (this_directory / "README.md").read_text()
 
 # Improvement 4: Handle compiler flags for cross-platform
 extra_compile_args = []
+extra_link_args = []
 if sys.platform == 'win32':
     extra_compile_args.extend(['/O2', '/openmp'])
 elif sys.platform in ('linux', 'darwin'):
     extra_compile_args.extend(['-O3', '-fopenmp'])
+    extra_link_args.append('-fopenmp') # The prange kernels need the OpenMP runtime at link time too
 
 extensions = [
     Extension(
         name=f"{PROJECT_NAME}.{CYTHON_MODULE_NAME}", 
         sources=[PYX_FILE],
         include_dirs=[numpy.get_include()],
-        extra_compile_args=extra_compile_args
+        extra_compile_args=extra_compile_args,
+        extra_link_args=extra_link_args
     )
 ]
 
@@ -0,0 +1,14 @@
+import importlib
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def core():
+    """The compiled _pygraph_core module (installed package first, then a local build); skips if it is not built."""
+    for name in ("pygraphcv._pygraph_core", "_pygraph_core"):
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            pass
+    pytest.skip("_pygraph_core is not built")
@@ -0,0 +1,76 @@
+import cv2
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def images(tmp_path):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"img{i}.png"
+        cv2.imwrite(str(path), np.full((16, 16, 3), 40 * i, dtype=np.uint8))
+        paths.append(str(path))
+    return paths
+
+
+def test_lazy_decode_and_eviction(core, images):
+    one = 16 * 16 * 3
+    assets = core.AssetManager(budget=2 * one)
+    for i, path in enumerate(images):
+        assets.load_image(f"img{i}", path)
+    assert assets.stats()["decodes"] == 0
+    for i in range(4):
+        assert assets.get_img(f"img{i}")[0, 0, 0] == 40 * i
+    stats = assets.stats()
+    assert stats["entries"] == 2 and stats["cost"] <= 2 * one
+    assets.get_img("img0")  # Evicted, so decoded again
+    assert assets.stats()["decodes"] == 5
+
+
+def test_prefetch(core, images):
+    assets = core.AssetManager(workers=2)
+    for i, path in enumerate(images):
+        assets.load_image(f"img{i}", path)
+    assets.prefetch(wait=True)
+    assert assets.stats()["decodes"] == 4
+    assets.get_img("img3")
+    assert assets.stats()["decodes"] == 4
+
+
+def test_failures_are_cached_until_the_file_changes(core, tmp_path, capsys):
+    path = tmp_path / "late.png"
+    assets = core.AssetManager()
+    assets.load_image("late", str(path))
+    assert assets.get_img("late") is None and assets.get_img("late") is None
+    assert capsys.readouterr().out.count("Asset Error") == 1
+    assert assets.stats()["failed"] == 1
+    cv2.imwrite(str(path), np.zeros((4, 4, 3), dtype=np.uint8))
+    assert assets.get_img("late") is not None
+    assert assets.stats()["failed"] == 0
+
+
+def test_get_img_returns_the_cached_array(core, images, tmp_path):
+    for cache_dir in (None, str(tmp_path / "npy"), str(tmp_path / "npy")):  # Decoded, written to the cache, then mapped
+        assets = core.AssetManager(cache_dir=cache_dir)
+        assets.load_image("img", images[1])
+        img = assets.get_img("img")
+        assert img.flags.writeable
+        img[0, 0] = 7  # Edited in place, as callers could before the asset cache
+        assert assets.get_img("img")[0, 0, 0] == 7
+        view = assets.get_img("img", readonly=True)
+        assert not view.flags.writeable and view[0, 0, 0] == 7
+    fresh = core.AssetManager(cache_dir=cache_dir)  # Copy-on-write: the mapped .npy on disk is left alone
+    fresh.load_image("img", images[1])
+    assert fresh.get_img("img")[0, 0, 0] == 40 and fresh.stats()["decodes"] == 0
+
+
+def test_touch_refreshes_the_premultiplied_copy(core, tmp_path):
+    path = tmp_path / "sprite.png"
+    cv2.imwrite(str(path), np.full((4, 4, 4), 200, dtype=np.uint8))
+    assets = core.AssetManager()
+    assets.load_image("sprite", str(path))
+    before = assets.get_premul("sprite").copy()
+    assets.get_img("sprite")[..., 3] = 255
+    np.testing.assert_array_equal(assets.get_premul("sprite"), before)
+    assets.touch("sprite")
+    assert (assets.get_premul("sprite")[..., :3] == 200).all()
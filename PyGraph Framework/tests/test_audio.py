@@ -0,0 +1,51 @@
+import pytest
+
+
+@pytest.fixture
+def engine(core):
+    eng = core.AudioEngine(core.StubMixer(), channels=2)
+    yield eng
+    eng.close()
+
+
+def test_finishes(engine):
+    voice = engine.play(0.05)
+    assert voice.result(timeout=2) is True
+    assert voice.reason == "finished"
+    assert engine.active() == []
+
+
+def test_steals_lowest_priority_oldest(engine):
+    old, new = engine.play(5.0), engine.play(5.0)
+    urgent = engine.play(0.05, priority=1)
+    assert old.result(timeout=2) is False and old.reason == "stolen"
+    assert urgent.result(timeout=2) is True
+    assert not new.done()
+    assert engine.stolen == 1
+
+
+def test_rejects_when_every_channel_is_more_important(engine):
+    engine.play(5.0, priority=2)
+    engine.play(5.0, priority=2)
+    voice = engine.play(0.05, priority=1)
+    assert voice.result(timeout=2) is False and voice.reason == "rejected"
+    assert engine.rejected == 1
+
+
+def test_fade_and_stop(engine):
+    faded, stopped = engine.play(5.0), engine.play(5.0)
+    engine.fade(faded, 50)
+    engine.stop(stopped)
+    assert stopped.result(timeout=2) is False and stopped.reason == "stopped"
+    assert faded.result(timeout=2) is False and faded.reason == "stopped"
+    assert ("stop", 0, 50) in engine.backend.log
+
+
+def test_callback_and_play_after_close(core):
+    eng = core.AudioEngine(core.StubMixer(), channels=2)
+    done = []
+    eng.play(0.01, on_done=lambda voice: done.append(voice.result())).result(timeout=2)
+    eng.close()
+    assert done == [True]
+    voice = eng.play(0.01)
+    assert voice.done() and voice.result() is False and voice.reason == "rejected"
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+W, H = 200, 150
+
+
+def setup(seed=0, channels=4):
+    rng = np.random.default_rng(seed)
+    canvas = rng.integers(0, 256, (H, W, 3), dtype=np.uint8)
+    sprite = rng.integers(0, 256, (40, 60, channels), dtype=np.uint8)
+    if channels == 4:
+        sprite[:5, :, 3] = 0
+        sprite[-5:, :, 3] = 255
+    return canvas, sprite
+
+
+def over(dst, sprite):
+    """Reference blend: premultiply rounded, then src + dst * (255 - a) / 255 rounded, in exact integers."""
+    a = sprite[..., 3:].astype(np.int64)
+    premul = np.rint(sprite[..., :3] * a / 255.0)
+    return np.minimum(premul + np.rint(dst.astype(np.int64) * (255 - a) / 255.0), 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("pos", [(30.0, 40.0), (-20.0, -10.0), (170.0, 130.0)], ids=["inside", "top-left", "bottom-right"])
+def test_translate_only_blit_is_exact(core, pos):
+    canvas, sprite = setup()
+    expected = canvas.copy()
+    ts = core.TransformState()
+    ts.set_pos(pos)
+    core.blit(canvas, ts, sprite, 1.0)
+    x, y = int(pos[0]), int(pos[1])
+    x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x + sprite.shape[1], W), min(y + sprite.shape[0], H)
+    expected[y0:y1, x0:x1] = over(expected[y0:y1, x0:x1], sprite[y0 - y:y1 - y, x0 - x:x1 - x])
+    np.testing.assert_array_equal(canvas, expected)
+
+
+def test_premultiplied_input_matches(core):
+    canvas, sprite = setup(1)
+    ts = core.TransformState()
+    ts.set_pos((30.0, 40.0))
+    ref = canvas.copy()
+    core.blit(ref, ts, sprite, 1.0)
+    core.blit(canvas, ts, core.premultiply(sprite), 1.0, premultiplied=True)
+    np.testing.assert_array_equal(canvas, ref)
+
+
+def test_opaque_sprite_overlays_nonzero_pixels(core):
+    canvas, sprite = setup(2, channels=3)
+    sprite[::2] = 0
+    expected = canvas.copy()
+    ts = core.TransformState()
+    ts.set_pos((10.0, 20.0))
+    core.blit(canvas, ts, sprite, 1.0)
+    roi = expected[20:60, 10:70]
+    roi[sprite != 0] = sprite[sprite != 0]
+    np.testing.assert_array_equal(canvas, expected)
+
+
+@pytest.mark.parametrize("rot", [0.0, 30.0], ids=["translated", "rotated"])
+@pytest.mark.parametrize("pos", [(500.0, 20.0), (-400.0, 20.0), (20.0, 900.0), (20.0, -300.0)])
+def test_off_canvas_blit_leaves_the_canvas_untouched(core, rot, pos):
+    canvas, sprite = setup(3)
+    before = canvas.copy()
+    ts = core.TransformState(rot=rot)
+    ts.set_pos(pos)
+    core.blit(canvas, ts, sprite, 2.0)
+    np.testing.assert_array_equal(canvas, before)
+
+
+def test_unprojectable_blit_leaves_the_canvas_untouched(core):
+    canvas, sprite = setup(4)
+    before = canvas.copy()
+    ts = core.TransformState(shift=(W / 2, H / 2), is_3d=True)
+    ts.set_pos((0.0, 0.0, -50.0))  # Behind the camera
+    core.blit(canvas, ts, sprite, 1.0)
+    np.testing.assert_array_equal(canvas, before)
+
+
+def test_clipped_warp_only_touches_its_bounds(core):
+    canvas, sprite = setup(5)
+    sprite[..., 3] = 255
+    before = canvas.copy()
+    ts = core.TransformState(rot=25.0, size=1.5)
+    ts.set_pos((100.0, 40.0))
+    core.blit(canvas, ts, sprite, 1.3)
+    corners, valid = core.transform_points([(100, 40), (178, 40), (178, 92), (100, 92)], ts)
+    assert valid.all()
+    changed = np.argwhere((canvas != before).any(2))
+    assert changed.size and changed[:, 1].max() < W and changed[:, 0].max() < H
+    assert changed[:, 1].min() >= np.floor(corners[:, 0].min()) - 1 and changed[:, 1].max() <= np.floor(corners[:, 0].max()) + 1
+    assert changed[:, 0].min() >= np.floor(corners[:, 1].min()) - 1
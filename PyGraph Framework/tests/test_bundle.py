@@ -0,0 +1,103 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+MAIN = """\
+import json
+import ns.mod, pkg.sub
+from ns.deep import leaf
+with open("data/info.txt") as f:
+    info = f.read()
+print(json.dumps([ns.mod.VALUE, pkg.sub.VALUE, leaf.VALUE, info]))
+"""
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    files = {
+        "main.py": MAIN,
+        "ns/mod.py": "VALUE = 'namespace'\n",          # No __init__.py: a namespace package
+        "ns/deep/leaf.py": "VALUE = 'nested namespace'\n",
+        "pkg/__init__.py": "",
+        "pkg/sub.py": "from . import helper\nVALUE = helper.VALUE\n",
+        "pkg/helper.py": "VALUE = 'package'\n",
+        "data/info.txt": "asset",
+    }
+    for name, text in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return root
+
+
+def run_bundle(bundle, tmp_path):
+    env = dict(os.environ, PYGRAPH_CACHE=str(tmp_path / "cache"))
+    return subprocess.run([sys.executable, bundle], cwd=str(tmp_path), env=env, capture_output=True, text=True, timeout=120)
+
+
+def test_bundle_runs_nested_and_namespace_packages(core, project, tmp_path):
+    bundle = core.compile_project(str(project / "main.py"), output=str(tmp_path / "app.py"))
+    for _ in range(2):  # extracting, then the cached tree
+        proc = run_bundle(bundle, tmp_path)
+        assert proc.returncode == 0, proc.stderr
+        assert json.loads(proc.stdout.splitlines()[-1]) == ["namespace", "package", "nested namespace", "asset"]
+
+
+def test_bundle_imports_extensions_inside_packages(core, project, tmp_path):
+    # A copy of the compiled core stands in for a package's native module
+    shutil.copy(core.__file__, project / "pkg" / os.path.basename(core.__file__))
+    (project / "main.py").write_text(f"import pkg.sub, pkg.{core.__name__.split('.')[-1]} as ext\n"
+                                     "print(ext.__name__, pkg.sub.VALUE, callable(ext.circle))\n")
+    bundle = core.compile_project(str(project / "main.py"), output=str(tmp_path / "app.py"))
+    for _ in range(2):
+        proc = run_bundle(bundle, tmp_path)
+        assert proc.returncode == 0, proc.stderr
+        assert proc.stdout.split() == [f"pkg.{core.__name__.split('.')[-1]}", "package", "True"]
+
+
+def test_bundle_errors_propagate(core, project, tmp_path):
+    (project / "main.py").write_text("import ns.mod\nraise RuntimeError('boom')\n")
+    bundle = core.compile_project(str(project / "main.py"), output=str(tmp_path / "app.py"))
+    proc = run_bundle(bundle, tmp_path)
+    assert proc.returncode == 1
+    assert "RuntimeError: boom" in proc.stderr
+
+
+def test_rebuild_copies_unchanged_entries(core, project, tmp_path, capsys):
+    (project / "data/big.txt").write_text("x" * 10000)
+    bundle = core.compile_project(str(project / "main.py"), output=str(tmp_path / "app.py"))
+    with zipfile.ZipFile(bundle) as z:
+        before = {i.filename: (i.compress_type, i.compress_size, i.CRC) for i in z.infolist()}
+    (project / "pkg/helper.py").write_text("VALUE = 'changed'\n")
+    capsys.readouterr()
+    core.compile_project(str(project / "main.py"), output=bundle)
+    assert "(1 compressed," in capsys.readouterr().out
+    with zipfile.ZipFile(bundle) as z:
+        assert z.testzip() is None
+        after = {i.filename: (i.compress_type, i.compress_size, i.CRC) for i in z.infolist()}
+        assert z.read("data/big.txt") == b"x" * 10000
+    assert after["data/big.txt"] == before["data/big.txt"] and after["data/big.txt"][0] == zipfile.ZIP_DEFLATED
+    assert after["pkg/helper.py"] != before["pkg/helper.py"]
+    proc = run_bundle(bundle, tmp_path)
+    assert proc.returncode == 0, proc.stderr
+    assert json.loads(proc.stdout.splitlines()[-1])[1] == "changed"
+
+
+def test_zip_writer_switches_to_zip64_past_65535_entries(core, tmp_path):
+    path = tmp_path / "many.zip"
+    with open(path, "wb") as f:
+        f.write(b"prefix\n")
+        z = core._ZipWriter(f)
+        for i in range(0x10000):
+            z.add(f"f{i}", b"%d" % i, compress=i % 2 == 0)
+        z.close()
+    with zipfile.ZipFile(path) as z:
+        names = z.namelist()
+        assert len(names) == 0x10000
+        assert z.read("f65535") == b"65535" and z.read("f4") == b"4"
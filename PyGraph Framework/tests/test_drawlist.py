@@ -0,0 +1,87 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+W, H = 320, 240
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0)]
+
+
+def scene(core, arr, colors, aa_fills=False):
+    ts = core.TransformState(shift=(W / 2, H / 2))
+    rng = np.random.default_rng(0)
+    for i, (x, y) in enumerate(rng.uniform(-140, 140, (600, 2))):
+        ts.set_pos((float(x), float(y)))
+        color = colors[i % len(colors)]
+        kind = i % 4
+        if kind == 0:
+            core.circle(arr, ts, 4.0, color, 1)
+        elif kind == 1:
+            core.rect(arr, ts, (10.0, 7.0), color, 1, fill=True, aa=aa_fills)
+        elif kind == 2:
+            core.poly(arr, ts, ((7.0, 0.0), (0.0, 7.0)), color, 1, fill=True, aa=aa_fills)
+        else:
+            core.line(arr, ts, (9.0, -4.0), color, 2, aa=True)
+
+
+def immediate(core, colors, aa_fills=False):
+    arr = np.zeros((H, W, 3), dtype=np.uint8)
+    scene(core, arr, colors, aa_fills)
+    return arr
+
+
+@pytest.mark.parametrize("aa_fills", [False, True], ids=["fills", "aa-fills"])
+@pytest.mark.parametrize("colors", [COLORS, COLORS[:1]], ids=["mixed", "single"])
+def test_strict_order_matches_immediate(core, colors, aa_fills):
+    arr = np.zeros((H, W, 3), dtype=np.uint8)
+    with core.DrawList(arr, strict_order=True):
+        scene(core, arr, colors, aa_fills)
+    np.testing.assert_array_equal(arr, immediate(core, colors, aa_fills))
+
+
+def test_grouped_single_style_matches_immediate(core):
+    # With one style there is one group, so grouping cannot reorder any overdraw
+    arr = np.zeros((H, W, 3), dtype=np.uint8)
+    core.begin_batch(arr)
+    scene(core, arr, COLORS[:1])
+    assert core.flush() > 0
+    np.testing.assert_array_equal(arr, immediate(core, COLORS[:1]))
+
+
+def test_nothing_drawn_before_flush(core):
+    arr = np.zeros((H, W, 3), dtype=np.uint8)
+    dl = core.DrawList(arr)
+    with dl:
+        scene(core, arr, COLORS)
+        assert not arr.any() and len(dl) > 0
+    assert arr.any()
+
+
+def test_nested_batches_on_same_shaped_canvases(core):
+    a, b = np.zeros((H, W, 3), dtype=np.uint8), np.zeros((H, W, 3), dtype=np.uint8)
+    ts = core.TransformState(shift=(W / 2, H / 2))
+    for _ in range(2):  # The second round reuses the pooled lists
+        a[:] = 0; b[:] = 0
+        outer = core.begin_batch(a)
+        core.circle(a, ts, 20.0, (255, 0, 0), 1)
+        inner = core.begin_batch(b)
+        assert inner is not outer
+        core.circle(b, ts, 30.0, (0, 255, 0), 1)
+        assert core.flush() == 1 and b.any() and not a.any()
+        assert core.flush() == 1 and a.any()
+        assert core.flush() == 0
+    np.testing.assert_array_equal(a, immediate_circle(core, 20.0, (255, 0, 0)))
+    np.testing.assert_array_equal(b, immediate_circle(core, 30.0, (0, 255, 0)))
+
+
+def immediate_circle(core, radius, color):
+    arr = np.zeros((H, W, 3), dtype=np.uint8)
+    core.circle(arr, core.TransformState(shift=(W / 2, H / 2)), radius, color, 1)
+    return arr
+
+
+def test_threads_drawing_at_once_keep_their_own_points(core):
+    expected = immediate(core, COLORS)
+    with ThreadPoolExecutor(4) as pool:
+        for arr in pool.map(lambda _: immediate(core, COLORS), range(16)):
+            np.testing.assert_array_equal(arr, expected)
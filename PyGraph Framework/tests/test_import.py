@@ -0,0 +1,16 @@
+import os
+
+import pytest
+
+
+@pytest.mark.skipif("PYGRAPH_IMPORT_BUDGET_MS" not in os.environ,
+                    reason="wall-clock check; set PYGRAPH_IMPORT_BUDGET_MS (e.g. 150) to run it")
+def test_import_fits_budget(core):
+    result = core.import_time(runs=3, budget_ms=float(os.environ["PYGRAPH_IMPORT_BUDGET_MS"]))
+    assert result["ok"], result
+
+
+def test_import_starts_no_lazy_subsystem(core):
+    result = core.import_time(runs=1, budget_ms=float("inf"))
+    assert set(core.LAZY_MODULES) >= {"pygame", "pynput", "PIL"}
+    assert result["lazy_loaded"] == []
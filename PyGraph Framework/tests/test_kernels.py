@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+W, H = 640, 480  # Above the size the tiled kernels start threading at
+
+
+def render(core, threads):
+    core.set_num_threads(threads)
+    rng = np.random.default_rng(1)
+    ts = core.TransformState(shift=(W / 2, H / 2))
+    canvas = np.empty((H, W, 3), dtype=np.uint8)
+    core.gradient(canvas, ts, (10, 40, 200), (250, 120, 0))
+    sprite = rng.integers(0, 256, (300, 400, 4), dtype=np.uint8)
+    ts.set_pos((-200.0, -150.0))
+    core.blit(canvas, ts, sprite, (1.0, 1.0))
+    ts.set_rotate(20.0)
+    core.blit(canvas, ts, sprite, (1.2, 0.8))
+    layer = core.premultiply(rng.integers(0, 256, (H, W, 4), dtype=np.uint8))
+    core.merge_layer(canvas, layer)
+    cleared = np.empty_like(canvas)
+    core.clear(cleared, ts, (1, 2, 3))
+    return canvas, cleared
+
+
+def test_threaded_kernels_are_bit_identical(core):
+    default = core.get_num_threads()
+    try:
+        serial = render(core, 1)
+        for threads in (2, 4):
+            for a, b in zip(render(core, threads), serial):
+                np.testing.assert_array_equal(a, b)
+    finally:
+        core.set_num_threads(default)
+
+
+@pytest.mark.parametrize("env, expected", [("3", 3), ("2,1", 2)])
+def test_default_thread_count_follows_omp_num_threads(core, env, expected):
+    code = f"import importlib; print(importlib.import_module({core.__name__!r}).get_num_threads())"
+    out = subprocess.run([sys.executable, "-c", code], env=dict(os.environ, OMP_NUM_THREADS=env),
+                         capture_output=True, text=True, check=True, timeout=60)
+    assert int(out.stdout.split()[-1]) == expected  # Last line: importing may print banners first
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+SIZE = (320, 240)
+
+
+def frames(core, dirty_rects, n=30):
+    """Runs an offscreen scene (a cached background layer, a moving HUD layer, a tick-drawn dot) and copies each frame."""
+    out, renders = [], []
+    calls = {"bg": 0}
+
+    def background(arr, ts):
+        calls["bg"] += 1
+        core.circle(arr, ts, 60.0, (0, 200, 0), 1, fill=True)
+
+    hud = core.Layer(lambda arr, ts: core.rect(arr, ts, (40.0, 12.0), (255, 0, 0), 1, fill=True),
+                     ts=core.TransformState(shift=(20, 20)), region=(0, 0, 120, 60))
+    stack = core.LayerStack([core.Layer(background), hud], (0, 0, 0))
+
+    def tick(arr, ts):
+        i = len(out)
+        if i % 7 == 3:
+            hud.invalidate()
+        ts.set_pos((-140.0 + 9 * i, 0.0))
+        core.circle(arr, ts, 8.0, (255, 255, 255), 1, fill=True)
+        out.append(arr.copy())
+
+    core.run(tick, (SIZE, "test"), (0, 0, 0), target_fps=None, backend="offscreen", max_frames=n,
+             layers=stack, dirty_rects=dirty_rects)
+    return out, calls["bg"]
+
+
+def test_static_layer_renders_once(core):
+    out, bg_renders = frames(core, dirty_rects=False)
+    assert len(out) == 30 and bg_renders == 2  # Once over black, once over white
+
+
+@pytest.mark.parametrize("n", [1, 30])
+def test_dirty_rects_match_full_copy(core, n):
+    full, _ = frames(core, dirty_rects=False, n=n)
+    dirty, _ = frames(core, dirty_rects=True, n=n)
+    assert len(full) == len(dirty) == n
+    for i, (a, b) in enumerate(zip(full, dirty)):
+        np.testing.assert_array_equal(b, a, err_msg=f"frame {i}")
+
+
+def test_pinned_layer_follows_its_own_state(core):
+    ts = core.TransformState(shift=(40, 40))
+    hud = core.Layer(lambda arr, ts: core.rect(arr, ts, (10.0, 10.0), (255, 0, 0), 1, fill=True), ts=ts)
+    frame = core.TransformState(shift=(SIZE[0] / 2, SIZE[1] / 2))
+    hud.render(frame, SIZE)
+    assert not hud.needs_render(frame, SIZE)
+    frame.set_pos((30.0, 0.0))
+    assert not hud.needs_render(frame, SIZE)  # The frame's transform does not touch a pinned layer
+    ts.set_shift((20, 20))
+    assert hud.needs_render(frame, SIZE)
+    rect = hud.render(frame, SIZE)
+    assert rect[0] <= 20 and hud.rect[:2] == (20, 20)
@@ -0,0 +1,118 @@
+import numpy as np
+import pytest
+
+W, H = 320, 240
+
+
+def canvas():
+    return np.zeros((H, W, 3), dtype=np.uint8)
+
+
+def camera(core):
+    ts = core.TransformState(shift=(W / 2, H / 2))
+    ts.set_3d_mode(True)
+    ts.set_size(10.0)
+    ts.set_cam_pos((0.0, 0.0, -20.0))
+    ts.set_pos((0.0, 0.0, 0.0))
+    return ts
+
+
+def sphere(rings=12, segs=24, r=1.0):
+    th, ph = np.meshgrid(np.linspace(0, np.pi, rings + 1), np.linspace(0, 2 * np.pi, segs, endpoint=False), indexing="ij")
+    v = np.stack((r * np.sin(th) * np.cos(ph), r * np.cos(th), r * np.sin(th) * np.sin(ph)), -1).reshape((-1, 3))
+    i, j = np.arange(rings)[:, None], np.arange(segs)[None, :]
+    a, b, c, d = i * segs + j, i * segs + (j + 1) % segs, (i + 1) * segs + j, (i + 1) * segs + (j + 1) % segs
+    return v, np.concatenate((np.stack((a, b, d), -1).reshape((-1, 3)), np.stack((a, d, c), -1).reshape((-1, 3))))
+
+
+def test_culling_splits_faces_by_winding(core):
+    ts = core.TransformState(shift=(W / 2, H / 2))
+    verts = np.array([[-80, -60], [80, -60], [0, 70], [-100, 80], [-20, 80], [-60, 110]], dtype=float)
+    faces = np.array([[0, 1, 2], [5, 4, 3]])
+    drawn = {}
+    for cull in ("back", "front", "none"):
+        arr = canvas()
+        core.mesh(arr, ts, verts, faces, (0, 255, 0), cull=cull)
+        drawn[cull] = arr.any(2)
+    assert drawn["back"].any() and drawn["front"].any()
+    assert not (drawn["back"] & drawn["front"]).any()
+    np.testing.assert_array_equal(drawn["back"] | drawn["front"], drawn["none"])
+
+
+def test_painter_order_matches_poly_fills(core):
+    ts = core.TransformState(shift=(W / 2, H / 2))
+    verts = np.array([[-90, -70], [60, -80], [20, 90], [-20, -40], [110, 10], [-60, 60]], dtype=float)
+    faces = [[0, 1, 2], [3, 4, 5]]
+    cols = [(200, 50, 10), (10, 180, 240)]
+    meshed, polys = canvas(), canvas()
+    core.mesh(meshed, ts, verts, faces, cols, cull="none")
+    for f, c in zip(faces, cols):
+        a, b, d = verts[f]
+        ts.set_pos(tuple(a))
+        core.poly(polys, ts, (tuple(b - a), tuple(d - b)), c, 1, fill=True)
+    assert meshed.any()
+    np.testing.assert_array_equal(meshed, polys)
+
+
+def test_painter_order_draws_into_a_strict_batch(core):
+    ts = core.TransformState(shift=(W / 2, H / 2))
+    verts = np.array([[-80, -60], [80, -60], [0, 70]], dtype=float)
+    direct, batched = canvas(), canvas()
+    core.mesh(direct, ts, verts, [[0, 1, 2]], (0, 255, 0), cull="none")
+    dl = core.begin_batch(batched, strict_order=True)
+    core.mesh(batched, ts, verts, [[0, 1, 2]], (0, 255, 0), cull="none")
+    assert len(dl) == 1 and not batched.any()
+    core.flush()
+    np.testing.assert_array_equal(batched, direct)
+
+
+def test_zbuffer_does_not_depend_on_face_order(core):
+    v, f = sphere()
+    v[:, :2] *= 100
+    cols = np.random.default_rng(2).integers(0, 256, (f.shape[0], 3), dtype=np.uint8)
+    perm = np.random.default_rng(3).permutation(f.shape[0])
+    ts = camera(core)
+    ordered, shuffled = canvas(), canvas()
+    core.mesh(ordered, ts, v, f, cols, cull="none", zbuffer=True)
+    core.mesh(shuffled, ts, v, f[perm], cols[perm], cull="none", zbuffer=True)
+    assert ordered.any()
+    np.testing.assert_array_equal(shuffled, ordered)
+
+
+def test_quads_match_their_triangles(core):
+    ts = core.TransformState(shift=(W / 2, H / 2))
+    verts = np.array([[-90, -70], [60, -80], [100, 60], [-70, 90]], dtype=float)
+    quad, tris = canvas(), canvas()
+    core.mesh(quad, ts, verts, [[0, 1, 2, 3]], (200, 50, 10), cull="none")
+    core.mesh(tris, ts, verts, [[0, 1, 2], [0, 2, 3]], (200, 50, 10), cull="none")
+    np.testing.assert_array_equal(quad, tris)
+
+
+def test_faces_crossing_the_camera_are_clipped_not_dropped(core):
+    # A floor running from behind the camera into the distance
+    ts = camera(core)
+    verts = np.array([[-500, 60, -40], [500, 60, -40], [500, 60, 40], [-500, 60, 40]], dtype=float)
+    arr = canvas()
+    core.mesh(arr, ts, verts, [[0, 1, 2, 3]], (90, 90, 90), cull="none")
+    assert arr.any(2).sum() > W * H // 10
+
+
+def test_cache_version_picks_up_in_place_edits(core):
+    ts = core.TransformState(shift=(W / 2, H / 2))
+    verts = np.array([[-50, -50], [50, -50], [0, 50]], dtype=float)
+    first = canvas()
+    core.mesh(first, ts, verts, [[0, 1, 2]], (255, 255, 255), cull="none", cache=True)
+    verts[:, 0] += 60
+    stale, fresh = canvas(), canvas()
+    core.mesh(stale, ts, verts, [[0, 1, 2]], (255, 255, 255), cull="none", cache=True)
+    core.mesh(fresh, ts, verts, [[0, 1, 2]], (255, 255, 255), cull="none", cache=True, version=1)
+    np.testing.assert_array_equal(stale, first)
+    assert not np.array_equal(fresh, first)
+
+
+def test_rejects_bad_input(core):
+    ts = core.TransformState(shift=(W / 2, H / 2))
+    with pytest.raises(ValueError):
+        core.mesh(np.zeros((H, W, 4), dtype=np.uint8), ts, [[0, 0]], [[0, 0, 0]], (1, 1, 1))
+    with pytest.raises(IndexError):
+        core.mesh(canvas(), ts, [[0, 0], [1, 0], [0, 1]], [[0, 1, 3]], (1, 1, 1))
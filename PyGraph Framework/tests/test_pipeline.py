@@ -0,0 +1,57 @@
+import pytest
+
+SIZE = (64, 48)
+
+
+def test_sink_receives_every_frame_in_order(core):
+    seen = []
+    n = core.run(lambda arr, ts: None, (SIZE, "test"), (0, 0, 0), target_fps=None, backend="offscreen",
+                 sink=lambda frame, i: seen.append((i, frame.shape)), max_frames=12)
+    assert n == 12 and seen == [(i, (SIZE[1], SIZE[0], 3)) for i in range(12)]
+
+
+def test_sink_errors_stop_run_and_are_raised(core):
+    calls = []
+
+    def sink(frame, i):
+        calls.append(i)
+        raise IOError("disk full")
+
+    with pytest.raises(IOError, match="disk full"):
+        core.run(lambda arr, ts: None, (SIZE, "test"), (0, 0, 0), target_fps=None, backend="offscreen", sink=sink,
+                 max_frames=50)
+    assert calls == [0]  # Frames after the failure are dropped, not written
+
+
+def test_sink_errors_on_close_are_raised(core):
+    class Failing(core.FrameSink):
+        def close(self):
+            raise IOError("bad path")
+
+    with pytest.raises(IOError, match="bad path"):
+        core.run(lambda arr, ts: None, (SIZE, "test"), (0, 0, 0), target_fps=None, backend="offscreen", sink=Failing(),
+                 max_frames=3)
+
+
+def test_consecutive_runs_each_render(core):
+    def tick(arr, ts):
+        ticks.append(1)
+        return len(ticks) < 3
+
+    for _ in range(2):  # The first run ends by clearing RUN; the second must start again
+        ticks = []
+        assert core.run(tick, (SIZE, "test"), (0, 0, 0), target_fps=None, backend="offscreen") == 3
+
+
+def test_tick_errors_are_raised_offscreen(core):
+    seen, ticks = [], []
+
+    def tick(arr, ts):
+        ticks.append(1)
+        if len(ticks) == 3:
+            raise ValueError("bad frame")
+
+    with pytest.raises(ValueError, match="bad frame"):
+        core.run(tick, (SIZE, "test"), (0, 0, 0), target_fps=None, backend="offscreen",
+                 sink=lambda frame, i: seen.append(i), max_frames=10)
+    assert seen == [0, 1]
@@ -0,0 +1,73 @@
+import csv
+import json
+
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def profiler(core):
+    core.PROFILER.reset()
+    core.PROFILER.enable(True)
+    yield core.PROFILER
+    core.PROFILER.enable(False)
+    core.PROFILER.reset()
+
+
+def test_every_primitive_is_counted(core, profiler):
+    arr = np.zeros((120, 160, 3), dtype=np.uint8)
+    ts = core.TransformState(shift=(80, 60))
+    core.line(arr, ts, (10.0, 5.0), (255, 0, 0), 1)
+    core.rect(arr, ts, (20.0, 10.0), (0, 255, 0), 1)
+    core.poly(arr, ts, ((10.0, 0.0), (0.0, 10.0)), (0, 0, 255), 1)
+    core.circle(arr, ts, 10.0, (255, 255, 0), 1)
+    core.ellipse(arr, ts, 12.0, 6.0, (255, 0, 255), 1)
+    core.arc(arr, ts, 10.0, 0.0, 90.0, (0, 255, 255), 1)
+    core.graph(arr, ts, lambda x: x, -1.0, 1.0, (255, 255, 255), 1)
+    core.blit(arr, ts, np.full((4, 4, 3), 9, dtype=np.uint8), 1.0)
+    core.text(arr, ts, "hi", "CV2", 1.0, (255, 255, 255))
+    core.mesh(arr, ts, [[0, 0], [10, 0], [0, 10]], [[0, 1, 2]], (1, 2, 3), cull="none")
+    prims = profiler.primitives()
+    assert set(prims) == set(core.PROF_PRIMS)
+    for name, c in prims.items():
+        assert c["calls"] == 1 and c["vertices"] > 0 and c["ns"] > 0, name
+    assert prims["rect"]["vertices"] == 2 and prims["mesh"]["vertices"] == 3
+
+
+def test_counters_stay_off_while_disabled(core):
+    core.PROFILER.reset()
+    core.rect(np.zeros((20, 20, 3), dtype=np.uint8), core.TransformState(), (5.0, 5.0), (1, 1, 1), 1)
+    assert all(c["calls"] == 0 for c in core.PROFILER.primitives().values())
+
+
+def test_exports_round_trip(core, profiler, tmp_path):
+    profiler.add_frame(1, 2, 3, 4, 5, 15)
+    profiler.add_frame(2, 4, 6, 8, 10, 30)
+    core.circle(np.zeros((20, 20, 3), dtype=np.uint8), core.TransformState(), 5.0, (1, 1, 1), 1)
+
+    data = json.loads(profiler.to_json(str(tmp_path / "p.json")))
+    assert data == json.loads((tmp_path / "p.json").read_text())
+    assert [f["tick_ns"] for f in data["frames"]] == [2, 4] and data["summary"]["frames"] == 2
+    assert data["summary"]["phases"]["total"]["mean_ms"] == pytest.approx(22.5e-6)
+    assert data["summary"]["primitives"]["circle"]["calls"] == 1
+
+    profiler.to_csv(str(tmp_path / "frames.csv"))
+    with open(tmp_path / "frames.csv", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["frame"] + [f"{ph}_ns" for ph in profiler.PHASES]
+    assert [list(map(int, r)) for r in rows[1:]] == [[0, 1, 2, 3, 4, 5, 15], [1, 2, 4, 6, 8, 10, 30]]
+
+    profiler.to_csv(str(tmp_path / "prims.csv"), primitives=True)
+    with open(tmp_path / "prims.csv", newline="") as f:
+        rows = {r["primitive"]: r for r in csv.DictReader(f)}
+    assert set(rows) == set(core.PROF_PRIMS) and rows["circle"]["calls"] == "1"
+
+
+def test_benchmark_smoke(core, tmp_path):
+    out = tmp_path / "bench.json"
+    res = core.benchmark(scenes={"circles_2d": 10}, frames=2, size=(160, 120), warmup=1, imports=False, out=str(out))
+    assert json.loads(out.read_text()) == res and "import" not in res
+    scene = res["scenes"]["circles_2d"]
+    assert scene["n"] == 10 and scene["mean_ms"] > 0 and scene["fps"] > 0
+    assert scene["primitives"]["circle"]["calls"] == 20
+    assert not core.PROFILER.enabled
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+FONT = "pytest-font"
+W, H = 320, 120
+
+
+@pytest.fixture
+def font(core):
+    """Registers Pillow's built-in FreeType font under FONT for every size, so no font file is needed."""
+    from PIL import Image, ImageDraw, ImageFont
+
+    if not isinstance(ImageFont.load_default(12), ImageFont.FreeTypeFont):
+        pytest.skip("Pillow has no built-in FreeType font")
+    for size in range(1, 100):
+        core.FONT_CACHE[(FONT, size)] = ImageFont.load_default(size)
+    core.TEXT_SPRITES.clear(); core.TEXT_METRICS.clear(); core.GLYPH_ATLASES.clear()
+    yield Image, ImageDraw
+    for size in range(1, 100):
+        core.FONT_CACHE.pop((FONT, size), None)
+    core.TEXT_SPRITES.clear(); core.TEXT_METRICS.clear(); core.GLYPH_ATLASES.clear()
+
+
+def draw(core, content, size=24.0, color=(250, 200, 30), **kw):
+    arr = np.full((H, W, 3), 40, dtype=np.uint8)
+    ts = core.TransformState()
+    ts.set_pos((20.0, 80.0))
+    core.text(arr, ts, content, FONT, size, color, **kw)
+    return arr
+
+
+def test_cached_sprite_matches_a_fresh_pil_render(core, font):
+    Image, ImageDraw = font
+    first = draw(core, "Score: 1234")
+    assert (first != 40).any() and len(core.TEXT_SPRITES) == 1
+    np.testing.assert_array_equal(draw(core, "Score: 1234"), first)
+    assert core.TEXT_SPRITES.stats()["hits"] == 1
+
+    sprite, text_h = core.TEXT_SPRITES.get(("Score: 1234", FONT, 24, (250, 200, 30)))
+    font_obj = core.FONT_CACHE[(FONT, 24)]
+    l, t, r, b = font_obj.getbbox("Score: 1234")
+    img = Image.new("RGBA", (r - l + 1, b - t + 1), (0, 0, 0, 0))
+    ImageDraw.Draw(img).text((0, 0), "Score: 1234", font=font_obj, fill=(250, 200, 30, 255))
+    np.testing.assert_array_equal(sprite, core.premultiply(np.array(img)))
+    assert text_h == b - t
+
+
+@pytest.mark.parametrize("content", ["1234567890", "HUD", "x"])
+def test_atlas_matches_the_pil_path(core, font, content):
+    np.testing.assert_array_equal(draw(core, content, atlas=True), draw(core, content))
+
+
+def test_atlas_skips_blank_strings(core, font):
+    np.testing.assert_array_equal(draw(core, "   ", atlas=True), draw(core, ""))
+
+
+def test_text_sprites_stay_within_their_budget(core, font, monkeypatch):
+    monkeypatch.setattr(core.TEXT_SPRITES, "max_cost", 50_000)
+    for i in range(200):
+        draw(core, f"frame {i}")
+        assert core.TEXT_SPRITES.cost <= 50_000
+    assert 1 < len(core.TEXT_SPRITES) < 200
+
+
+def test_glyph_atlases_are_bounded(core, font):
+    for size in range(8, 60, 2):
+        draw(core, "42", size=float(size), atlas=True)
+    assert len(core.GLYPH_ATLASES) == core.GLYPH_ATLASES.max_cost == 16
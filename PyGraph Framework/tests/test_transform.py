@@ -0,0 +1,166 @@
+import math
+
+import numpy as np
+import pytest
+
+
+def rotate_3d(x, y, z, pitch, yaw, roll):
+    p, a, r = map(math.radians, (pitch, yaw, roll))
+    x1, z1 = x * math.cos(a) + z * math.sin(a), z * math.cos(a) - x * math.sin(a)
+    y2, z2 = y * math.cos(p) - z1 * math.sin(p), y * math.sin(p) + z1 * math.cos(p)
+    return x1 * math.cos(r) - y2 * math.sin(r), x1 * math.sin(r) + y2 * math.cos(r), z2
+
+
+def reference(p, ts):
+    """The old dict-based transform: rotate, scale, then shift and homography (2D) or camera and perspective (3D)."""
+    x, y, z = p[0], p[1], p[2] if len(p) == 3 else 0.0
+    a = math.radians(ts.rot)
+    x, y = x * math.cos(a) - y * math.sin(a), x * math.sin(a) + y * math.cos(a)
+    x, y, z = x * ts.size, y * ts.size, z * ts.size
+    if ts.is_3d:
+        cx, cy, cz = ts.cam_pos_3d
+        x, y, z = rotate_3d(x - cx, y - cy, z - cz, *ts.cam_rot_3d)
+        if z < 1e-6:
+            return math.inf, math.inf
+        return x / z + ts.shift[0], y / z + ts.shift[1]
+    x, y = x + ts.shift[0], y + ts.shift[1]
+    H = ts.full_transform
+    if H is not None:
+        w = H[2, 0] * x + H[2, 1] * y + H[2, 2]
+        return (H[0, 0] * x + H[0, 1] * y + H[0, 2]) / w, (H[1, 0] * x + H[1, 1] * y + H[1, 2]) / w
+    return x, y
+
+
+def random_state(core, rng, is_3d):
+    ts = core.TransformState(shift=tuple(rng.uniform(0, 800, 2)), rot=rng.uniform(-360, 360), size=rng.uniform(0.1, 5),
+                             cam_pos_3d=(*rng.uniform(-50, 50, 2), -rng.uniform(20, 200)),
+                             cam_rot_3d=tuple(rng.uniform(-20, 20, 3)), is_3d=is_3d)
+    if not is_3d and rng.random() < 0.5:
+        H = np.eye(3) + rng.uniform(-0.2, 0.2, (3, 3)) * [[1, 1, 50], [1, 1, 50], [1e-4, 1e-4, 0]]
+        ts.set_full_transform(H)
+    return ts
+
+
+@pytest.mark.parametrize("is_3d", [False, True], ids=["2d", "3d"])
+def test_transform_matches_the_dict_formula(core, is_3d):
+    rng = np.random.default_rng(4)
+    for _ in range(300):
+        ts = random_state(core, rng, is_3d)
+        p = tuple(rng.uniform(-30, 30, 3 if is_3d else 2))
+        np.testing.assert_allclose(core.transform(p, ts), reference(p, ts), rtol=1e-9, atol=1e-6)
+
+
+def test_setters_invalidate_the_cached_matrix(core):
+    p = (3.0, -2.0, 1.0)
+    ts = core.TransformState(shift=(100, 50))
+    ts.set_3d_mode(True)
+    setters = [
+        lambda: ts.set_shift((10, 20)), lambda: ts.shift_by((5, -5)), lambda: ts.set_rotate(30.0), lambda: ts.rotate(15.0),
+        lambda: ts.set_size(2.0), lambda: ts.scale(0.5), lambda: ts.set_cam_pos((1.0, 2.0, -30.0)),
+        lambda: ts.set_cam_rot((5.0, 10.0, 0.0)), lambda: ts.__setitem__("size", 3.0),
+        lambda: ts.__setitem__("rot", -45.0), lambda: ts.__setitem__("shift", (0, 0)), lambda: ts.set_3d_mode(False),
+        lambda: ts.set_full_transform(np.diag([2.0, 1.0, 1.0])), lambda: ts.set_full_transform(None),
+    ]
+    for setter in setters:
+        before = ts.matrix
+        setter()
+        assert not np.array_equal(ts.matrix, before) or ts.matrix.shape != before.shape
+        np.testing.assert_allclose(core.transform(p if ts.is_3d else p[:2], ts), reference(p if ts.is_3d else p[:2], ts), atol=1e-9)
+
+
+def test_singular_homography_gives_inf(core):
+    ts = core.TransformState()
+    H = np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [1.0, 0.0, -100.0]])  # w = 0 on the line x = 100
+    ts.set_full_transform(H, np.eye(3))
+    assert core.transform((100.0, 7.0), ts) == (math.inf, math.inf)
+    np.testing.assert_allclose(core.transform((150.0, 7.0), ts), (3.0, 0.14))
+
+
+def test_push_pop_peek_cycle(core):
+    ts = core.TransformState()
+    for i in range(20):  # Past the initial stack capacity
+        ts.set_shift((i, 0))
+        ts.push()
+    assert ts.stack_depth == 20
+    ts.set_shift((-1, -1))
+    ts.peek()
+    assert ts.shift == (19.0, 0.0) and ts.stack_depth == 20
+    ts.cycle()  # 19 moves to the bottom, 18 is on top
+    ts.pop()
+    assert ts.shift == (18.0, 0.0) and ts.stack_depth == 19
+    np.testing.assert_allclose(core.transform((1.0, 1.0), ts), (19.0, 1.0))  # pop invalidates the matrix
+    for _ in range(19):
+        ts.pop()
+    assert ts.shift == (19.0, 0.0) and ts.stack_depth == 0
+    ts.pop()  # Popping an empty stack leaves the state alone
+    assert ts.shift == (19.0, 0.0)
+
+
+def test_dict_access(core):
+    ts = core.TransformState.from_dict({"shift": (10, 20), "rot": 90.0, "size": 2.0, "cursor_pos": (1.0, 2.0), "layer": "hud"})
+    assert ts["shift"] == (10.0, 20.0) and ts["rot"] == 90.0 and ts["size"] == 2.0 and ts["cursor_pos"] == (1.0, 2.0)
+    assert ts["full_transform"] is None and ts["is_3d"] is False
+    assert ts["layer"] == "hud" and "layer" in ts and "shift" in ts and "missing" not in ts
+    assert ts.get("missing", 5) == 5 and len(ts) == len(core.STATE_KEYS) + 1 and ts.keys()[-1] == "layer"
+    np.testing.assert_allclose(core.transform((1.0, 0.0), ts), (10.0, 22.0), atol=1e-12)
+    ts["cam_pos_3d"] = (0, 0, -5)
+    ts["is_3d"] = True
+    assert ts.cam_pos_3d == (0.0, 0.0, -5.0)
+    np.testing.assert_allclose(core.transform((0.0, 0.0, 0.0), ts), (10.0, 20.0))
+    with pytest.raises(KeyError):
+        ts["missing"]
+
+
+def test_copy_is_independent(core):
+    ts = core.TransformState(shift=(5, 5), rot=10.0)
+    ts["tag"] = [1]
+    ts.push()
+    c = ts.copy()
+    assert c.stack_depth == 0 and c["tag"] == [1]
+    c.set_shift((50, 50)); c.set_rotate(0.0); c["other"] = 1
+    assert ts.shift == (5.0, 5.0) and ts.rot == 10.0 and "other" not in ts
+    np.testing.assert_allclose(core.transform((1.0, 0.0), c), (51.0, 50.0))
+    np.testing.assert_allclose(core.transform((1.0, 0.0), ts), reference((1.0, 0.0), ts))
+
+
+@pytest.mark.parametrize("is_3d", [False, True], ids=["2d", "3d"])
+def test_transform_points_matches_scalar_transform(core, is_3d):
+    rng = np.random.default_rng(5)
+    for _ in range(50):
+        ts = random_state(core, rng, is_3d)
+        pts = rng.uniform(-30, 30, (40, 3 if is_3d else 2))
+        if is_3d:
+            pts[::4, 2] = ts.cam_pos_3d[2] / ts.size - 50  # Well behind the camera
+        screen, valid = core.transform_points(pts, ts)
+        assert screen.shape == (40, 2) and valid.dtype == bool
+        for p, s, ok in zip(pts, screen, valid):
+            ref = core.transform(tuple(p), ts)
+            assert ok == np.isfinite(ref).all()
+            if ok:
+                np.testing.assert_allclose(s, ref, rtol=1e-12, atol=1e-9)
+                if is_3d:
+                    np.testing.assert_allclose(s, core.transform_3d(tuple(p), ts)[:2], rtol=1e-12, atol=1e-9)
+            else:
+                assert np.isnan(s).all()
+        if is_3d:
+            assert not valid[::4].any() and valid.sum() > 10
+
+
+def test_transform_points_flags_singular_homography_and_non_finite_points(core):
+    ts = core.TransformState()
+    ts.set_full_transform(np.array([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [1.0, 0.0, -100.0]]), np.eye(3))
+    pts = np.array([[100.0, 7.0], [150.0, 7.0], [np.nan, 0.0], [np.inf, 1.0]])
+    screen, valid = core.transform_points(pts, ts)
+    assert valid.tolist() == [False, True, False, False]
+    assert np.isnan(screen[[0, 2, 3]]).all()
+    np.testing.assert_allclose(screen[1], core.transform((150.0, 7.0), ts))
+
+
+def test_transform_points_shapes(core):
+    ts = core.TransformState(shift=(10, 20))
+    screen, valid = core.transform_points((1.0, 2.0), ts)  # One point
+    assert screen.tolist() == [[11.0, 22.0]] and valid.tolist() == [True]
+    screen, valid = core.transform_points(np.empty((0, 2)), ts)
+    assert screen.shape == (0, 2) and valid.shape == (0,)
+    with pytest.raises(ValueError):
+        core.transform_points(np.zeros((3, 4)), ts)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+W, H = 200, 160
+
+
+@pytest.fixture
+def tvf(core, tmp_path):
+    """A .tvf exercising state, clears and embedded-image blits; returns its path without the extension."""
+    img = np.zeros((6, 8, 4), dtype=np.uint8)
+    img[..., 0], img[..., 1], img[..., 3] = 40, np.arange(8, dtype=np.uint8) * 30, np.arange(6, dtype=np.uint8)[:, None] * 50
+    sprite = core.array_to_str(img)
+    lines = ["# test scene", "clear, (10,20,30)"]
+    for i in range(4):
+        lines += ["push_state", f"set_pos, ({-60 + 30 * i},{10 * i})", "scale, 1.5", f"blit, {sprite}, {1.0 + i}",
+                  "pop_state", "move, (3,4)"]
+    path = tmp_path / "scene"
+    path.with_suffix(".tvf").write_text("\n".join(lines) + "\n")
+    core.TVF_CACHE.clear()
+    yield str(path)
+    core.TVF_CACHE.clear()
+
+
+def interpreted(core, name):
+    """Reference: every line through draw_command, as before TVF files were compiled."""
+    arr = np.zeros((H, W, 3), dtype=np.uint8)
+    ts = core.TransformState(shift=(W / 2, H / 2))
+    with open(name + ".tvf") as f:
+        for i, line in enumerate(f, 1):
+            cmd = line.strip()
+            if cmd and not cmd.startswith("#"):
+                core.draw_command(arr, ts, cmd, i)
+    return arr, ts.cursor_pos
+
+
+def replayed(core, name, sidecar):
+    arr = np.zeros((H, W, 3), dtype=np.uint8)
+    ts = core.TransformState(shift=(W / 2, H / 2))
+    core.draw_tvf(arr, ts, name, sidecar=sidecar)
+    return arr, ts.cursor_pos
+
+
+def test_compiled_program_matches_interpreter(core, tvf, capsys):
+    ref, ref_pos = interpreted(core, tvf)
+    assert "Error" not in capsys.readouterr().out
+    assert ref.any()
+    for _ in range(2):  # compile, then the cached program
+        arr, pos = replayed(core, tvf, sidecar=False)
+        np.testing.assert_array_equal(arr, ref)
+        assert pos == ref_pos
+    assert "Error" not in capsys.readouterr().out
+
+
+def test_tvfc_sidecar_replay_matches_interpreter(core, tvf, tmp_path):
+    ref, ref_pos = interpreted(core, tvf)
+    replayed(core, tvf, sidecar=True)
+    assert (tmp_path / "scene.tvfc").exists()
+    core.TVF_CACHE.clear()  # Next load memory-maps the sidecar instead of compiling
+    prog = core.load_tvf(tvf, sidecar=True)
+    assert isinstance(prog.ops, np.memmap) or isinstance(prog.ops.base, np.memmap)
+    arr, pos = replayed(core, tvf, sidecar=True)
+    np.testing.assert_array_equal(arr, ref)
+    assert pos == ref_pos
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_stale_sidecar_is_recompiled(core, tvf, tmp_path):
+    replayed(core, tvf, sidecar=True)
+    src = tmp_path / "scene.tvf"
+    src.write_text(src.read_text().replace("clear, (10,20,30)", "clear, (90,0,0)"))
+    core.TVF_CACHE.clear()
+    ref, _ = interpreted(core, tvf)
+    arr, _ = replayed(core, tvf, sidecar=True)
+    np.testing.assert_array_equal(arr, ref)